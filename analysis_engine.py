@@ -0,0 +1,1161 @@
+"""수입신고 분석 엔진 (파일 로드 → 분석 → 결과 파일 생성, 작업 큐 작업 함수)
+
+Streamlit 화면(app_enhanced.py)과 HTTP API(api_server.py)가 함께 사용합니다.
+Streamlit 페이지 코드가 없으므로 API 서버나 벤치마크처럼 다른 프로세스에서 import해도 화면이 구성되지 않습니다.
+분석 중 경고/오류는 notify로 보내며, collect_notices 밖에서는 set_notice_display로 등록한 표시 함수
+(Streamlit 화면은 st.warning 등)로, 등록한 함수가 없으면 로그로 남깁니다.
+"""
+import contextlib
+import datetime
+import io
+import logging
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+from classification_history import check_against_history, record_upload, summarize_classifications
+from data_quality import validate_dataset
+from dataset_store import dataset_key, get_dataset_store
+from declaration_index import (
+    build_declaration_index,
+    count_declarations,
+    declaration_counts_by,
+    declaration_structure,
+    lookup_tables,
+)
+from distinct_sketch import DISTINCT_EXACT, DISTINCT_SKETCH, RISK_LABELS, build_summary_sketch
+from duplicate_detection import DEFAULT_SPLIT_WINDOW_DAYS, detect_duplicates
+from excel_report import build_excel_report
+from fta_refund import FtaTableError, estimate_refunds
+from hs_index import build_hs_index, score_divergence
+from job_queue import get_job_queue
+from memory_governor import (
+    MIN_CHUNK_ROWS,
+    chunked_filter,
+    chunked_group_nunique,
+    chunked_groupby_agg,
+    plan_execution,
+)
+from perf_monitor import PipelineMetrics, optional_stage
+from price_drift import DEFAULT_DRIFT_THRESHOLD, DEFAULT_WINDOW_DAYS, detect_price_drift
+from result_diff import save_snapshot
+from rule_engine import (
+    classify_price_risk,
+    evaluate_rules,
+    load_rule_set,
+    parse_rule_set,
+    rule_mask,
+    summarize_rule_matches,
+)
+from schema_registry import VERIFY_ROWS, lookup_layout, read_with_layout, register_layout
+from spec_key import (
+    MISSING_KEY,
+    SPEC_KEY_COLUMN,
+    is_composite,
+    spec_key,
+    spec_label,
+)
+from word_report import aggregate_report_tables, write_report_sections
+from workbook_ingest import (
+    convert_rate_column,
+    discover_sheets,
+    fill_rate_defaults,
+    needs_workbook_read,
+    normalize_headers,
+    read_workbook,
+)
+
+logger = logging.getLogger(__name__)
+
+# 분석 중 경고/오류 수집 (작업 큐 작업자 스레드에서는 st 호출이 화면에 표시되지 않음)
+_NOTICES = threading.local()
+_notice_display = None
+
+def set_notice_display(display):
+    """collect_notices 밖에서 notify를 표시할 함수 display(level, message) 등록 (Streamlit 화면용, 없으면 로그)"""
+    global _notice_display
+    _notice_display = display
+
+def notify(level, message):
+    """분석 경고/오류 표시 (collect_notices 안에서는 (level, message)로 모아 두었다가 결과와 함께 표시)"""
+    sink = getattr(_NOTICES, 'sink', None)
+    if sink is not None:
+        sink.append((level, message))
+    elif _notice_display is not None:
+        _notice_display(level, message)
+    else:
+        logger.log(logging.ERROR if level == 'error' else logging.WARNING, message)
+
+@contextlib.contextmanager
+def collect_notices():
+    """notify 호출을 목록으로 수집 (백그라운드 작업용)"""
+    previous = getattr(_NOTICES, 'sink', None)
+    _NOTICES.sink = []
+    try:
+        yield _NOTICES.sink
+    finally:
+        _NOTICES.sink = previous
+
+def read_excel_file(uploaded_file, progress_bar=None, status_text=None, metrics=None):
+    """업로드된 엑셀 파일 읽기"""
+    try:
+        if status_text:
+            status_text.text("📂 엑셀 파일 로드 중...")
+        if progress_bar:
+            progress_bar.progress(20)
+        
+        # 데이터 시트가 여러 개이거나 첫 시트가 아니면 시트별로 읽어 결합 (pd.read_excel은 첫 시트만 읽음)
+        with optional_stage(metrics, 'ingest.discover_sheets') as record:
+            sheets = discover_sheets(uploaded_file)
+            record['rows_out'] = len(sheets)
+        headers = layout = raw_head = None
+        if needs_workbook_read(sheets):
+            with optional_stage(metrics, 'ingest.read_sheets') as record:
+                df, ingest_notes = read_workbook(uploaded_file, sheets)
+                record['rows_out'] = len(df)
+            if status_text:
+                status_text.text(f"📊 {len(sheets)}개 시트 로드 완료: {len(df):,}행, {len(df.columns)}열")
+            if progress_bar:
+                progress_bar.progress(70)
+        else:
+            # 헤더 지문으로 등록된 배치가 있으면 지정 컬럼/dtype만 바로 읽기 (실패하면 일반 로드)
+            with optional_stage(metrics, 'ingest.schema_lookup') as record:
+                headers, layout = lookup_layout(uploaded_file)
+                record['rows_out'] = 0 if layout is None else len(layout['columns'])
+            df = None
+            if layout is not None:
+                with optional_stage(metrics, 'ingest.read_known_layout') as record:
+                    df = read_with_layout(uploaded_file, layout)
+                    record['rows_out'] = 0 if df is None else len(df)
+            if df is None:
+                layout = None
+                with optional_stage(metrics, 'ingest.read_excel') as record:
+                    df = pd.read_excel(uploaded_file)
+                    record['rows_out'] = len(df)
+                raw_head = df.head(VERIFY_ROWS).copy() if headers else None
+            
+            if status_text:
+                status_text.text(f"📊 데이터 로드 완료: {len(df):,}행, {len(df.columns)}열")
+            if progress_bar:
+                progress_bar.progress(40)
+            
+            if status_text:
+                status_text.text("🔧 중복 컬럼명 처리 중...")
+            if progress_bar:
+                progress_bar.progress(50)
+            
+            # 공백 제거/중복 컬럼명 처리/세율 컬럼 위치 매핑 (등록된 배치는 등록 시 기록 사용)
+            df, ingest_notes, duplicate_count = normalize_headers(df, headers, layout)
+            
+            if duplicate_count > 0 and status_text:
+                status_text.text(f"⚠️ {duplicate_count}개의 중복 컬럼명 처리 완료")
+            
+            if progress_bar:
+                progress_bar.progress(70)
+        
+        if status_text:
+            status_text.text("🏷️ 컬럼 매핑 중...")
+        
+        # 위치 매핑 후에도 없는 컬럼들은 기본값으로 생성
+        fill_rate_defaults(df, ingest_notes)
+        
+        if progress_bar:
+            progress_bar.progress(90)
+        
+        if status_text:
+            status_text.text("🔢 데이터 타입 변환 중...")
+        
+        # 관세실행세율 컬럼을 숫자형으로 변환 (변환하지 못한 값은 0)
+        try:
+            convert_rate_column(df, ingest_notes)
+        except Exception as convert_error:
+            if status_text:
+                status_text.text("⚠️ 숫자 변환 오류: 기본값 사용")
+            df['관세실행세율'] = 0
+            ingest_notes['rate_unparsed'] = len(df)
+        
+        if progress_bar:
+            progress_bar.progress(100)
+        
+        if status_text:
+            status_text.text("✅ 데이터 처리 완료!")
+        
+        if layout is None and raw_head is not None:
+            # 처음 보는 배치는 앞쪽 행 검증 후 등록 (다음 업로드부터 고속 읽기)
+            final_columns = df.columns[:raw_head.shape[1]].tolist()
+            with optional_stage(metrics, 'ingest.schema_register') as record:
+                register_layout(uploaded_file, headers, raw_head, final_columns, ingest_notes)
+                record['rows_out'] = len(raw_head)
+        
+        df.attrs['ingest_notes'] = ingest_notes
+        return df
+    except Exception as e:
+        if status_text:
+            status_text.text(f"❌ 오류 발생: {str(e)}")
+        notify('error', f"엑셀 파일 읽기 실패: {str(e)}")
+        notify('error', "파일 형식을 확인하거나 다른 파일을 시도해보세요.")
+        return None
+
+def load_shared_dataset(source, key, holder, progress_bar=None, status_text=None, metrics=None):
+    """같은 파일은 세션/작업 간에 한 번만 읽고 공용 저장소의 데이터를 공유 (key: dataset_key 결과)
+
+    Returns:
+        (DataFrame 또는 None, 이번 호출에서 직접 읽었는지 여부)
+    """
+    return get_dataset_store().acquire(
+        key,
+        lambda: read_excel_file(source, progress_bar, status_text, metrics),
+        holder,
+    )
+
+def process_data(df, rule_masks=None):
+    """데이터 전처리"""
+    try:
+        # 컬럼 이름의 공백 제거
+        df.columns = df.columns.str.strip()
+        
+        # 필요한 컬럼이 있는지 확인
+        required_columns = ['관세실행세율', '세율구분']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            notify('warning', f"누락된 컬럼: {missing_columns}")
+            return None
+
+        # 0% Risk 조건에 맞는 데이터 필터링 ('세율구분'이 4자리인 행 제외, rules/default_rules.json)
+        df_filtered = df[rule_mask(df, 'zero_risk_strict', rule_masks)]
+
+        return df_filtered
+        
+    except Exception as e:
+        notify('error', f"데이터 전처리 중 오류 발생: {e}")
+        return None
+
+def create_eight_percent_refund_analysis(df, rule_masks=None, fta_table=None):
+    """8% 환급 검토 분석 (FTA 협정세율 기준 예상환급액 포함)"""
+    try:
+        # 필요한 컬럼만 선택
+        selected_columns = [
+            '수입신고번호',
+            '수리일자',
+            'B/L번호',
+            '세번부호', 
+            '세율구분',
+            '세율설명',
+            '관세실행세율',
+            '적출국코드',
+            '원산지코드',
+            'FTA사후환급 검토',
+            '규격1',
+            '규격2',
+            '규격3',
+            '성분1',
+            '성분2',
+            '성분3',
+            '실제관세액',
+            '결제방법',
+            '결제통화단위',
+            '무역거래처상호',
+            '무역거래처국가코드',
+            '거래품명',
+            '란번호',
+            '행번호',
+            '수량_1',
+            '수량단위_1',
+            '단가',
+            '금액',
+            '란결제금액',
+            '행별관세'
+        ]
+        
+        # 존재하는 컬럼만 선택
+        base_columns = [col for col in selected_columns 
+                       if col not in ['행별관세', 'FTA사후환급 검토'] and col in df.columns]
+        
+        # 원본 데이터를 복사하여 사용
+        df_work = df[base_columns].copy()
+        
+        # 데이터 전처리
+        df_work['세율구분'] = df_work['세율구분'].astype(str).str.strip()
+        df_work['관세실행세율'] = pd.to_numeric(
+            df_work['관세실행세율'].fillna(0), errors='coerce'
+        ).fillna(0)
+        df_work['실제관세액'] = pd.to_numeric(
+            df_work['실제관세액'].fillna(0), errors='coerce'
+        ).fillna(0)
+        
+        # 행별관세 계산에 필요한 컬럼들 전처리
+        if '금액' in df_work.columns:
+            df_work['금액'] = pd.to_numeric(
+                df_work['금액'].fillna(0), errors='coerce'
+            ).fillna(0)
+        
+        if '란결제금액' in df_work.columns:
+            df_work['란결제금액'] = pd.to_numeric(
+                df_work['란결제금액'].fillna(0), errors='coerce'
+            ).fillna(0)
+        
+        # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
+        if all(col in df_work.columns for col in ['실제관세액', '금액', '란결제금액']):
+            df_work['행별관세'] = np.where(
+                df_work['란결제금액'] != 0,
+                (df_work['실제관세액'] * df_work['금액']) / df_work['란결제금액'],
+                0
+            )
+        else:
+            df_work['행별관세'] = 0
+        
+        # FTA사후환급 검토 컬럼 계산
+        if '적출국코드' in df_work.columns and '원산지코드' in df_work.columns:
+            df_work['FTA사후환급 검토'] = df_work.apply(
+                lambda row: 'FTA사후환급 검토' if (
+                    pd.notna(row['적출국코드']) and 
+                    pd.notna(row['원산지코드']) and 
+                    str(row['적출국코드']).strip() == str(row['원산지코드']).strip() and
+                    str(row['적출국코드']).strip() != '' and
+                    str(row['원산지코드']).strip() != ''
+                ) else '', 
+                axis=1
+            )
+        else:
+            df_work['FTA사후환급 검토'] = ''
+        
+        # NaN 값을 0으로 대체
+        df_work.fillna(0, inplace=True)
+        df_work = df_work.infer_objects(copy=False)
+        
+        # 필터링 조건 적용 (eight_percent 규칙)
+        df_filtered = df_work[rule_mask(df, 'eight_percent', rule_masks)]
+        
+        # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
+        final_columns = [col for col in selected_columns 
+                        if col in df_filtered.columns and col != '란결제금액']
+        df_filtered = df_filtered[final_columns]
+        
+        # FTA 협정세율 표와 결합해 예상환급액 계산
+        try:
+            df_filtered = estimate_refunds(df_filtered, fta_table)
+        except (FtaTableError, OSError) as e:
+            notify('warning', f"FTA 협정세율 표를 사용할 수 없어 예상환급액을 계산하지 않았습니다: {e}")
+        
+        return df_filtered
+        
+    except Exception as e:
+        notify('error', f"8% 환급 검토 분석 중 오류 발생: {str(e)}")
+        return None
+
+def create_zero_percent_risk_analysis(df, rule_masks=None):
+    """0% Risk 분석"""
+    try:
+        # 필요한 컬럼만 선택
+        selected_columns = [
+            '수입신고번호',
+            '수리일자',
+            'B/L번호',
+            '세번부호', 
+            '세율구분',
+            '관세실행세율',
+            '규격1',
+            '규격2',
+            '성분1',
+            '실제관세액',
+            '거래품명',
+            '란번호',
+            '행번호',
+            '수량_1',
+            '수량단위_1',
+            '단가',
+            '금액',
+            '란결제금액',
+            '행별관세'
+        ]
+        
+        # 0% Risk 조건에 맞는 데이터 필터링 (zero_risk 규칙)
+        df_zero_risk = df[rule_mask(df, 'zero_risk', rule_masks)]
+        
+        # 존재하는 컬럼만 선택
+        base_columns = [col for col in selected_columns 
+                       if col not in ['행별관세'] and col in df_zero_risk.columns]
+        
+        # 필요한 컬럼만 선택
+        df_zero_risk = df_zero_risk[base_columns].copy()
+        
+        # 행별관세 계산에 필요한 컬럼들 전처리
+        if '실제관세액' in df_zero_risk.columns:
+            df_zero_risk['실제관세액'] = pd.to_numeric(
+                df_zero_risk['실제관세액'].fillna(0), errors='coerce'
+            ).fillna(0)
+        
+        if '금액' in df_zero_risk.columns:
+            df_zero_risk['금액'] = pd.to_numeric(
+                df_zero_risk['금액'].fillna(0), errors='coerce'
+            ).fillna(0)
+        
+        if '란결제금액' in df_zero_risk.columns:
+            df_zero_risk['란결제금액'] = pd.to_numeric(
+                df_zero_risk['란결제금액'].fillna(0), errors='coerce'
+            ).fillna(0)
+        
+        # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
+        if all(col in df_zero_risk.columns for col in ['실제관세액', '금액', '란결제금액']):
+            df_zero_risk['행별관세'] = np.where(
+                df_zero_risk['란결제금액'] != 0,
+                (df_zero_risk['실제관세액'] * df_zero_risk['금액']) / df_zero_risk['란결제금액'],
+                0
+            )
+        else:
+            df_zero_risk['행별관세'] = 0
+        
+        # NaN 값을 0으로 대체
+        df_zero_risk.fillna(0, inplace=True)
+        df_zero_risk = df_zero_risk.infer_objects(copy=False)
+        
+        # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
+        final_columns = [col for col in selected_columns 
+                        if col in df_zero_risk.columns and col != '란결제금액']
+        df_zero_risk = df_zero_risk[final_columns]
+        
+        return df_zero_risk
+    
+    except Exception as e:
+        notify('error', f"0% Risk 분석 중 오류 발생: {str(e)}")
+        return None
+
+# 세율 Risk 분석 컬럼
+TARIFF_RISK_COLUMNS = [
+    '수입신고번호', 
+    '란번호', '행번호',
+    '수리일자',
+    '규격1', '규격2', '규격3',
+    '성분1', '성분2', '성분3',
+    '세번부호', 
+    '세율구분', 
+    '세율설명',
+    '과세가격달러',
+    '실제관세액',
+    '결제방법',
+    '금액',
+    '란결제금액'
+]
+
+def create_tariff_risk_analysis(df, chunk_rows=None, hs_index=None, spec_columns=None):
+    """세율 Risk 분석
+
+    Args:
+        chunk_rows: 지정 시 분할 처리
+        hs_index: 업로드 전체 세번부호 계층 인덱스
+        spec_columns: 규격 그룹 기준 컬럼 (기본: 규격1, 복합이면 64비트 규격키로 그룹화)
+    """
+    try:
+        required_columns = TARIFF_RISK_COLUMNS
+        
+        # 복합 규격 키: 선택한 규격 컬럼을 행별 해시 하나로 묶어 정수 키로 그룹화
+        composite = is_composite(spec_columns)
+        keys = spec_key(df, spec_columns) if composite and '규격1' in df.columns else None
+        
+        # 규격1(또는 규격키)별 세번부호 분석
+        if '규격1' in df.columns and '세번부호' in df.columns:
+            # 규격별로 세번부호의 고유값 개수를 계산
+            if chunk_rows:
+                risk_specs = chunked_group_nunique(df, SPEC_KEY_COLUMN if composite else '규격1', '세번부호',
+                                                   chunk_rows, keys)
+            elif composite:
+                risk_specs = df['세번부호'].groupby(keys).nunique()
+            else:
+                risk_specs = df.groupby('규격1')['세번부호'].nunique()
+            
+            # 세번부호가 2개 이상인 규격만 선택 (복합 키는 규격 컬럼이 모두 빈 행 제외)
+            if composite:
+                risk_specs = risk_specs[risk_specs.index != MISSING_KEY]
+            risk_specs = risk_specs[risk_specs > 1]
+        else:
+            risk_specs = pd.Series(dtype='object')
+        
+        if len(risk_specs) == 0:
+            return pd.DataFrame()
+            
+        # 규격1 기준으로 정렬
+        if '규격1' in df.columns:
+            # 존재하는 컬럼만 선택
+            available_columns = [col for col in required_columns if col in df.columns]
+            if composite:
+                row_mask = pd.Series(keys, copy=False).isin(risk_specs.index).to_numpy()
+            else:
+                row_mask = lambda chunk: chunk['규격1'].isin(risk_specs.index)
+            if chunk_rows:
+                risk_data = chunked_filter(df, row_mask, available_columns, chunk_rows)
+            else:
+                mask = row_mask if composite else row_mask(df)
+                risk_data = df.loc[mask, available_columns].copy()
+            
+            # 복합 키: 결과 행에만 표시용 규격키 생성
+            if composite:
+                risk_data.insert(available_columns.index('규격1'), SPEC_KEY_COLUMN,
+                                 spec_label(risk_data, spec_columns))
+            
+            # 행별관세 계산에 필요한 컬럼들 전처리
+            if '실제관세액' in risk_data.columns:
+                risk_data['실제관세액'] = pd.to_numeric(
+                    risk_data['실제관세액'].fillna(0), errors='coerce'
+                ).fillna(0)
+            
+            if '금액' in risk_data.columns:
+                risk_data['금액'] = pd.to_numeric(
+                    risk_data['금액'].fillna(0), errors='coerce'
+                ).fillna(0)
+            
+            if '란결제금액' in risk_data.columns:
+                risk_data['란결제금액'] = pd.to_numeric(
+                    risk_data['란결제금액'].fillna(0), errors='coerce'
+                ).fillna(0)
+            
+            # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
+            if all(col in risk_data.columns for col in ['실제관세액', '금액', '란결제금액']):
+                risk_data['행별관세'] = np.where(
+                    risk_data['란결제금액'] != 0,
+                    (risk_data['실제관세액'] * risk_data['금액']) / risk_data['란결제금액'],
+                    0
+                )
+            else:
+                risk_data['행별관세'] = 0
+            
+            # 세번부호가 갈라지는 계층(류/호/소호/세번)별 위험 점수
+            group_column = SPEC_KEY_COLUMN if composite else '규격1'
+            risk_data['분류차이'], risk_data['분류차이점수'] = score_divergence(
+                keys[row_mask] if composite else risk_data['규격1'], risk_data['세번부호'], hs_index
+            )
+            
+            # 분류차이점수(높은 순), 규격1(규격키), 세번부호 기준 정렬
+            risk_data = risk_data.sort_values(
+                ['분류차이점수', group_column, '세번부호'], ascending=[False, True, True], kind='stable'
+            ).fillna('')
+            
+            # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
+            final_columns = [col for col in risk_data.columns if col in available_columns + [SPEC_KEY_COLUMN]
+                             and col != '란결제금액']
+            if '행별관세' not in final_columns:
+                final_columns.append('행별관세')
+            final_columns += ['분류차이', '분류차이점수']
+            risk_data = risk_data[final_columns]
+        else:
+            risk_data = pd.DataFrame(columns=required_columns)
+        
+        return risk_data
+        
+    except MemoryError:
+        # 메모리 부족 시 분할 처리로 재시도
+        if not chunk_rows:
+            return create_tariff_risk_analysis(df, chunk_rows=MIN_CHUNK_ROWS, hs_index=hs_index,
+                                               spec_columns=spec_columns)
+        notify('error', "세율 Risk 분석 중 메모리가 부족합니다.")
+        return pd.DataFrame()
+    except Exception as e:
+        notify('error', f"세율 Risk 분석 중 오류 발생: {e}")
+        return pd.DataFrame()
+
+# 단가 Risk 분석 컬럼
+PRICE_RISK_COLUMNS = ['규격1', '세번부호', '거래구분', '결제방법', '수리일자', '수입신고번호',
+                      '단가', '결제통화단위', '거래품명', 
+                      '란번호', '행번호', '수량_1', '수량단위_1', '금액']
+
+def create_price_risk_analysis(df, rule_set=None, chunk_rows=None, spec_columns=None):
+    """단가 Risk 분석 (chunk_rows 지정 시 분할 처리, spec_columns: 규격 그룹 기준 컬럼, 기본 규격1)"""
+    try:
+        # 필요한 컬럼 체크
+        required_columns = PRICE_RISK_COLUMNS
+        
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            available_columns = [col for col in required_columns if col in df.columns]
+            if '단가' not in available_columns:
+                return pd.DataFrame()
+        else:
+            available_columns = required_columns
+        
+        # 복합 규격 키: 선택한 규격 컬럼을 행별 해시 하나로 묶어 정수 키로 그룹화
+        composite = is_composite(spec_columns) and '규격1' in df.columns
+        keys = spec_key(df, spec_columns) if composite else None
+        
+        def prepare(frame, frame_keys=None):
+            # 단가를 숫자형으로 변환 (복합 키는 이 복사본에 추가해 전체 데이터를 한 번만 복사)
+            frame = frame.copy()
+            if frame_keys is not None:
+                frame[SPEC_KEY_COLUMN] = frame_keys
+            frame['단가'] = pd.to_numeric(frame['단가'].fillna(0), errors='coerce').fillna(0)
+            
+            # 단가가 0보다 큰 데이터만 분석 (복합 키는 규격 컬럼이 모두 빈 행 제외)
+            keep = frame['단가'] > 0
+            if composite:
+                keep &= frame[SPEC_KEY_COLUMN] != MISSING_KEY
+            return frame[keep]
+        
+        if chunk_rows:
+            df_work = df.iloc[:0].assign(**{SPEC_KEY_COLUMN: keys[:0]}) if composite else df.iloc[:0]
+        else:
+            df_work = prepare(df, keys)
+            if len(df_work) == 0:
+                return pd.DataFrame()
+        
+        # 그룹화 기준 (규격1, 복합 키면 규격키 + 규격 컬럼별 첫 값)
+        group_columns = [SPEC_KEY_COLUMN] if composite else ['규격1']
+        
+        # 집계 함수 정의
+        agg_dict = {
+            '세번부호': 'first',
+            '거래구분': 'first',
+            '결제방법': 'first',
+            '수리일자': ['min', 'max'],
+            '수입신고번호': ['min', 'max'],
+            '단가': ['mean', 'max', 'min', 'std', 'count'],
+            '결제통화단위': 'first',
+            '거래품명': 'first',
+            '란번호': 'first',
+            '행번호': 'first',
+            '수량_1': 'first',
+            '수량단위_1': 'first',
+            '금액': 'sum'
+        }
+        
+        # 존재하는 컬럼만 선택
+        available_group_columns = [col for col in group_columns if col in df_work.columns]
+        available_agg_dict = {col: agg_dict[col] for col in agg_dict if col in df_work.columns}
+        if composite:
+            available_agg_dict = {**{col: 'first' for col in spec_columns if col in df_work.columns},
+                                  **available_agg_dict}
+        
+        if chunk_rows:
+            # 청크별 부분 집계 후 병합 (평균/표준편차는 병렬 분산 공식으로 결합)
+            if '규격1' not in df.columns:
+                return pd.DataFrame()
+            grouped = chunked_groupby_agg(df, group_columns[0], available_agg_dict, chunk_rows, prepare=prepare,
+                                          keys=keys)
+            if len(grouped) == 0:
+                return pd.DataFrame()
+        else:
+            grouped = df_work.groupby(available_group_columns).agg(available_agg_dict).reset_index()
+        
+        # 집계 후 컬럼명 재설정
+        grouped_columns = list(grouped.columns)
+        new_columns = []
+        for col in grouped_columns:
+            if isinstance(col, tuple):
+                if col[0] == '단가' and col[1] == 'mean':
+                    new_columns.append('평균단가')
+                elif col[0] == '단가' and col[1] == 'max':
+                    new_columns.append('최고단가')
+                elif col[0] == '단가' and col[1] == 'min':
+                    new_columns.append('최저단가')
+                elif col[0] == '단가' and col[1] == 'std':
+                    new_columns.append('단가표준편차')
+                elif col[0] == '단가' and col[1] == 'count':
+                    new_columns.append('데이터수')
+                elif col[0] == '수리일자' and col[1] == 'min':
+                    new_columns.append('Min 수리일자')
+                elif col[0] == '수리일자' and col[1] == 'max':
+                    new_columns.append('Max 수리일자')
+                elif col[0] == '수입신고번호' and col[1] == 'min':
+                    new_columns.append('Min 신고번호')
+                elif col[0] == '수입신고번호' and col[1] == 'max':
+                    new_columns.append('Max 신고번호')
+                else:
+                    if col[1] in ('first', ''):
+                        new_columns.append(col[0])
+                    elif col[1] == 'sum':
+                        new_columns.append(col[0])
+                    else:
+                        new_columns.append(f'{col[0]}_{col[1]}')
+            else:
+                new_columns.append(col)
+        grouped.columns = new_columns
+        
+        # 복합 키: 해시 대신 표시용 규격키 (규격 컬럼별 첫 값 결합)
+        if composite:
+            grouped[SPEC_KEY_COLUMN] = spec_label(grouped, spec_columns)
+        
+        # 위험도 계산
+        grouped['단가편차율'] = np.where(
+            grouped['평균단가'] > 0,
+            (grouped['최고단가'] - grouped['최저단가']) / grouped['평균단가'],
+            0
+        )
+        
+        # 위험도 분류 (price_risk_levels 규칙: 50%/30%/10% 초과 구간)
+        grouped['위험도'] = classify_price_risk(grouped['단가편차율'], grouped['평균단가'], rule_set)
+        
+        # 비고 생성
+        grouped['비고'] = grouped.apply(lambda row: 
+            f'평균단가 확인 필요' if row['평균단가'] == 0 
+            else f'단가편차: {row["단가편차율"]*100:.1f}%', axis=1
+        )
+        
+        return grouped
+        
+    except MemoryError:
+        # 메모리 부족 시 분할 처리로 재시도
+        if not chunk_rows:
+            return create_price_risk_analysis(df, rule_set, chunk_rows=MIN_CHUNK_ROWS, spec_columns=spec_columns)
+        notify('error', "단가 Risk 분석 중 메모리가 부족합니다.")
+        return pd.DataFrame()
+    except Exception as e:
+        notify('error', f"단가 Risk 분석 중 오류 발생: {str(e)}")
+        return pd.DataFrame()
+
+def create_price_drift_analysis(df, window_days=DEFAULT_WINDOW_DAYS, threshold=DEFAULT_DRIFT_THRESHOLD):
+    """단가 변동 분석 (수리일자 기준 직전 구간 평균 대비 변동률이 기준을 넘는 행)"""
+    try:
+        missing_columns = [col for col in ['규격1', '수리일자', '단가'] if col not in df.columns]
+        if missing_columns:
+            return pd.DataFrame()
+        
+        drift = detect_price_drift(df, window_days=window_days, threshold=threshold)
+        if len(drift) == 0:
+            return pd.DataFrame()
+        
+        # 비고 생성
+        drift['비고'] = (
+            f'직전 {window_days}일 평균 대비 ' + drift['변동방향'] + ' '
+            + (drift['변동률'].abs() * 100).round(1).astype(str) + '%'
+        )
+        return drift
+        
+    except Exception as e:
+        notify('error', f"단가 변동 분석 중 오류 발생: {str(e)}")
+        return pd.DataFrame()
+
+def create_spec_history_analysis(df, upload=None, pending=None):
+    """규격1 분류 이력 대조 (과거 업로드에서만 쓰인 세번부호가 있는 규격1)
+
+    Args:
+        upload: {'key': 파일 내용 해시, 'file_name': 파일명} (있으면 대조 후 이번 업로드를 이력에 누적)
+        pending: dict이면 누적하지 않고 누적할 요약만 pending['history']에 보관 (apply_upload_writes로 나중에 누적)
+    """
+    try:
+        if not {'규격1', '세번부호'} <= set(df.columns):
+            return pd.DataFrame()
+        
+        classifications = summarize_classifications(df)
+        conflicts = check_against_history(classifications)
+        if pending is not None:
+            pending['history'] = {'classifications': classifications, 'rows': len(df)}
+        elif upload:
+            record_upload(classifications, upload['key'], upload.get('file_name'), len(df))
+        return conflicts
+        
+    except Exception as e:
+        notify('error', f"규격1 분류 이력 대조 중 오류 발생: {str(e)}")
+        return pd.DataFrame()
+
+def create_duplicate_analysis(df, window_days=DEFAULT_SPLIT_WINDOW_DAYS):
+    """중복/분할 신고 의심 분석 (B/L번호+규격1+금액 중복, 무역거래처상호+거래품명 window_days일 이내 반복)"""
+    try:
+        if '수입신고번호' not in df.columns:
+            return pd.DataFrame()
+        
+        duplicates = detect_duplicates(df, window_days=window_days)
+        if len(duplicates) == 0:
+            return pd.DataFrame()
+        return duplicates
+        
+    except Exception as e:
+        notify('error', f"중복/분할 신고 탐지 중 오류 발생: {str(e)}")
+        return pd.DataFrame()
+
+def create_summary_analysis(df_original, rule_masks=None, rule_set=None, decl_index=None,
+                            distinct_mode=DISTINCT_EXACT):
+    """Summary 분석
+
+    Args:
+        decl_index: 수입신고 계층 인덱스 (있으면 신고 건수를 정수 코드로 집계)
+        distinct_mode: 'exact'(기본) 또는 'sketch' (HyperLogLog로 신고 건수를 한 번에 근사 집계)
+    """
+    try:
+        summary_data = {}
+        risk_columns = all(col in df_original.columns for col in ['관세실행세율', '세율구분', '수입신고번호'])
+        
+        # 근사 모드: 전체/거래구분별/세율구분별/Risk별 신고 건수를 스케치 한 번으로 추정
+        sketch_counts = None
+        if distinct_mode == DISTINCT_SKETCH and '수입신고번호' in df_original.columns:
+            risk_masks = None
+            if risk_columns:
+                risk_masks = dict(zip(RISK_LABELS, [rule_mask(df_original, 'zero_risk', rule_masks),
+                                                    rule_mask(df_original, 'eight_percent', rule_masks)]))
+            sketch_counts = build_summary_sketch(df_original, risk_masks).counts()
+            summary_data['집계방식'] = 'HyperLogLog 근사 (상대 표준오차 약 0.8%)'
+        
+        # 1. 전체 신고 건수
+        if sketch_counts is not None:
+            total_declarations = sketch_counts['전체']
+        elif decl_index is not None:
+            total_declarations = count_declarations(decl_index)
+        elif '수입신고번호' in df_original.columns:
+            total_declarations = df_original['수입신고번호'].nunique()
+        else:
+            total_declarations = len(df_original)
+        summary_data['전체 신고 건수'] = total_declarations
+        
+        # 2. 거래구분별 분석
+        if '거래구분' in df_original.columns and sketch_counts is not None:
+            counts = sketch_counts['거래구분']
+            trade_type_analysis = pd.DataFrame({
+                '거래구분': list(counts.index) + ['총계'],
+                '수입신고번호': list(counts.to_numpy()) + [total_declarations],
+            })
+        elif '거래구분' in df_original.columns and decl_index is not None:
+            counts, total = declaration_counts_by(decl_index, df_original['거래구분'])
+            trade_type_analysis = pd.DataFrame({
+                '거래구분': list(counts.index) + ['총계'],
+                '수입신고번호': list(counts.to_numpy()) + [total],
+            })
+        elif '거래구분' in df_original.columns and '수입신고번호' in df_original.columns:
+            trade_type_analysis = pd.pivot_table(df_original, 
+                index=['거래구분'],
+                values='수입신고번호',
+                aggfunc='nunique',
+                margins=True,
+                margins_name='총계'
+            ).reset_index()
+        else:
+            trade_type_analysis = pd.DataFrame({
+                '거래구분': ['데이터 없음'],
+                '수입신고번호': [0]
+            })
+        
+        # 3. 세율구분별 분석
+        if '세율구분' in df_original.columns and (sketch_counts is not None or decl_index is not None):
+            if sketch_counts is not None:
+                counts = sketch_counts['세율구분']
+            else:
+                counts, _ = declaration_counts_by(decl_index, df_original['세율구분'])
+            rate_type_analysis = pd.DataFrame({'세율구분': counts.index, '수입신고번호': counts.to_numpy()})
+            total_row = {'세율구분': '총계', '수입신고번호': rate_type_analysis['수입신고번호'].sum()}
+            rate_type_analysis = pd.concat([rate_type_analysis, pd.DataFrame([total_row])], ignore_index=True)
+        elif '세율구분' in df_original.columns and '수입신고번호' in df_original.columns:
+            rate_type_analysis = pd.pivot_table(df_original,
+                index='세율구분',
+                values='수입신고번호',
+                aggfunc='nunique'
+            ).reset_index()
+            # 총계 추가
+            total_row = {'세율구분': '총계', '수입신고번호': rate_type_analysis['수입신고번호'].sum()}
+            rate_type_analysis = pd.concat([rate_type_analysis, pd.DataFrame([total_row])], ignore_index=True)
+        else:
+            rate_type_analysis = pd.DataFrame({
+                '세율구분': ['데이터 없음'],
+                '수입신고번호': [0]
+            })
+        
+        # 4. Risk 분석 요약
+        if risk_columns and sketch_counts is not None:
+            zero_risk_count, eight_percent_count = (int(count) for count in sketch_counts['Risk'])
+        elif risk_columns:
+            zero_risk_mask = rule_mask(df_original, 'zero_risk', rule_masks)
+            eight_percent_mask = rule_mask(df_original, 'eight_percent', rule_masks)
+            if decl_index is not None:
+                zero_risk_count = count_declarations(decl_index, zero_risk_mask)
+                eight_percent_count = count_declarations(decl_index, eight_percent_mask)
+            else:
+                zero_risk_count = df_original.loc[zero_risk_mask, '수입신고번호'].nunique()
+                eight_percent_count = df_original.loc[eight_percent_mask, '수입신고번호'].nunique()
+        else:
+            zero_risk_count = 0
+            eight_percent_count = 0
+        
+        risk_analysis = pd.DataFrame({
+            'Risk 유형': ['0% Risk', '8% 환급 검토'],
+            '신고건수': [zero_risk_count, eight_percent_count],
+            '비율(%)': [
+                zero_risk_count/total_declarations*100 if total_declarations > 0 else 0,
+                eight_percent_count/total_declarations*100 if total_declarations > 0 else 0
+            ]
+        })
+        
+        summary_data['거래구분별'] = trade_type_analysis
+        summary_data['세율구분별'] = rate_type_analysis
+        summary_data['Risk분석'] = risk_analysis
+        
+        # 5. 규칙별 해당 건수 (사용자 규칙 포함)
+        if rule_masks:
+            summary_data['규칙별'] = summarize_rule_matches(
+                df_original, rule_masks, rule_set,
+                count_keys=(lambda mask: count_declarations(decl_index, mask)) if decl_index is not None else None
+            )
+        
+        # 6. 신고 구조 (신고/란/행 수, 란결제금액 대비 금액 합계 불일치)
+        if decl_index is not None:
+            summary_data['신고구조'] = declaration_structure(decl_index)
+        
+        return summary_data
+        
+    except Exception as e:
+        notify('error', f"Summary 분석 중 오류 발생: {str(e)}")
+        return {}
+
+def create_excel_file(df_original, eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data,
+                      extra_sheets=None):
+    """엑셀 파일 생성 (캐시된 템플릿 + 시트별 일괄 기록, extra_sheets: 추가 분석 [(시트명, DataFrame)])"""
+    try:
+        return build_excel_report(
+            df_original, eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data,
+            extra_sheets=extra_sheets
+        )
+        
+    except Exception as e:
+        notify('error', f"엑셀 파일 생성 중 오류 발생: {str(e)}")
+        return None
+
+def create_word_document(eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data,
+                         report_tables=None):
+    """워드 문서 생성 (report_tables: aggregate_report_tables 결과, 없으면 여기서 집계)"""
+    try:
+        if report_tables is None:
+            report_tables = aggregate_report_tables(
+                eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data
+            )
+        
+        doc = Document()
+        
+        # 제목 추가
+        doc.add_heading('수입신고 분석 보고서', 0)
+        
+        # 날짜 추가
+        doc.add_paragraph(datetime.datetime.now().strftime("%Y년 %m월 %d일"))
+        
+        # 요약표/차트 섹션
+        write_report_sections(doc, report_tables, summary_data)
+        
+        # 워드 파일을 메모리에서 생성
+        doc_output = io.BytesIO()
+        doc.save(doc_output)
+        doc_output.seek(0)
+        return doc_output.getvalue()
+        
+    except Exception as e:
+        notify('error', f"워드 문서 생성 중 오류 발생: {str(e)}")
+        return None
+
+# 분석 단계: (분석 옵션, 결과 키, 진행 메시지)
+ANALYSIS_STEPS = [
+    ("Summary", 'summary', "📊 Summary 분석 중..."),
+    ("8% 환급 검토", 'eight_percent', "💰 8% 환급 검토 분석 중..."),
+    ("0% Risk", 'zero_risk', "🟢 0% Risk 분석 중..."),
+    ("세율 Risk", 'tariff_risk', "⚠️ 세율 Risk 분석 중..."),
+    ("단가 Risk", 'price_risk', "💲 단가 Risk 분석 중..."),
+    ("단가 변동", 'price_drift', "📈 단가 변동 분석 중..."),
+    ("분류 이력", 'spec_history', "🗂️ 규격1 분류 이력 대조 중..."),
+    ("중복/분할 신고", 'duplicates', "🧾 중복/분할 신고 탐지 중..."),
+]
+ANALYSIS_OPTIONS = [option for option, _, _ in ANALYSIS_STEPS]
+
+def resolve_rule_set(rules_option):
+    """규칙 옵션({'text', 'format'} 또는 None)으로 규칙 집합 생성"""
+    if not rules_option:
+        return load_rule_set()
+    return parse_rule_set(rules_option['text'], rules_option['format'])
+
+def run_analyses(df_original, analysis_options, rule_set, metrics, report=None, memory_budget_mb=None,
+                 drift_settings=None, distinct_mode=DISTINCT_EXACT, upload=None, duplicate_settings=None,
+                 spec_columns=None, pending_writes=None):
+    """선택된 분석 실행
+
+    Args:
+        report: report(진행률 0~1, 메시지) 진행 상황 콜백
+        drift_settings: 단가 변동 분석 설정 {'window_days', 'threshold'}
+        distinct_mode: Summary 신고 건수 집계 방식 ('exact' 또는 'sketch')
+        upload: 업로드 정보 {'key', 'file_name'} (분류 이력 누적, 결과 스냅샷 저장에 사용)
+        duplicate_settings: 중복/분할 신고 탐지 설정 {'window_days'}
+        spec_columns: 세율 Risk / 단가 Risk 규격 그룹 기준 컬럼 (기본: 규격1)
+        pending_writes: dict이면 분류 이력 누적/스냅샷 저장을 하지 않고 누적할 값만 보관
+                        (작업 큐에서 정식 작업으로 확정될 때 apply_upload_writes로 기록)
+
+    Returns:
+        (결과 dict, 메모리 실행 계획)
+    """
+    report = report or (lambda progress, message: None)
+    results = {}
+    
+    report(0, "🚀 분석을 시작합니다...")
+    
+    # 모든 규칙을 공유 컬럼에 대해 한 번에 평가
+    rows_in = len(df_original)
+    rule_masks = metrics.track('evaluate_rules', evaluate_rules, df_original, rule_set, rows_in=rows_in)
+    
+    # 메모리 예산 대비 실행 방식 결정 (초과 시 분할 처리)
+    memory_plan = plan_execution(df_original, {
+        name: columns for name, columns in [
+            ('세율 Risk', TARIFF_RISK_COLUMNS),
+            ('단가 Risk', PRICE_RISK_COLUMNS + [col for col in spec_columns or () if col not in PRICE_RISK_COLUMNS]),
+        ] if name in analysis_options
+    }, memory_budget_mb)
+    chunk_rows = {name: entry['chunk_rows'] for name, entry in memory_plan['analyses'].items()}
+    
+    # 수입신고 계층 인덱스 (업로드당 한 번, 신고 건수 집계/신고번호 조회용)
+    decl_index = None
+    if '수입신고번호' in df_original.columns:
+        decl_index = metrics.track('build_declaration_index', build_declaration_index, df_original, rows_in=rows_in)
+        results['declarations'] = lookup_tables(decl_index)
+    
+    # 데이터 품질 검사 (컬럼 매핑/기본값, 란 금액 합계, 세번부호 형식, 세율 범위)
+    results['quality'] = metrics.track('validate_dataset', validate_dataset, df_original, decl_index, rows_in=rows_in)
+    
+    # 세번부호 계층 인덱스 (업로드당 한 번)
+    hs_index = None
+    if '세율 Risk' in analysis_options and '세번부호' in df_original.columns:
+        hs_index = metrics.track('build_hs_index', build_hs_index, df_original['세번부호'], rows_in=rows_in)
+    
+    analyses = {
+        'summary': ('create_summary_analysis',
+                    lambda: create_summary_analysis(df_original, rule_masks, rule_set, decl_index, distinct_mode)),
+        'eight_percent': ('create_eight_percent_refund_analysis',
+                          lambda: create_eight_percent_refund_analysis(df_original, rule_masks)),
+        'zero_risk': ('create_zero_percent_risk_analysis',
+                      lambda: create_zero_percent_risk_analysis(df_original, rule_masks)),
+        'tariff_risk': ('create_tariff_risk_analysis',
+                        lambda: create_tariff_risk_analysis(df_original, chunk_rows.get('세율 Risk'), hs_index,
+                                                           spec_columns)),
+        'price_risk': ('create_price_risk_analysis',
+                       lambda: create_price_risk_analysis(df_original, rule_set, chunk_rows.get('단가 Risk'),
+                                                         spec_columns)),
+        'price_drift': ('create_price_drift_analysis',
+                        lambda: create_price_drift_analysis(df_original, **(drift_settings or {}))),
+        'spec_history': ('create_spec_history_analysis',
+                         lambda: create_spec_history_analysis(df_original, upload, pending_writes)),
+        'duplicates': ('create_duplicate_analysis',
+                       lambda: create_duplicate_analysis(df_original, **(duplicate_settings or {}))),
+    }
+    
+    total_analyses = len(analysis_options)
+    current_step = 0
+    for option, key, message in ANALYSIS_STEPS:
+        if option not in analysis_options:
+            continue
+        current_step += 1
+        report(current_step / total_analyses, f"{message} ({current_step}/{total_analyses})")
+        stage_name, func = analyses[key]
+        results[key] = metrics.track(stage_name, func, rows_in=rows_in)
+    
+    # 다음 분석과 비교할 수 있도록 세율 Risk / 단가 Risk 결과 보관
+    if upload and pending_writes is None:
+        for warning in metrics.track('save_result_snapshot', apply_upload_writes, results, metrics.run_id, upload):
+            notify('warning', warning)
+    
+    report(1.0, "🎉 모든 분석이 완료되었습니다!")
+    return results, memory_plan
+
+def apply_upload_writes(results, run_id, upload, pending=None):
+    """업로드의 영구 기록: 미뤄 둔 분류 이력 누적 + 결과 스냅샷 저장 (경고 메시지 목록 반환)"""
+    warnings = []
+    history = (pending or {}).get('history')
+    if history is not None:
+        try:
+            record_upload(history['classifications'], upload['key'], upload.get('file_name'), history['rows'])
+        except Exception as e:
+            warnings.append(f"분류 이력 누적 실패: {e}")
+    try:
+        save_snapshot(results, run_id, upload)
+    except OSError as e:
+        warnings.append(f"결과 스냅샷 저장 실패 (이전 결과 비교에서 제외됩니다): {e}")
+    return warnings
+
+def build_reports(df_original, results, metrics):
+    """Excel/Word 결과 파일 생성"""
+    frames = [
+        results.get('eight_percent', pd.DataFrame()),
+        results.get('zero_risk', pd.DataFrame()),
+        results.get('tariff_risk', pd.DataFrame()),
+        results.get('price_risk', pd.DataFrame()),
+    ]
+    frames = [frame if frame is not None else pd.DataFrame() for frame in frames]
+    summary = results.get('summary', {})
+    extra_sheets = []
+    price_drift = results.get('price_drift')
+    if price_drift is not None and not price_drift.empty:
+        extra_sheets.append(('단가 변동', price_drift))
+    spec_history = results.get('spec_history')
+    if spec_history is not None and not spec_history.empty:
+        extra_sheets.append(('분류 이력', spec_history))
+    duplicates = results.get('duplicates')
+    if duplicates is not None and not duplicates.empty:
+        extra_sheets.append(('중복 신고', duplicates))
+    quality = results.get('quality')
+    if quality is not None and not quality['summary'].empty:
+        extra_sheets.append(('데이터 품질', quality['summary']))
+    excel_data = metrics.track('create_excel_file', create_excel_file, df_original, *frames, summary,
+                               extra_sheets=extra_sheets)
+    # 보고서용 요약표를 먼저 집계해 Word 작성은 요약표만 사용
+    report_tables = metrics.track('aggregate_report_tables', aggregate_report_tables, *frames, summary)
+    word_data = metrics.track('create_word_document', create_word_document, *frames, summary,
+                              report_tables=report_tables)
+    return excel_data, word_data
+
+def run_analysis_job(input_path, options, report):
+    """백그라운드 작업: 파일 로드 → 분석 → 결과 파일 생성
+
+    분류 이력 누적/결과 스냅샷 저장은 하지 않고 결과에 담아 두며,
+    작업 큐가 정식 작업으로 확정할 때 commit_analysis_job이 기록합니다 (예측 작업은 부작용 없음).
+    """
+    metrics = PipelineMetrics(context={'file': options.get('file_name'), 'mode': 'background'})
+    
+    report(0.02, "📂 엑셀 파일 로드 중...")
+    # 같은 파일을 보고 있는 세션이 있으면 그 데이터를 공유 (작업이 끝나면 참조 해제)
+    holder = f'job:{uuid.uuid4().hex}'
+    with open(input_path, 'rb') as f:
+        key = dataset_key(f.read())
+    # 작업자 스레드의 경고/오류는 화면에 닿지 않으므로 모아서 결과와 함께 표시
+    with collect_notices() as notices:
+        try:
+            with metrics.stage('ingest') as record:
+                df_original, loaded = load_shared_dataset(input_path, key, holder, metrics=metrics)
+                record['rows_out'] = len(df_original) if df_original is not None else 0
+                record['dataset_cache'] = 'miss' if loaded else 'hit'
+            if df_original is None:
+                raise ValueError(" ".join(
+                    ["엑셀 파일을 읽을 수 없습니다. 파일 형식을 확인해주세요."] + [message for _, message in notices]
+                ))
+            
+            # 로드 20%, 분석 65%, 결과 파일 생성 15% 비중으로 진행률 환산
+            upload = {'key': key, 'file_name': options.get('file_name')}
+            pending_writes = {}
+            results, memory_plan = run_analyses(
+                df_original, options['analyses'], resolve_rule_set(options.get('rules')), metrics,
+                lambda progress, message: report(0.2 + 0.65 * progress, message),
+                drift_settings=options.get('price_drift'),
+                distinct_mode=options.get('distinct_mode', DISTINCT_EXACT),
+                upload=upload,
+                duplicate_settings=options.get('duplicates'),
+                spec_columns=options.get('spec_columns'),
+                pending_writes=pending_writes
+            )
+            
+            report(0.85, "📥 결과 파일 생성 중...")
+            excel_data, word_data = build_reports(df_original, results, metrics)
+        finally:
+            get_dataset_store().release(holder)
+    
+    return {
+        'results': results,
+        'excel': excel_data,
+        'word': word_data,
+        'metrics': metrics.records,
+        'run_id': metrics.run_id,
+        'memory_plan': memory_plan,
+        'rows': len(df_original),
+        'columns': len(df_original.columns),
+        'upload': upload,
+        'pending_writes': pending_writes,
+        'notices': notices,
+    }
+
+def commit_analysis_job(job_result, state):
+    """작업 확정: 미뤄 둔 분류 이력 누적과 결과 스냅샷 저장 (경고 메시지 목록 반환)
+
+    일반 작업은 완료 직후, 예측 작업은 '분석 시작'으로 정식 제출될 때 작업 큐가 한 번 호출합니다.
+    """
+    return apply_upload_writes(job_result['results'], job_result['run_id'], job_result['upload'],
+                               job_result.get('pending_writes'))
+
+def analysis_queue():
+    """분석 작업 큐 (run_analysis_job 실행, commit_analysis_job으로 확정)"""
+    return get_job_queue(run_analysis_job, commit_analysis_job)
@@ -0,0 +1,365 @@
+"""로컬 HTTP 분석 API (ERP 등 외부 시스템 연동용)
+
+Streamlit 화면과 같은 작업 디렉터리(ANALYSIS_JOB_DIR)와 작업 함수(analysis_engine.run_analysis_job)를
+사용하므로 같은 파일/옵션의 결과는 화면과 API가 함께 재사용합니다. 작업은 디렉터리 잠금을 잡은 한 프로세스
+(먼저 시작한 화면 또는 API 서버)에서만 실행되고, 다른 프로세스는 제출/조회만 합니다 (job_queue 참고).
+
+    POST /jobs                          워크북 업로드 (multipart: file, 선택: analyses, rules, distinct_mode,
+                                        drift_window_days, drift_threshold, split_window_days,
+                                        spec_columns) → 202 {job_id, ...}
+    GET  /jobs/{job_id}                 진행 상황 (status, progress, message, 결과 목록)
+    GET  /jobs/{job_id}/results/{name}  결과 표 스트리밍 (?offset=0&limit=10000&format=json|arrow)
+    GET  /jobs/{job_id}/excel           Excel 리포트 (완료 전이면 202 + 진행 상황)
+    GET  /jobs/{job_id}/word            Word 리포트 (완료 전이면 202 + 진행 상황)
+    GET  /health
+
+- 동시 처리 제한: 업로드/결과/리포트 요청은 API_MAX_CONCURRENT(기본 8)개까지, 초과 시 429
+- 클라이언트(X-Client-Id 헤더)별 대기/실행 중 작업은 API_MAX_ACTIVE_JOBS(기본 4)개까지, 초과 시 429
+- 완료된 결과는 작업 디렉터리에 보관되고, 최근 조회한 API_RESULT_CACHE(기본 4)개 작업은 메모리에 유지
+- format=arrow는 Arrow IPC 스트림(application/vnd.apache.arrow.stream)으로 pyarrow가 필요합니다
+
+실행:
+    python api_server.py --host 127.0.0.1 --port 8600
+"""
+import argparse
+import asyncio
+import collections
+import io
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from analysis_engine import ANALYSIS_OPTIONS, analysis_queue, resolve_rule_set
+from data_export import available_export_formats
+from distinct_sketch import DISTINCT_EXACT, DISTINCT_SKETCH
+from duplicate_detection import DEFAULT_SPLIT_WINDOW_DAYS
+from job_queue import ACTIVE_STATUSES, STATUS_DONE
+from price_drift import DEFAULT_DRIFT_THRESHOLD, DEFAULT_WINDOW_DAYS
+from rule_engine import RuleError
+from spec_key import SPEC_KEY_COLUMNS, is_composite, resolve_spec_columns
+
+DEFAULT_MAX_CONCURRENT = 8
+DEFAULT_MAX_ACTIVE_JOBS = 4
+DEFAULT_RESULT_CACHE = 4
+
+# 결과 페이지 기본/최대 행수, 스트리밍 청크 행수
+DEFAULT_PAGE_ROWS = 10_000
+MAX_PAGE_ROWS = 1_000_000
+STREAM_CHUNK_ROWS = 5_000
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+REPORTS = {
+    'excel': ('excel', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'word': ('word', 'docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+
+# 동시 처리 제한 대상 경로 (상태 조회/health 제외)
+_LIMITED_PATH = re.compile(r'^/jobs$|^/jobs/[^/]+/(results/.+|excel|word)$')
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+class ConcurrencyLimitMiddleware:
+    """무거운 요청의 동시 처리 수 제한 (스트리밍 응답이 끝날 때까지 점유, 초과 시 429)"""
+
+    def __init__(self, asgi_app, limit):
+        self.app = asgi_app
+        self.limit = limit
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not _LIMITED_PATH.match(scope['path']):
+            await self.app(scope, receive, send)
+            return
+        if self.active >= self.limit:
+            response = JSONResponse({'error': '동시 요청 수 제한을 초과했습니다. 잠시 후 다시 시도하세요.'},
+                                    status_code=429, headers={'Retry-After': '5'})
+            await response(scope, receive, send)
+            return
+        self.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active -= 1
+
+
+class ResultCache:
+    """최근 조회한 작업 결과의 메모리 LRU (디스크 pickle 반복 로드 방지)"""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, queue, job_id):
+        with self._lock:
+            if job_id in self._items:
+                self._items.move_to_end(job_id)
+                return self._items[job_id]
+        value = queue.load_results(job_id)
+        with self._lock:
+            self._items[job_id] = value
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+
+
+def result_tables(results):
+    """작업 결과 → {이름: DataFrame} (Summary/품질 표는 'summary.<표>', 'quality.<표>')"""
+    tables = {}
+    for key, value in results.items():
+        if isinstance(value, pd.DataFrame):
+            tables[key] = value
+        elif isinstance(value, dict):
+            for name, table in value.items():
+                if isinstance(table, pd.DataFrame):
+                    tables[f'{key}.{name}'] = table
+    return tables
+
+
+def _json_chunks(frame, job_id, name, offset, total):
+    """JSON 페이지를 청크 단위로 생성 (전체 페이지 문자열을 한 번에 만들지 않음)"""
+    head = {'job_id': job_id, 'result': name, 'offset': offset, 'limit': len(frame), 'total': total,
+            'columns': [str(col) for col in frame.columns]}
+    yield json.dumps(head, ensure_ascii=False)[:-1].encode('utf-8') + b', "rows": ['
+    for start in range(0, len(frame), STREAM_CHUNK_ROWS):
+        chunk = frame.iloc[start:start + STREAM_CHUNK_ROWS]
+        text = chunk.to_json(orient='values', force_ascii=False, date_format='iso')[1:-1]
+        if text:
+            yield (b',' if start else b'') + text.encode('utf-8')
+    yield b']}'
+
+
+def _arrow_chunks(frame):
+    """Arrow IPC 스트림을 청크(record batch) 단위로 생성"""
+    import pyarrow as pa
+
+    from data_export import _normalize_chunk
+
+    buffer = io.BytesIO()
+    writer = schema = None
+
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    for start in range(0, max(len(frame), 1), STREAM_CHUNK_ROWS):
+        table = pa.Table.from_pandas(_normalize_chunk(frame.iloc[start:start + STREAM_CHUNK_ROWS]),
+                                     preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            # 첫 청크가 전부 결측인 컬럼은 문자열로 간주 (data_export.write_parquet과 동일)
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            writer = pa.ipc.new_stream(buffer, schema)
+        writer.write_table(table.cast(schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+def _error(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+def create_app(queue=None, max_concurrent=None, max_active_jobs=None, result_cache=None):
+    """ASGI 앱 생성 (queue: 작업 큐, 기본은 analysis_engine의 프로세스 공용 큐)"""
+    queue = queue or analysis_queue()
+    max_active_jobs = max_active_jobs or _env_int('API_MAX_ACTIVE_JOBS', DEFAULT_MAX_ACTIVE_JOBS)
+    cache = ResultCache(result_cache or _env_int('API_RESULT_CACHE', DEFAULT_RESULT_CACHE))
+    owners = {}  # 클라이언트 → 대기/실행 중인 작업 ID (작업이 모두 끝난 클라이언트는 제거)
+    owners_lock = asyncio.Lock()
+
+    def job_state(job_id):
+        state = queue.get_state(job_id)
+        if state is None:
+            return None
+        body = {key: state.get(key) for key in ('job_id', 'file_name', 'status', 'progress', 'message',
+                                                'created', 'updated', 'finished')}
+        if state['status'] in ACTIVE_STATUSES:
+            body['queue_position'] = queue.queue_position(job_id)
+        body['links'] = {'self': f'/jobs/{job_id}', 'excel': f'/jobs/{job_id}/excel', 'word': f'/jobs/{job_id}/word'}
+        return body
+
+    def completed(job_id):
+        """완료된 작업 결과 (미완료면 (None, 응답))"""
+        state = queue.get_state(job_id)
+        if state is None:
+            return None, _error('작업을 찾을 수 없습니다.', 404)
+        if state['status'] != STATUS_DONE:
+            status_code = 202 if state['status'] in ACTIVE_STATUSES else 409
+            return None, JSONResponse(job_state(job_id), status_code=status_code)
+        return cache.get(queue, job_id), None
+
+    async def submit(request):
+        async with request.form() as form:
+            upload = form.get('file')
+            if upload is None or not hasattr(upload, 'read'):
+                return _error("'file' 필드로 엑셀 파일을 업로드하세요.", 400)
+            file_name = upload.filename or 'upload.xlsx'
+            if os.path.splitext(file_name)[1].lower() not in ('.xlsx', '.xls'):
+                return _error('엑셀 파일(.xlsx, .xls)만 지원합니다.', 400)
+            file_bytes = await upload.read()
+            fields = {key: value for key, value in form.items() if isinstance(value, str)}
+            rules_file = form.get('rules')
+            rules_option = None
+            if rules_file is not None and hasattr(rules_file, 'read'):
+                rules_option = {
+                    'text': (await rules_file.read()).decode('utf-8'),
+                    'format': os.path.splitext(rules_file.filename or '')[1].lstrip('.').lower() or 'json',
+                }
+
+        analyses = [name.strip() for name in fields.get('analyses', '').split(',') if name.strip()]
+        analyses = analyses or list(ANALYSIS_OPTIONS)
+        unknown = [name for name in analyses if name not in ANALYSIS_OPTIONS]
+        if unknown:
+            return _error(f'알 수 없는 분석: {unknown} (사용 가능: {ANALYSIS_OPTIONS})', 400)
+        distinct_mode = fields.get('distinct_mode', DISTINCT_EXACT)
+        if distinct_mode not in (DISTINCT_EXACT, DISTINCT_SKETCH):
+            return _error(f'distinct_mode는 {DISTINCT_EXACT} 또는 {DISTINCT_SKETCH}입니다.', 400)
+        drift_settings = None
+        if '단가 변동' in analyses:
+            try:
+                drift_settings = {
+                    'window_days': int(fields.get('drift_window_days') or DEFAULT_WINDOW_DAYS),
+                    'threshold': float(fields.get('drift_threshold') or DEFAULT_DRIFT_THRESHOLD),
+                }
+            except ValueError:
+                return _error('drift_window_days / drift_threshold는 숫자여야 합니다.', 400)
+        spec_columns = [name.strip() for name in fields.get('spec_columns', '').split(',') if name.strip()]
+        unknown = [name for name in spec_columns if name not in SPEC_KEY_COLUMNS]
+        if unknown:
+            return _error(f'알 수 없는 규격 컬럼: {unknown} (사용 가능: {SPEC_KEY_COLUMNS})', 400)
+        spec_columns = resolve_spec_columns(spec_columns)
+        duplicate_settings = None
+        if '중복/분할 신고' in analyses:
+            try:
+                duplicate_settings = {
+                    'window_days': int(fields.get('split_window_days') or DEFAULT_SPLIT_WINDOW_DAYS),
+                }
+            except ValueError:
+                return _error('split_window_days는 정수여야 합니다.', 400)
+        if rules_option:
+            try:
+                rule_set = resolve_rule_set(rules_option)
+            except (RuleError, ValueError) as e:
+                return _error(f'규칙 파일 오류: {e}', 400)
+            missing = [name for name in ('zero_risk', 'eight_percent') if name not in rule_set['rules']]
+            if missing:
+                return _error(f'필수 규칙이 없습니다: {missing}', 400)
+
+        owner = request.headers.get('x-client-id') or (request.client.host if request.client else 'anonymous')
+        async with owners_lock:
+            # 끝난 작업을 정리해 진행 중인 작업이 있는 클라이언트만 남김 (클라이언트 수만큼 계속 늘지 않도록)
+            for client in list(owners):
+                running = {job_id for job_id in owners[client]
+                           if (queue.get_state(job_id) or {}).get('status') in ACTIVE_STATUSES}
+                if running:
+                    owners[client] = running
+                else:
+                    del owners[client]
+            active = owners.get(owner, set())
+            if len(active) >= max_active_jobs:
+                return _error(f'진행 중인 작업이 {len(active)}개입니다 (최대 {max_active_jobs}개).', 429)
+            options = {'analyses': analyses, 'rules': rules_option, 'file_name': file_name,
+                       'price_drift': drift_settings, 'distinct_mode': distinct_mode,
+                       'duplicates': duplicate_settings,
+                       'spec_columns': spec_columns if is_composite(spec_columns) else None}
+            job_id = await asyncio.to_thread(queue.submit, file_bytes, file_name, options, owner=f'api:{owner}')
+            owners.setdefault(owner, set()).add(job_id)
+        return JSONResponse(job_state(job_id), status_code=202, headers={'Location': f'/jobs/{job_id}'})
+
+    async def status(request):
+        body = job_state(request.path_params['job_id'])
+        if body is None:
+            return _error('작업을 찾을 수 없습니다.', 404)
+        if body['status'] == STATUS_DONE:
+            job = await asyncio.to_thread(cache.get, queue, body['job_id'])
+            body['results'] = {name: len(frame) for name, frame in result_tables(job['results']).items()}
+            body['rows'] = job.get('rows')
+            body['notices'] = [{'level': level, 'message': message} for level, message in job.get('notices', [])]
+        return JSONResponse(body)
+
+    async def result(request):
+        job_id, name = request.path_params['job_id'], request.path_params['name']
+        job, pending = await asyncio.to_thread(completed, job_id)
+        if pending is not None:
+            return pending
+        tables = result_tables(job['results'])
+        if name not in tables:
+            return _error(f'결과가 없습니다: {name} (사용 가능: {sorted(tables)})', 404)
+        try:
+            offset = max(0, int(request.query_params.get('offset', 0)))
+            limit = min(MAX_PAGE_ROWS, max(1, int(request.query_params.get('limit', DEFAULT_PAGE_ROWS))))
+        except ValueError:
+            return _error('offset / limit은 정수여야 합니다.', 400)
+        frame = tables[name]
+        page = frame.iloc[offset:offset + limit]
+        headers = {'X-Total-Count': str(len(frame))}
+        if offset + limit < len(frame):
+            headers['Link'] = f'</jobs/{job_id}/results/{name}?offset={offset + limit}&limit={limit}>; rel="next"'
+
+        if request.query_params.get('format', 'json') == 'arrow':
+            if 'parquet' not in available_export_formats():
+                return _error('format=arrow에는 pyarrow 패키지가 필요합니다.', 406)
+            return StreamingResponse(_arrow_chunks(page), media_type=ARROW_MEDIA_TYPE, headers=headers)
+        return StreamingResponse(_json_chunks(page, job_id, name, offset, len(frame)),
+                                 media_type='application/json', headers=headers)
+
+    def report_endpoint(kind):
+        key, extension, media_type = REPORTS[kind]
+
+        async def endpoint(request):
+            job_id = request.path_params['job_id']
+            job, pending = await asyncio.to_thread(completed, job_id)
+            if pending is not None:
+                return pending
+            if not job.get(key):
+                return _error(f'{kind} 리포트를 생성하지 못했습니다.', 500)
+            file_name = f"import_analysis_{job_id}.{extension}"
+            return Response(job[key], media_type=media_type,
+                            headers={'Content-Disposition': f'attachment; filename="{file_name}"'})
+
+        return endpoint
+
+    async def health(request):
+        return JSONResponse({'status': 'ok', 'workers': queue.workers})
+
+    api = Starlette(routes=[
+        Route('/health', health),
+        Route('/jobs', submit, methods=['POST']),
+        Route('/jobs/{job_id}', status),
+        Route('/jobs/{job_id}/results/{name}', result),
+        Route('/jobs/{job_id}/excel', report_endpoint('excel')),
+        Route('/jobs/{job_id}/word', report_endpoint('word')),
+    ])
+    return ConcurrencyLimitMiddleware(api, max_concurrent or _env_int('API_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT))
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="수입신고 분석 HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
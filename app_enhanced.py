@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from docx import Document
 from docx.shared import Pt
 from docx.oxml import parse_xml
 import datetime
@@ -13,7 +11,34 @@ from docx.enum.text import WD_COLOR_INDEX
 import io
 import zipfile
 import time
+import uuid
 from tempfile import NamedTemporaryFile
+from analysis_engine import (
+    ANALYSIS_OPTIONS,
+    analysis_queue,
+    build_reports,
+    load_shared_dataset,
+    resolve_rule_set,
+    run_analyses,
+    set_notice_display,
+)
+from data_export import EXPORT_FORMATS, available_export_formats, create_export_archive, write_export_archive
+from data_quality import excel_row_table
+from classification_history import summarize_history_conflicts
+from dataset_store import DatasetHolder, dataset_key, get_dataset_store
+from distinct_sketch import DISTINCT_EXACT, DISTINCT_SKETCH
+from declaration_index import declaration_lines
+from fta_refund import fta_table_path, summarize_refunds
+from hs_index import build_hs_index, filter_by_prefix, hs_drilldown
+from duplicate_detection import DEFAULT_SPLIT_WINDOW_DAYS, summarize_duplicate_clusters
+from job_queue import ACTIVE_STATUSES, STATUS_CANCELLED, STATUS_DONE, STATUS_FAILED
+from memory_governor import estimate_upload_bytes, resolve_memory_budget_mb
+from perf_monitor import PipelineMetrics
+from price_drift import DEFAULT_DRIFT_THRESHOLD, DEFAULT_WINDOW_DAYS, summarize_drift
+from result_diff import diff_results, list_snapshots, load_snapshot
+from rule_engine import RuleError, load_rule_set
+from sample_preview import SAMPLE_PREVIEW_MIN_BYTES, build_sample_preview
+from spec_key import SPEC_KEY_COLUMNS, is_composite, resolve_spec_columns
 
 # 페이지 설정
 st.set_page_config(
@@ -35,968 +60,552 @@ st.markdown("---")
 st.sidebar.title("분석 옵션")
 st.sidebar.markdown("분석할 엑셀 파일을 업로드하고 원하는 분석을 선택하세요.")
 
-def read_excel_file(uploaded_file, progress_bar=None, status_text=None):
-    """업로드된 엑셀 파일 읽기"""
-    try:
-        if status_text:
-            status_text.text("📂 엑셀 파일 로드 중...")
-        if progress_bar:
-            progress_bar.progress(20)
-        
-        df = pd.read_excel(uploaded_file)
-        
-        if status_text:
-            status_text.text(f"📊 데이터 로드 완료: {len(df):,}행, {len(df.columns)}열")
-        if progress_bar:
-            progress_bar.progress(40)
-        
-        df.columns = df.columns.str.strip()  # 컬럼 이름의 공백 제거
-        
-        if status_text:
-            status_text.text("🔧 중복 컬럼명 처리 중...")
-        if progress_bar:
-            progress_bar.progress(50)
-        
-        # 중복된 컬럼명 처리
-        cols = pd.Series(df.columns)
-        duplicate_count = 0
-        
-        # 중복된 컬럼명이 있는지 확인
-        duplicated_cols = cols[cols.duplicated()].unique()
-        
-        if len(duplicated_cols) > 0:
-            # 중복된 각 컬럼에 대해 처리
-            for dup in duplicated_cols:
-                # 해당 컬럼이 나타나는 모든 인덱스 찾기
-                dup_indices = cols[cols == dup].index.tolist()
-                # 첫 번째는 그대로 두고, 나머지에 번호 추가
-                for i, idx in enumerate(dup_indices):
-                    if i > 0:  # 첫 번째가 아닌 경우에만 번호 추가
-                        cols.iloc[idx] = f"{dup}_{i}"
-                duplicate_count += 1
-            
-            # 변경된 컬럼명 적용
-            df.columns = cols.tolist()
-        
-        if duplicate_count > 0 and status_text:
-            status_text.text(f"⚠️ {duplicate_count}개의 중복 컬럼명 처리 완료")
-        
-        if progress_bar:
-            progress_bar.progress(70)
-        
-        if status_text:
-            status_text.text("🏷️ 컬럼 매핑 중...")
-        
-        # 1. 컬럼 존재 여부 확인 및 안전한 컬럼 매핑
-        try:
-            # 먼저 필요한 컬럼이 이미 있는지 확인
-            has_rate_type = '세율구분' in df.columns
-            has_tariff_rate = '관세실행세율' in df.columns
-            
-            if not has_rate_type or not has_tariff_rate:
-                # 컬럼 인덱스 기반 매핑 시도
-                column_list = df.columns.tolist()
-                
-                if len(column_list) > 71 and not has_tariff_rate:
-                    # 71번째 컬럼을 관세실행세율로 매핑
-                    if column_list[71] not in ['세율구분', '관세실행세율']:
-                        df.rename(columns={column_list[71]: '관세실행세율'}, inplace=True)
-                        has_tariff_rate = True
-                
-                if len(column_list) > 70 and not has_rate_type:
-                    # 70번째 컬럼을 세율구분으로 매핑
-                    if column_list[70] not in ['세율구분', '관세실행세율']:
-                        df.rename(columns={column_list[70]: '세율구분'}, inplace=True)
-                        has_rate_type = True
-            
-            # 없는 컬럼들은 기본값으로 생성
-            if not has_rate_type:
-                df['세율구분'] = 'A'
-            if not has_tariff_rate:
-                df['관세실행세율'] = 0
-                
-        except Exception as col_error:
-            if status_text:
-                status_text.text(f"⚠️ 컬럼 매핑 오류: 기본값으로 설정")
-            # 기본 컬럼들 생성
-            if '세율구분' not in df.columns:
-                df['세율구분'] = 'A'
-            if '관세실행세율' not in df.columns:
-                df['관세실행세율'] = 0
-        
-        if progress_bar:
-            progress_bar.progress(90)
-        
-        if status_text:
-            status_text.text("🔢 데이터 타입 변환 중...")
-        
-        # 2. 관세실행세율 컬럼을 숫자형으로 변환
-        try:
-            if '관세실행세율' in df.columns:
-                # 안전한 숫자형 변환
-                tariff_col = df['관세실행세율']
-                
-                # 이미 숫자형인 경우 그대로 사용
-                if pd.api.types.is_numeric_dtype(tariff_col):
-                    df['관세실행세율'] = tariff_col.fillna(0)
-                else:
-                    # 문자열인 경우 숫자로 변환 시도
-                    df['관세실행세율'] = pd.to_numeric(
-                        tariff_col.astype(str).str.replace(',', '').fillna('0'), 
-                        errors='coerce'
-                    ).fillna(0)
-        except Exception as convert_error:
-            if status_text:
-                status_text.text("⚠️ 숫자 변환 오류: 기본값 사용")
-            df['관세실행세율'] = 0
-        
-        if progress_bar:
-            progress_bar.progress(100)
-        
-        if status_text:
-            status_text.text("✅ 데이터 처리 완료!")
-        
-        return df
-    except Exception as e:
-        if status_text:
-            status_text.text(f"❌ 오류 발생: {str(e)}")
-        st.error(f"엑셀 파일 읽기 실패: {str(e)}")
-        st.error("파일 형식을 확인하거나 다른 파일을 시도해보세요.")
-        return None
+def show_notice(level, message):
+    """분석 경고/오류 하나를 화면에 표시 (level: st.warning/st.error 등의 이름)"""
+    getattr(st, level)(message)
 
-def process_data(df):
-    """데이터 전처리"""
-    try:
-        # 컬럼 이름의 공백 제거
-        df.columns = df.columns.str.strip()
-        
-        # 필요한 컬럼이 있는지 확인
-        required_columns = ['관세실행세율', '세율구분']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            st.warning(f"누락된 컬럼: {missing_columns}")
-            return None
+# 화면에서 직접 실행하는 분석의 경고/오류는 바로 표시
+set_notice_display(show_notice)
 
-        # 0% Risk 조건에 맞는 데이터 필터링
-        df_zero_risk = df[
-            (df['관세실행세율'] < 8) & 
-            (~df['세율구분'].astype(str).str.match(r'^F.{3}$'))  # F로 시작하는 4자리 코드 제외
-        ]
+def show_notices(notices):
+    """collect_notices로 모은 경고/오류 표시"""
+    for level, message in notices or ():
+        show_notice(level, message)
 
-        # '세율구분'이 4자리인 행 제외
-        df_filtered = df_zero_risk[df_zero_risk['세율구분'].apply(lambda x: len(str(x)) != 4)]
+def upload_dataset_key(uploaded_file):
+    """업로드 파일의 내용 해시 (스크립트가 다시 실행될 때마다 전체를 해시하지 않도록 file_id별로 세션에 보관)"""
+    cached = st.session_state.get('upload_dataset_key')
+    if cached and cached[0] == uploaded_file.file_id:
+        return cached[1]
+    key = dataset_key(uploaded_file.getvalue())
+    st.session_state['upload_dataset_key'] = (uploaded_file.file_id, key)
+    return key
 
-        return df_filtered
-        
-    except Exception as e:
-        st.error(f"데이터 전처리 중 오류 발생: {e}")
-        return None
 
-def create_eight_percent_refund_analysis(df):
-    """8% 환급 검토 분석"""
-    try:
-        # 필요한 컬럼만 선택
-        selected_columns = [
-            '수입신고번호',
-            '수리일자',
-            'B/L번호',
-            '세번부호', 
-            '세율구분',
-            '세율설명',
-            '관세실행세율',
-            '적출국코드',
-            '원산지코드',
-            'FTA사후환급 검토',
-            '규격1',
-            '규격2',
-            '규격3',
-            '성분1',
-            '성분2',
-            '성분3',
-            '실제관세액',
-            '결제방법',
-            '결제통화단위',
-            '무역거래처상호',
-            '무역거래처국가코드',
-            '거래품명',
-            '란번호',
-            '행번호',
-            '수량_1',
-            '수량단위_1',
-            '단가',
-            '금액',
-            '란결제금액',
-            '행별관세'
-        ]
-        
-        # 존재하는 컬럼만 선택
-        base_columns = [col for col in selected_columns 
-                       if col not in ['행별관세', 'FTA사후환급 검토'] and col in df.columns]
-        
-        # 원본 데이터를 복사하여 사용
-        df_work = df[base_columns].copy()
-        
-        # 데이터 전처리
-        df_work['세율구분'] = df_work['세율구분'].astype(str).str.strip()
-        df_work['관세실행세율'] = pd.to_numeric(
-            df_work['관세실행세율'].fillna(0), errors='coerce'
-        ).fillna(0)
-        df_work['실제관세액'] = pd.to_numeric(
-            df_work['실제관세액'].fillna(0), errors='coerce'
-        ).fillna(0)
-        
-        # 행별관세 계산에 필요한 컬럼들 전처리
-        if '금액' in df_work.columns:
-            df_work['금액'] = pd.to_numeric(
-                df_work['금액'].fillna(0), errors='coerce'
-            ).fillna(0)
-        
-        if '란결제금액' in df_work.columns:
-            df_work['란결제금액'] = pd.to_numeric(
-                df_work['란결제금액'].fillna(0), errors='coerce'
-            ).fillna(0)
-        
-        # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
-        if all(col in df_work.columns for col in ['실제관세액', '금액', '란결제금액']):
-            df_work['행별관세'] = np.where(
-                df_work['란결제금액'] != 0,
-                (df_work['실제관세액'] * df_work['금액']) / df_work['란결제금액'],
-                0
-            )
-        else:
-            df_work['행별관세'] = 0
-        
-        # FTA사후환급 검토 컬럼 계산
-        if '적출국코드' in df_work.columns and '원산지코드' in df_work.columns:
-            df_work['FTA사후환급 검토'] = df_work.apply(
-                lambda row: 'FTA사후환급 검토' if (
-                    pd.notna(row['적출국코드']) and 
-                    pd.notna(row['원산지코드']) and 
-                    str(row['적출국코드']).strip() == str(row['원산지코드']).strip() and
-                    str(row['적출국코드']).strip() != '' and
-                    str(row['원산지코드']).strip() != ''
-                ) else '', 
-                axis=1
-            )
-        else:
-            df_work['FTA사후환급 검토'] = ''
-        
-        # NaN 값을 0으로 대체
-        df_work.fillna(0, inplace=True)
-        df_work = df_work.infer_objects(copy=False)
-        
-        # 필터링 조건 적용
-        df_filtered = df_work[
-            (df_work['세율구분'] == 'A') & 
-            (df_work['관세실행세율'] >= 8)
-        ]
-        
-        # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
-        final_columns = [col for col in selected_columns 
-                        if col in df_filtered.columns and col != '란결제금액']
-        df_filtered = df_filtered[final_columns]
-        
-        return df_filtered
-        
-    except Exception as e:
-        st.error(f"8% 환급 검토 분석 중 오류 발생: {str(e)}")
-        return None
+def render_sample_preview(uploaded_file, key):
+    """전체 로드 전 층화 표본 추정 표시 (같은 파일은 세션에서 한 번만 계산)"""
+    cached = st.session_state.get('sample_preview')
+    if cached and cached[0] == key:
+        preview = cached[1]
+    else:
+        with st.spinner("⚡ 표본 추출 중..."):
+            try:
+                preview = build_sample_preview(uploaded_file, load_rule_set())
+            except Exception as e:
+                st.warning(f"표본 추정을 건너뜁니다: {e}")
+                return
+        st.session_state['sample_preview'] = (key, preview)
+    if preview is None:
+        return
+    
+    st.subheader("⚡ 빠른 표본 추정")
+    st.caption(
+        f"전체 {preview['rows']:,}행 중 {preview['sample_rows']:,}행 표본 (세율구분 × 거래구분 층화, "
+        f"{preview['seconds']:.1f}초) · 기본 규칙 기준 95% 신뢰구간 · 정확한 분석은 아래에서 계속 진행됩니다"
+    )
+    estimates = preview['estimates']
+    cols = st.columns(len(estimates))
+    for col, (_, row) in zip(cols, estimates.iterrows()):
+        col.metric(f"{row['항목']} (추정)", f"{row['추정 건수']:,}", f"{row['하한']:,} ~ {row['상한']:,}",
+                   delta_color='off')
+    
+    tariff_specs = preview['tariff_specs']
+    price_levels = preview['price_levels']
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"**세율 Risk 가능 규격1**: 최소 {len(tariff_specs):,}개 (표본에서 세번부호가 2개 이상)")
+        if len(tariff_specs) > 0:
+            st.dataframe(tariff_specs.head(20), use_container_width=True)
+    with col2:
+        st.markdown("**단가 Risk 위험도 분포** (표본 규격 기준 비율과 95% 신뢰구간)")
+        if len(price_levels) > 0:
+            st.dataframe(price_levels, use_container_width=True)
+    with st.expander("층별 표본"):
+        st.dataframe(preview['strata'], use_container_width=True)
 
-def create_zero_percent_risk_analysis(df):
-    """0% Risk 분석"""
-    try:
-        # 필요한 컬럼만 선택
-        selected_columns = [
-            '수입신고번호',
-            '수리일자',
-            'B/L번호',
-            '세번부호', 
-            '세율구분',
-            '관세실행세율',
-            '규격1',
-            '규격2',
-            '성분1',
-            '실제관세액',
-            '거래품명',
-            '란번호',
-            '행번호',
-            '수량_1',
-            '수량단위_1',
-            '단가',
-            '금액',
-            '란결제금액',
-            '행별관세'
-        ]
-        
-        # 0% Risk 조건에 맞는 데이터 필터링
-        df_zero_risk = df[
-            (df['관세실행세율'] < 8) & 
-            (~df['세율구분'].astype(str).str.match(r'^F.{3}$'))
-        ]
-        
-        # 존재하는 컬럼만 선택
-        base_columns = [col for col in selected_columns 
-                       if col not in ['행별관세'] and col in df_zero_risk.columns]
-        
-        # 필요한 컬럼만 선택
-        df_zero_risk = df_zero_risk[base_columns].copy()
-        
-        # 행별관세 계산에 필요한 컬럼들 전처리
-        if '실제관세액' in df_zero_risk.columns:
-            df_zero_risk['실제관세액'] = pd.to_numeric(
-                df_zero_risk['실제관세액'].fillna(0), errors='coerce'
-            ).fillna(0)
-        
-        if '금액' in df_zero_risk.columns:
-            df_zero_risk['금액'] = pd.to_numeric(
-                df_zero_risk['금액'].fillna(0), errors='coerce'
-            ).fillna(0)
-        
-        if '란결제금액' in df_zero_risk.columns:
-            df_zero_risk['란결제금액'] = pd.to_numeric(
-                df_zero_risk['란결제금액'].fillna(0), errors='coerce'
-            ).fillna(0)
-        
-        # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
-        if all(col in df_zero_risk.columns for col in ['실제관세액', '금액', '란결제금액']):
-            df_zero_risk['행별관세'] = np.where(
-                df_zero_risk['란결제금액'] != 0,
-                (df_zero_risk['실제관세액'] * df_zero_risk['금액']) / df_zero_risk['란결제금액'],
-                0
-            )
-        else:
-            df_zero_risk['행별관세'] = 0
-        
-        # NaN 값을 0으로 대체
-        df_zero_risk.fillna(0, inplace=True)
-        df_zero_risk = df_zero_risk.infer_objects(copy=False)
-        
-        # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
-        final_columns = [col for col in selected_columns 
-                        if col in df_zero_risk.columns and col != '란결제금액']
-        df_zero_risk = df_zero_risk[final_columns]
-        
-        return df_zero_risk
+# 백그라운드 작업 진행 상황 갱신 간격 (초)
+JOB_POLL_INTERVAL = 1.0
+
+def clear_analysis_job():
+    """현재 세션의 백그라운드 작업 연결 해제"""
+    st.session_state.pop('analysis_job', None)
+    if 'job' in st.query_params:
+        del st.query_params['job']
+
+def session_owner():
+    """작업 큐에서 현재 세션을 구분하는 ID"""
+    return st.session_state.setdefault('session_owner', uuid.uuid4().hex)
+
+def schedule_speculative_job(uploaded_file, key, options):
+    """업로드 직후 현재 옵션으로 분석 작업을 미리 제출 (예측 작업 ID 반환)
+
+    옵션이 바뀌면 이전 예측 작업을 철회하고 새 옵션으로 다시 제출합니다.
+    '분석 시작'의 옵션이 같으면 같은 작업 ID이므로 진행 중이거나 완료된 결과를 그대로 사용합니다.
+    """
+    speculative = st.session_state.get('speculative_job')
+    if speculative and speculative['key'] == key and speculative['options'] == options:
+        return speculative['job_id']
+    cancel_speculative_job()
+    job_id = analysis_queue().submit(
+        uploaded_file.getvalue(), uploaded_file.name, options, owner=session_owner(), speculative=True
+    )
+    st.session_state['speculative_job'] = {'job_id': job_id, 'key': key, 'options': options}
+    return job_id
+
+def cancel_speculative_job():
+    """현재 세션의 예측 작업 철회 (다른 세션이 같은 작업을 예측/제출했으면 계속 실행)"""
+    speculative = st.session_state.pop('speculative_job', None)
+    if speculative:
+        analysis_queue().cancel_speculative(speculative['job_id'], session_owner())
+
+def render_analysis_job(job_id):
+    """백그라운드 작업 진행 상황/결과 표시. 작업이 없으면 False 반환"""
+    job_queue = analysis_queue()
+    state = job_queue.get_state(job_id)
+    if state is None:
+        clear_analysis_job()
+        return False
     
-    except Exception as e:
-        st.error(f"0% Risk 분석 중 오류 발생: {str(e)}")
-        return None
+    st.session_state['analysis_job'] = job_id
+    st.caption(f"🕒 백그라운드 작업 {job_id} · {state.get('file_name', '')} · 제출 {state.get('created', '')}")
+    
+    if state['status'] in ACTIVE_STATUSES:
+        position = job_queue.queue_position(job_id)
+        if position:
+            st.info(f"⏳ 대기 중입니다. (앞선 작업 약 {position - 1}건)")
+        st.progress(min(max(state.get('progress', 0.0), 0.0), 1.0))
+        st.text(state.get('message', ''))
+        st.caption("이 창을 닫아도 분석은 계속됩니다. 다시 접속하면 결과를 확인할 수 있습니다.")
+        if st.button("↩️ 작업 화면 닫기"):
+            clear_analysis_job()
+            st.rerun()
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+    
+    if state['status'] == STATUS_CANCELLED:
+        st.warning(f"⏹️ 분석 작업이 취소되었습니다: {state.get('message', '')}")
+    elif state['status'] == STATUS_FAILED:
+        st.error(f"❌ 분석 작업이 실패했습니다: {state.get('message', '')}")
+        with st.expander("🔧 개발자 정보 (상세 오류)"):
+            st.code(state.get('traceback', ''))
+    else:
+        job_result = job_queue.load_results(job_id)
+        show_notices(job_result.get('notices'))
+        for warning in state.get('commit_warnings', []):
+            st.warning(warning)
+        st.success(f"📈 데이터 {job_result['rows']:,}행, {job_result['columns']}열 분석 결과")
+        metrics = PipelineMetrics.from_records(job_result['metrics'], job_result['run_id'])
+        render_results(
+            job_result['results'], job_result['excel'], job_result['word'], metrics, job_result['memory_plan']
+        )
+    
+    if st.button("🔄 새 분석 시작"):
+        clear_analysis_job()
+        st.rerun()
+    return True
 
-def create_tariff_risk_analysis(df):
-    """세율 Risk 분석"""
-    try:
-        required_columns = [
-            '수입신고번호', 
-            '수리일자',
-            '규격1', '규격2', '규격3',
-            '성분1', '성분2', '성분3',
-            '세번부호', 
-            '세율구분', 
-            '세율설명',
-            '과세가격달러',
-            '실제관세액',
-            '결제방법',
-            '금액',
-            '란결제금액'
-        ]
-        
-        # 규격1별 세번부호 분석
-        if '규격1' in df.columns and '세번부호' in df.columns:
-            # 규격1별로 세번부호의 고유값 개수를 계산
-            risk_specs = df.groupby('규격1')['세번부호'].nunique()
-            
-            # 세번부호가 2개 이상인 규격1만 선택
-            risk_specs = risk_specs[risk_specs > 1]
-        else:
-            risk_specs = pd.Series(dtype='object')
-        
-        if len(risk_specs) == 0:
-            return pd.DataFrame()
-            
-        # 규격1 기준으로 정렬
-        if '규격1' in df.columns:
-            # 존재하는 컬럼만 선택
-            available_columns = [col for col in required_columns if col in df.columns]
-            risk_data = df[df['규격1'].isin(risk_specs.index)][available_columns].copy()
-            
-            # 행별관세 계산에 필요한 컬럼들 전처리
-            if '실제관세액' in risk_data.columns:
-                risk_data['실제관세액'] = pd.to_numeric(
-                    risk_data['실제관세액'].fillna(0), errors='coerce'
-                ).fillna(0)
-            
-            if '금액' in risk_data.columns:
-                risk_data['금액'] = pd.to_numeric(
-                    risk_data['금액'].fillna(0), errors='coerce'
-                ).fillna(0)
-            
-            if '란결제금액' in risk_data.columns:
-                risk_data['란결제금액'] = pd.to_numeric(
-                    risk_data['란결제금액'].fillna(0), errors='coerce'
-                ).fillna(0)
-            
-            # 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액
-            if all(col in risk_data.columns for col in ['실제관세액', '금액', '란결제금액']):
-                risk_data['행별관세'] = np.where(
-                    risk_data['란결제금액'] != 0,
-                    (risk_data['실제관세액'] * risk_data['금액']) / risk_data['란결제금액'],
-                    0
+def render_data_export(results, run_id):
+    """분석 결과 데이터 내보내기 (형식 선택 → zip 생성 → 다운로드)"""
+    formats = available_export_formats()
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fmt = st.selectbox(
+            "📦 데이터 내보내기 형식", formats,
+            format_func=lambda f: EXPORT_FORMATS[f]['label'], key='export_format',
+            help="분석 결과를 압축 CSV 또는 Parquet 파일로 묶은 zip 파일입니다. 다른 시스템에서 읽기에 적합합니다. "
+                 "파일은 디스크에 청크 단위로 만들지만, 다운로드 시에는 zip 파일 전체를 서버 메모리에 올립니다."
+        )
+    
+    state_key = f'export_{run_id}_{fmt}'
+    with col2:
+        if state_key not in st.session_state and st.button("📦 내보내기 파일 생성", key='export_build'):
+            try:
+                with st.spinner("내보내기 파일 생성 중..."):
+                    st.session_state[state_key] = create_export_archive(results, fmt, run_id)
+            except Exception as e:
+                st.error(f"내보내기 파일 생성 중 오류 발생: {str(e)}")
+        
+        path = st.session_state.get(state_key)
+        if path and os.path.exists(path):
+            # st.download_button은 파일 전체를 읽어 메모리에 보관 (압축된 zip 크기만큼)
+            with open(path, 'rb') as f:
+                st.download_button(
+                    label=f"📦 {EXPORT_FORMATS[fmt]['label']} 다운로드",
+                    data=f,
+                    file_name=f"수입신고분석_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{fmt}.zip",
+                    mime="application/zip"
                 )
-            else:
-                risk_data['행별관세'] = 0
-            
-            # 규격1, 세번부호 기준 정렬
-            risk_data = risk_data.sort_values(['규격1', '세번부호']).fillna('')
-            
-            # 최종 컬럼 순서 정리 (란결제금액은 계산 후 제거)
-            final_columns = [col for col in available_columns if col != '란결제금액']
-            if '행별관세' not in final_columns:
-                final_columns.append('행별관세')
-            risk_data = risk_data[final_columns]
-        else:
-            risk_data = pd.DataFrame(columns=required_columns)
-        
-        return risk_data
-        
-    except Exception as e:
-        st.error(f"세율 Risk 분석 중 오류 발생: {e}")
-        return pd.DataFrame()
 
-def create_price_risk_analysis(df):
-    """단가 Risk 분석"""
-    try:
-        # 필요한 컬럼 체크
-        required_columns = ['규격1', '세번부호', '거래구분', '결제방법', '수리일자', '수입신고번호',
-                          '단가', '결제통화단위', '거래품명', 
-                          '란번호', '행번호', '수량_1', '수량단위_1', '금액']
-        
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            available_columns = [col for col in required_columns if col in df.columns]
-            if '단가' not in available_columns:
-                return pd.DataFrame()
-        else:
-            available_columns = required_columns
-        
-        # 단가를 숫자형으로 변환
-        df_work = df.copy()
-        df_work['단가'] = pd.to_numeric(df_work['단가'].fillna(0), errors='coerce').fillna(0)
-        
-        # 단가가 0보다 큰 데이터만 분석
-        df_work = df_work[df_work['단가'] > 0]
-        
-        if len(df_work) == 0:
-            return pd.DataFrame()
-        
-        # 그룹화 기준 (규격1만 사용)
-        group_columns = ['규격1']
-        
-        # 집계 함수 정의
-        agg_dict = {
-            '세번부호': 'first',
-            '거래구분': 'first',
-            '결제방법': 'first',
-            '수리일자': ['min', 'max'],
-            '수입신고번호': ['min', 'max'],
-            '단가': ['mean', 'max', 'min', 'std', 'count'],
-            '결제통화단위': 'first',
-            '거래품명': 'first',
-            '란번호': 'first',
-            '행번호': 'first',
-            '수량_1': 'first',
-            '수량단위_1': 'first',
-            '금액': 'sum'
-        }
-        
-        # 존재하는 컬럼만 선택
-        available_group_columns = [col for col in group_columns if col in df_work.columns]
-        available_agg_dict = {col: agg_dict[col] for col in agg_dict if col in df_work.columns}
-        
-        grouped = df_work.groupby(available_group_columns).agg(available_agg_dict).reset_index()
-        
-        # 집계 후 컬럼명 재설정
-        grouped_columns = list(grouped.columns)
-        new_columns = []
-        for col in grouped_columns:
-            if isinstance(col, tuple):
-                if col[0] == '단가' and col[1] == 'mean':
-                    new_columns.append('평균단가')
-                elif col[0] == '단가' and col[1] == 'max':
-                    new_columns.append('최고단가')
-                elif col[0] == '단가' and col[1] == 'min':
-                    new_columns.append('최저단가')
-                elif col[0] == '단가' and col[1] == 'std':
-                    new_columns.append('단가표준편차')
-                elif col[0] == '단가' and col[1] == 'count':
-                    new_columns.append('데이터수')
-                elif col[0] == '수리일자' and col[1] == 'min':
-                    new_columns.append('Min 수리일자')
-                elif col[0] == '수리일자' and col[1] == 'max':
-                    new_columns.append('Max 수리일자')
-                elif col[0] == '수입신고번호' and col[1] == 'min':
-                    new_columns.append('Min 신고번호')
-                elif col[0] == '수입신고번호' and col[1] == 'max':
-                    new_columns.append('Max 신고번호')
-                else:
-                    if col[1] == 'first':
-                        new_columns.append(col[0])
-                    elif col[1] == 'sum':
-                        new_columns.append(col[0])
-                    else:
-                        new_columns.append(f'{col[0]}_{col[1]}')
-            else:
-                new_columns.append(col)
-        grouped.columns = new_columns
-        
-        # 위험도 계산
-        grouped['단가편차율'] = np.where(
-            grouped['평균단가'] > 0,
-            (grouped['최고단가'] - grouped['최저단가']) / grouped['평균단가'],
-            0
+def render_result_diff(results, run_id):
+    """이전 분석 결과 스냅샷과 비교 (신규/해소/변경 Risk만 표시 및 내보내기)"""
+    snapshots = [meta for meta in list_snapshots() if meta['run_id'] != run_id]
+    with st.expander("🔁 이전 결과와 비교"):
+        if not snapshots:
+            st.info("비교할 이전 분석 결과가 없습니다. 다음 분석부터 이번 결과와 비교할 수 있습니다.")
+            return
+        
+        snapshot = st.selectbox(
+            "비교할 이전 결과", snapshots,
+            format_func=lambda meta: f"{meta['saved_at'].replace('T', ' ')} · {meta.get('file_name') or meta['id']}",
+            key='diff_snapshot'
         )
-        
-        # 위험도 분류
-        def classify_risk(row):
-            if row['평균단가'] == 0:
-                return '확인필요'
-            elif row['단가편차율'] > 0.5:  # 50% 이상 편차
-                return '매우높음'
-            elif row['단가편차율'] > 0.3:  # 30% 이상 편차
-                return '높음'
-            elif row['단가편차율'] > 0.1:  # 10% 이상 편차
-                return '보통'
-            else:
-                return '낮음'
-        
-        grouped['위험도'] = grouped.apply(classify_risk, axis=1)
-        
-        # 비고 생성
-        grouped['비고'] = grouped.apply(lambda row: 
-            f'평균단가 확인 필요' if row['평균단가'] == 0 
-            else f'단가편차: {row["단가편차율"]*100:.1f}%', axis=1
+        state_key = f"diff_{run_id}_{snapshot['id']}"
+        if state_key not in st.session_state and st.button("🔁 비교", key='diff_run'):
+            try:
+                with st.spinner("이전 결과와 비교 중..."):
+                    st.session_state[state_key] = diff_results(load_snapshot(snapshot['id']), results)
+            except (OSError, ValueError) as e:
+                st.error(f"이전 결과 비교 중 오류 발생: {str(e)}")
+        
+        if state_key not in st.session_state:
+            return
+        diffs, summary = st.session_state[state_key]
+        st.dataframe(summary, use_container_width=True)
+        for label, diff in diffs.items():
+            st.subheader(f"{label} 변경분 ({len(diff):,}건)")
+            st.dataframe(diff.head(1000).astype(str), use_container_width=True)
+        
+        # 변경분만 내보내기 (데이터 내보내기에서 선택한 형식, 비교 결과 옆에 형식별로 보관해 재실행 시 재사용)
+        fmt = st.session_state.get('export_format', 'csv_gzip')
+        archive_key = f"{state_key}_archive_{fmt}"
+        if archive_key not in st.session_state:
+            archive = io.BytesIO()
+            write_export_archive([(f'{label}_변경분', diff) for label, diff in diffs.items() if not diff.empty],
+                                 fmt, archive)
+            st.session_state[archive_key] = archive.getvalue()
+        st.download_button(
+            label=f"🔁 변경분 {EXPORT_FORMATS[fmt]['label']} 다운로드",
+            data=st.session_state[archive_key],
+            file_name=f"수입신고분석_변경분_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{fmt}.zip",
+            mime="application/zip"
         )
-        
-        return grouped
-        
-    except Exception as e:
-        st.error(f"단가 Risk 분석 중 오류 발생: {str(e)}")
-        return pd.DataFrame()
 
-def create_summary_analysis(df_original):
-    """Summary 분석"""
-    try:
-        summary_data = {}
-        
-        # 1. 전체 신고 건수
-        if '수입신고번호' in df_original.columns:
-            total_declarations = df_original['수입신고번호'].nunique()
-        else:
-            total_declarations = len(df_original)
-        summary_data['전체 신고 건수'] = total_declarations
-        
-        # 2. 거래구분별 분석
-        if '거래구분' in df_original.columns and '수입신고번호' in df_original.columns:
-            trade_type_analysis = pd.pivot_table(df_original, 
-                index=['거래구분'],
-                values='수입신고번호',
-                aggfunc='nunique',
-                margins=True,
-                margins_name='총계'
-            ).reset_index()
-        else:
-            trade_type_analysis = pd.DataFrame({
-                '거래구분': ['데이터 없음'],
-                '수입신고번호': [0]
-            })
-        
-        # 3. 세율구분별 분석
-        if '세율구분' in df_original.columns and '수입신고번호' in df_original.columns:
-            rate_type_analysis = pd.pivot_table(df_original,
-                index='세율구분',
-                values='수입신고번호',
-                aggfunc='nunique'
-            ).reset_index()
-            # 총계 추가
-            total_row = {'세율구분': '총계', '수입신고번호': rate_type_analysis['수입신고번호'].sum()}
-            rate_type_analysis = pd.concat([rate_type_analysis, pd.DataFrame([total_row])], ignore_index=True)
-        else:
-            rate_type_analysis = pd.DataFrame({
-                '세율구분': ['데이터 없음'],
-                '수입신고번호': [0]
-            })
+def render_hs_drilldown(data):
+    """세율 Risk 결과를 류 → 호 → 소호 순으로 좁혀 보기 (선택한 계층의 행만 반환)"""
+    hs_index = build_hs_index(data['세번부호'])
+    prefix = ''
+    
+    with st.expander("🔎 세번부호 계층별 보기"):
+        if '분류차이' in data.columns:
+            st.caption("분류차이: 같은 규격1의 세번부호가 갈라지는 가장 상위 계층 (류 상이가 가장 위험)")
+            st.dataframe(
+                data.groupby('분류차이', sort=False).agg(
+                    규격1수=('규격1', 'nunique'), 행수=('규격1', 'size')
+                ).reset_index(),
+                use_container_width=True
+            )
         
-        # 4. Risk 분석 요약
-        if all(col in df_original.columns for col in ['관세실행세율', '세율구분', '수입신고번호']):
-            zero_risk_df = df_original[
-                (df_original['관세실행세율'] < 8) & 
-                (~df_original['세율구분'].astype(str).str.match(r'^F.{3}$'))
-            ]
-            zero_risk_count = zero_risk_df['수입신고번호'].nunique()
-            
-            eight_percent_df = df_original[
-                (df_original['세율구분'] == 'A') & 
-                (df_original['관세실행세율'] >= 8)
-            ]
-            eight_percent_count = eight_percent_df['수입신고번호'].nunique()
+        cols = st.columns(3)
+        for col, level in zip(cols, ['류', '호', '소호']):
+            table = hs_drilldown(data, level, prefix, hs_index)
+            if table.empty:
+                break
+            with col:
+                choice = st.selectbox(f"{level}", ['전체'] + table[level].tolist(), key=f"hs_drill_{level}")
+            if choice == '전체':
+                st.dataframe(table, use_container_width=True)
+                break
+            prefix = choice
         else:
-            zero_risk_count = 0
-            eight_percent_count = 0
-        
-        risk_analysis = pd.DataFrame({
-            'Risk 유형': ['0% Risk', '8% 환급 검토'],
-            '신고건수': [zero_risk_count, eight_percent_count],
-            '비율(%)': [
-                zero_risk_count/total_declarations*100 if total_declarations > 0 else 0,
-                eight_percent_count/total_declarations*100 if total_declarations > 0 else 0
-            ]
-        })
-        
-        summary_data['거래구분별'] = trade_type_analysis
-        summary_data['세율구분별'] = rate_type_analysis
-        summary_data['Risk분석'] = risk_analysis
-        
-        return summary_data
-        
-    except Exception as e:
-        st.error(f"Summary 분석 중 오류 발생: {str(e)}")
-        return {}
+            st.dataframe(hs_drilldown(data, '세번', prefix, hs_index), use_container_width=True)
+    
+    if prefix:
+        st.info(f"세번부호 {prefix}로 시작하는 {len(filter_by_prefix(data, prefix, hs_index)):,}건을 표시합니다.")
+    return filter_by_prefix(data, prefix, hs_index)
 
-def create_verification_methods_excel_sheet(writer):
-    """검증방법 시트 생성 (엑셀용)"""
-    try:
-        # 워크시트 생성
-        worksheet = writer.book.add_worksheet('검증방법')
-        workbook = writer.book
-        
-        # 포맷 설정
-        title_format = workbook.add_format({
-            'font_name': 'Arial',
-            'font_size': 14,
-            'bold': True,
-            'align': 'center',
-            'valign': 'vcenter',
-            'bg_color': '#4472C4',
-            'font_color': 'white',
-            'border': 1
-        })
-        
-        subtitle_format = workbook.add_format({
-            'font_name': 'Arial',
-            'font_size': 12,
-            'bold': True,
-            'align': 'left',
-            'valign': 'vcenter',
-            'bg_color': '#D9E1F2',
-            'border': 1
-        })
-        
-        content_format = workbook.add_format({
-            'font_name': 'Arial',
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'top',
-            'border': 1,
-            'text_wrap': True
-        })
-        
-        highlight_format = workbook.add_format({
-            'font_name': 'Arial',
-            'font_size': 10,
-            'align': 'left',
-            'valign': 'top',
-            'border': 1,
-            'text_wrap': True,
-            'bg_color': '#FFFF00'  # 노란색 배경
-        })
-        
-        # 열 너비 설정
-        worksheet.set_column(0, 0, 25)  # A열 - 시트명
-        worksheet.set_column(1, 1, 60)  # B열 - 검증로직
-        worksheet.set_column(2, 2, 40)  # C열 - 특이사항
-        
-        current_row = 0
-        
-        # 제목
-        worksheet.merge_range(current_row, 0, current_row, 2, '수입신고 분석 검증방법', title_format)
-        worksheet.set_row(current_row, 30)
-        current_row += 2
-        
-        # 1. 8% 환급 검토
-        worksheet.write(current_row, 0, '1. 8% 환급 검토', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 필터링 조건: 세율구분 = "A" AND 관세실행세율 ≥ 8%\n' +
-            '• 목적: 8% 환급 검토가 필요한 수입신고 건들 식별\n' +
-            '• 추가 컬럼: 적출국코드, 원산지코드, 무역거래처상호, 무역거래처국가코드\n' +
-            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 세율구분 "A"는 일반적으로 가장 관세율이 높은 구분\n' +
-            '• 8% 이상의 관세율은 환급 대상이 될 수 있음\n' +
-            '• FTA사후환급 검토: 적출국=원산지인 경우 표시', 
-            highlight_format)
-        worksheet.set_row(current_row, 80)
-        current_row += 1
-        
-        # 2. 0% Risk
-        worksheet.write(current_row, 0, '2. 0% Risk', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 필터링 조건: 관세실행세율 < 8% AND 세율구분 ≠ F***\n' +
-            '• 목적: 관세율이 낮거나 면세 대상이지만 추가 검토가 필요한 건들\n' +
-            '• F로 시작하는 4자리 코드는 특별한 세율구분으로 제외\n' +
-            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 관세율이 낮은데도 특별한 세율구분이 아닌 경우 주의 필요\n' +
-            '• 면세 대상이지만 실제로는 관세가 부과될 수 있는 경우\n' +
-            '• 관세실행세율이 0%인 경우 노란색으로 강조 표시', 
-            highlight_format)
-        worksheet.set_row(current_row, 80)
-        current_row += 1
-        
-        # 3. 세율 Risk
-        worksheet.write(current_row, 0, '3. 세율 Risk', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 분석 방법: 규격1 기준으로 그룹화하여 세번부호의 고유값 개수 확인\n' +
-            '• 위험 판정: 동일 규격1에 대해 서로 다른 세번부호가 2개 이상인 경우\n' +
-            '• 목적: 동일 상품(규격1)에 대한 세번부호 불일치 위험 식별\n' +
-            '• 예시: "DEMO SYS 1ML LG 0000-S000P1MLF"에 여러 세번부호 적용\n' +
-            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 동일 상품인데 다른 세번부호가 적용되면 관세율 차이 발생\n' +
-            '• 세번부호 분류 오류 가능성 또는 상품 특성 차이\n' +
-            '• 세율 Risk 발견 시 해당 규격1의 세번부호들을 상세 검토 필요\n' +
-            '• 세번부호가 다른 경우 노란색으로 강조 표시', 
-            highlight_format)
-        worksheet.set_row(current_row, 100)
-        current_row += 1
-        
-        # 4. 단가 Risk
-        worksheet.write(current_row, 0, '4. 단가 Risk', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 그룹화 기준: 규격1\n' +
-            '• 위험도 계산: 단가편차율 = (최고단가 - 최저단가) ÷ 평균단가\n' +
-            '• 위험도 분류:\n' +
-            '  - 10% 초과~30% 이하: "보통"\n' +
-            '  - 30% 초과~50% 이하: "높음"\n' +
-            '  - 50% 초과: "매우높음"\n' +
-            '• 특이사항: 평균단가가 0인 경우 "확인필요"로 분류\n' +
-            '• 추가 정보: Min/Max 신고번호의 수리일자 표시', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 단가 변동성이 10% 초과하면 주의 필요\n' +
-            '• 30% 초과는 높은 위험, 50% 초과는 매우 비정상적인 가격 차이\n' +
-            '• 평균단가 0은 데이터 오류 또는 특별한 거래 형태\n' +
-            '• 수리일자 차이로 시간적 변동성 확인 가능\n' +
-            '• 위험도가 "높음", "매우높음", "확인필요"인 경우 노란색 강조', 
-            highlight_format)
-        worksheet.set_row(current_row, 120)
-        current_row += 1
-        
-        # 5. Summary
-        worksheet.write(current_row, 0, '5. Summary', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 전체 신고 건수: 수입신고번호 기준 고유 건수\n' +
-            '• 거래구분별 분석: 거래구분별 신고건수 피벗 테이블\n' +
-            '• 세율구분별 분석: 세율구분별 신고건수 및 비중\n' +
-            '• Risk 분석 요약: 0% Risk와 8% 환급 검토 건수 및 비율\n' +
-            '• 세번부호별 세율구분 및 실행세율 분석', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 전체적인 수입신고 현황 파악\n' +
-            '• Risk 분포를 통한 우선순위 설정 가능\n' +
-            '• 차트와 그래프로 시각적 분석 제공', 
-            highlight_format)
-        worksheet.set_row(current_row, 80)
-        current_row += 1
-        
-        # 6. 원본데이터
-        worksheet.write(current_row, 0, '6. 원본데이터', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 분석에 사용된 원본 엑셀 파일의 모든 데이터\n' +
-            '• 상위 1000개 행만 표시 (파일 크기 제한)\n' +
-            '• 모든 컬럼과 원본 데이터 구조 확인 가능\n' +
-            '• 필터링 및 정렬 기능 제공\n' +
-            '• 중복 컬럼명 자동 처리됨', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 원본 데이터와 분석 결과 비교 검토 가능\n' +
-            '• 데이터 품질 및 구조 확인용\n' +
-            '• 중복 컬럼은 _1, _2 등으로 구분', 
-            highlight_format)
-        worksheet.set_row(current_row, 80)
-        current_row += 1
-        
-        # 특이사항 표시 방법
-        worksheet.write(current_row, 0, '특이사항 표시 방법', subtitle_format)
-        worksheet.write(current_row, 1, 
-            '• 노란색 배경: 각 시트에서 특별히 주의가 필요한 항목\n' +
-            '• 8% 환급 검토: 관세실행세율 8% 이상, FTA사후환급 검토 대상\n' +
-            '• 0% Risk: 관세실행세율이 0%인 경우\n' +
-            '• 세율 Risk: 동일 규격1에 다른 세번부호 적용\n' +
-            '• 단가 Risk: 위험도 "높음", "매우높음", "확인필요"\n' +
-            '• Summary: 세율구분/실행세율 종류수가 2개 이상인 세번부호', 
-            content_format)
-        worksheet.write(current_row, 2, 
-            '• 노란색으로 표시된 항목은 반드시 검토 필요\n' +
-            '• 데이터 오류 또는 비정상적인 거래 형태일 가능성\n' +
-            '• 세관 신고 시 추가 확인이 필요한 항목들\n' +
-            '• Made by 전자동 (Wooshin Customs Broker)', 
-            highlight_format)
-        worksheet.set_row(current_row, 100)
-        
-        # 페이지 설정
-        worksheet.set_header('&C&B검증방법')
-        worksheet.set_footer('&R&D &T')
-        
-        return True
-        
-    except Exception as e:
-        print(f"검증방법 시트 생성 중 오류 발생: {str(e)}")
-        return False
+def render_quality_report(quality):
+    """데이터 품질 검사 결과 표시 (문제가 없으면 표시하지 않음)"""
+    summary = quality['summary']
+    if summary.empty:
+        return
+    errors = int((summary['심각도'] == '오류').sum())
+    st.warning(
+        f"🧪 데이터 품질 검사에서 {len(summary)}개 항목(오류 {errors}개)이 확인되었습니다. "
+        "분석 결과가 잘못된 컬럼 매핑이나 기본값에 영향을 받았을 수 있습니다."
+    )
+    with st.expander("🧪 데이터 품질 검사 상세"):
+        st.dataframe(summary, use_container_width=True)
+        check = st.selectbox("행번호 보기", summary['검사'].tolist(), key='quality_check')
+        rows = quality['rows'].get(check)
+        if rows is not None and len(rows):
+            st.caption(f"엑셀 행번호 (상위 1,000개 / 전체 {len(rows):,}개)")
+            st.dataframe(excel_row_table(quality, rows[:1000]), use_container_width=True)
 
-def create_excel_file(df_original, eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data):
-    """엑셀 파일 생성"""
-    try:
-        # 메모리에서 엑셀 파일 생성
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # 포맷 설정
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#D9E1F2',
-                'border': 1,
-                'align': 'center'
-            })
-            
-            # Summary 시트
-            if summary_data:
-                summary_sheet = workbook.add_worksheet('Summary')
-                row = 0
-                
-                # 제목
-                summary_sheet.merge_range(row, 0, row, 3, '수입신고 분석 보고서', 
-                                        workbook.add_format({'bold': True, 'font_size': 16, 'align': 'center'}))
-                row += 2
-                
-                # 전체 신고 건수
-                summary_sheet.write(row, 0, '전체 신고 건수', header_format)
-                summary_sheet.write(row, 1, summary_data.get('전체 신고 건수', 0))
-                row += 2
-                
-                # 거래구분별
-                if '거래구분별' in summary_data:
-                    summary_sheet.write(row, 0, '거래구분별 분석', header_format)
-                    row += 1
-                    summary_data['거래구분별'].to_excel(writer, sheet_name='Summary', startrow=row, startcol=0, index=False)
-                    row += len(summary_data['거래구분별']) + 2
-                
-                # 세율구분별
-                if '세율구분별' in summary_data:
-                    summary_sheet.write(row, 0, '세율구분별 분석', header_format)
-                    row += 1
-                    summary_data['세율구분별'].to_excel(writer, sheet_name='Summary', startrow=row, startcol=0, index=False)
-                    row += len(summary_data['세율구분별']) + 2
+def render_declaration_lookup(declarations):
+    """수입신고번호로 신고별/란별 집계 조회"""
+    with st.expander("🔎 수입신고번호 조회"):
+        declaration = st.text_input("수입신고번호", key='declaration_lookup').strip()
+        mismatched = declarations['declaration_table']
+        mismatched = mismatched[mismatched['배분불일치란수'] > 0]
+        if not declaration:
+            if len(mismatched):
+                st.caption(f"배분 불일치 란이 있는 신고 {len(mismatched):,}건 (상위 100건)")
+                st.dataframe(mismatched.head(100), use_container_width=True)
+            return
+        
+        position = declarations['declarations'].get_indexer([declaration])[0]
+        if position < 0:
+            st.info("해당 수입신고번호가 없습니다.")
+            return
+        st.dataframe(declarations['declaration_table'].iloc[[position]], use_container_width=True)
+        st.dataframe(declaration_lines(declarations, declaration), use_container_width=True)
+
+def render_results(results, excel_data, word_data, metrics, memory_plan):
+    """분석 결과 탭, 다운로드, 성능 패널 표시"""
+    # 결과 표시
+    st.success("🎉 분석이 완료되었습니다!")
+    
+    if results.get('quality') is not None:
+        render_quality_report(results['quality'])
+    
+    chunked = [name for name, entry in memory_plan['analyses'].items() if entry['chunk_rows']]
+    if chunked:
+        st.info(
+            f"🧠 메모리 예산({memory_plan['budget_mb']:,.0f}MB) 초과가 예상되어 "
+            f"{', '.join(chunked)} 분석을 분할 처리했습니다."
+        )
+    
+
+    # 탭으로 결과 표시
+    tab_names = []
+    tab_data = []
+    
+    if 'summary' in results and results['summary']:
+        tab_names.append("📊 Summary")
+        tab_data.append(('summary', results['summary']))
+    
+    if 'eight_percent' in results and not results['eight_percent'].empty:
+        tab_names.append("💰 8% 환급 검토")
+        tab_data.append(('eight_percent', results['eight_percent']))
+    
+    if 'zero_risk' in results and not results['zero_risk'].empty:
+        tab_names.append("🟢 0% Risk")
+        tab_data.append(('zero_risk', results['zero_risk']))
+    
+    if 'tariff_risk' in results and not results['tariff_risk'].empty:
+        tab_names.append("⚠️ 세율 Risk")
+        tab_data.append(('tariff_risk', results['tariff_risk']))
+    
+    if 'price_risk' in results and not results['price_risk'].empty:
+        tab_names.append("💲 단가 Risk")
+        tab_data.append(('price_risk', results['price_risk']))
+    
+    if 'price_drift' in results and not results['price_drift'].empty:
+        tab_names.append("📈 단가 변동")
+        tab_data.append(('price_drift', results['price_drift']))
+    
+    if 'spec_history' in results and not results['spec_history'].empty:
+        tab_names.append("🗂️ 분류 이력")
+        tab_data.append(('spec_history', results['spec_history']))
+    
+    if 'duplicates' in results and not results['duplicates'].empty:
+        tab_names.append("🧾 중복/분할 신고")
+        tab_data.append(('duplicates', results['duplicates']))
+    
+    if tab_names:
+        tabs = st.tabs(tab_names)
+        
+        for i, (tab_type, data) in enumerate(tab_data):
+            with tabs[i]:
+                if tab_type == 'summary':
+                    st.subheader("분석 요약")
+                    if '집계방식' in data:
+                        st.caption(f"신고 건수 집계: {data['집계방식']}")
+                    
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("전체 신고 건수", f"{data.get('전체 신고 건수', 0):,}건")
+                    
+                    if 'Risk분석' in data:
+                        risk_df = data['Risk분석']
+                        with col2:
+                            zero_risk = risk_df[risk_df['Risk 유형'] == '0% Risk']['신고건수'].iloc[0] if len(risk_df) > 0 else 0
+                            st.metric("0% Risk", f"{zero_risk:,}건")
+                        with col3:
+                            eight_percent = risk_df[risk_df['Risk 유형'] == '8% 환급 검토']['신고건수'].iloc[0] if len(risk_df) > 1 else 0
+                            st.metric("8% 환급 검토", f"{eight_percent:,}건")
+                    
+                    # 상세 분석 결과 표시
+                    if 'Risk분석' in data:
+                        st.subheader("Risk 분석 상세")
+                        try:
+                            st.dataframe(data['Risk분석'], use_container_width=True)
+                        except Exception as e:
+                            st.error(f"Risk 분석 표시 중 오류: {e}")
+                    
+                    if '거래구분별' in data:
+                        st.subheader("거래구분별 분석")
+                        try:
+                            st.dataframe(data['거래구분별'], use_container_width=True)
+                        except Exception as e:
+                            st.error(f"거래구분별 분석 표시 중 오류: {e}")
+                    
+                    if '세율구분별' in data:
+                        st.subheader("세율구분별 분석")
+                        try:
+                            st.dataframe(data['세율구분별'], use_container_width=True)
+                        except Exception as e:
+                            st.error(f"세율구분별 분석 표시 중 오류: {e}")
+                    
+                    if '규칙별' in data:
+                        st.subheader("규칙별 해당 건수")
+                        try:
+                            st.dataframe(data['규칙별'], use_container_width=True)
+                        except Exception as e:
+                            st.error(f"규칙별 분석 표시 중 오류: {e}")
+                    
+                    if '신고구조' in data:
+                        st.subheader("신고 구조")
+                        st.caption("배분 불일치: 란의 금액 합계가 란결제금액과 1% 넘게 달라 행별관세 배분 합계가 실제관세액과 다른 란")
+                        st.dataframe(data['신고구조'], use_container_width=True)
+                    
+                    if 'declarations' in results:
+                        render_declaration_lookup(results['declarations'])
                 
-                # Risk 분석
-                if 'Risk분석' in summary_data:
-                    summary_sheet.write(row, 0, 'Risk 분석 요약', header_format)
-                    row += 1
-                    summary_data['Risk분석'].to_excel(writer, sheet_name='Summary', startrow=row, startcol=0, index=False)
-            
-            # 8% 환급 검토 시트
-            if not eight_percent_data.empty:
-                eight_percent_data.to_excel(writer, sheet_name='8% 환급 검토', index=False)
-            
-            # 0% Risk 시트
-            if not zero_risk_data.empty:
-                zero_risk_data.to_excel(writer, sheet_name='0% Risk', index=False)
-            
-            # 세율 Risk 시트
-            if not tariff_risk_data.empty:
-                tariff_risk_data.to_excel(writer, sheet_name='세율 Risk', index=False)
-            
-            # 단가 Risk 시트
-            if not price_risk_data.empty:
-                price_risk_data.to_excel(writer, sheet_name='단가 Risk', index=False)
-            
-            # 원본데이터 시트 (상위 1000개 행만)
-            max_rows = min(1000, len(df_original))
-            df_original.head(max_rows).to_excel(writer, sheet_name='원본데이터', index=False)
-            
-            # 검증방법 시트 생성
-            create_verification_methods_excel_sheet(writer)
-        
-        output.seek(0)
-        return output.getvalue()
-        
-    except Exception as e:
-        st.error(f"엑셀 파일 생성 중 오류 발생: {str(e)}")
-        return None
+                else:
+                    # 데이터프레임 표시
+                    st.subheader(f"총 {len(data):,}건의 데이터")
+                    
+                    # 8% 환급 검토: FTA 협정세율 기준 예상환급액
+                    if tab_type == 'eight_percent' and '예상환급액' in data.columns:
+                        refunds = summarize_refunds(data)
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("FTA 예상환급액 합계", f"{data['예상환급액'].sum():,.0f}원")
+                        with col2:
+                            st.metric("환급 예상 신고 건수", f"{len(refunds):,}건")
+                        st.caption(f"예상환급액은 협정세율 표({os.path.basename(fta_table_path() or '')}) 기준 추정치이며, "
+                                   "실제 환급액은 원산지 증빙과 협정 적용 요건에 따라 달라집니다.")
+                        with st.expander("신고번호별 예상환급액"):
+                            st.dataframe(refunds.head(100), use_container_width=True)
+                    elif tab_type == 'eight_percent':
+                        st.caption("FTA 예상환급액은 환경변수 FTA_RATE_TABLE_PATH에 협정세율 표를 지정하면 계산됩니다.")
+                    
+                    # 단가 변동: 규격1별 변동 건수
+                    if tab_type == 'price_drift':
+                        drift_summary = summarize_drift(data)
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("변동 규격1 수", f"{len(drift_summary):,}개")
+                        with col2:
+                            st.metric("상승 / 하락", f"{(data['변동방향'] == '상승').sum():,} / {(data['변동방향'] == '하락').sum():,}건")
+                        with st.expander("규격1별 변동 건수"):
+                            st.dataframe(drift_summary.head(100), use_container_width=True)
+                    
+                    # 분류 이력: 과거 업로드와 세번부호가 다른 규격1
+                    if tab_type == 'spec_history':
+                        history_summary = summarize_history_conflicts(data)
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("과거와 분류가 다른 규격1", f"{len(history_summary):,}개")
+                        with col2:
+                            st.metric("류(2단위)부터 다른 규격1", f"{(history_summary['분류차이점수'] == 4).sum():,}개")
+                        st.caption("이번 파일에는 없고 이전에 분석한 파일에서만 쓰인 세번부호 (같은 규격1)")
+                        with st.expander("규격1별 이번/과거 세번부호"):
+                            st.dataframe(history_summary.head(100), use_container_width=True)
+                    
+                    # 중복/분할 신고: 유형별 클러스터 수
+                    if tab_type == 'duplicates':
+                        clusters = summarize_duplicate_clusters(data)
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("중복 신고 의심 묶음", f"{(clusters['유형'] == '중복 신고 의심').sum():,}개")
+                        with col2:
+                            st.metric("분할 신고 의심 묶음", f"{(clusters['유형'] == '분할 신고 의심').sum():,}개")
+                        st.caption("중복: B/L번호·규격1·금액이 같은 행이 다른 신고번호에 있음 / "
+                                   "분할: 무역거래처상호·거래품명이 같은 신고가 짧은 간격으로 이어짐")
+                        with st.expander("묶음별 신고번호"):
+                            st.dataframe(clusters.sort_values('신고 건수', ascending=False).head(100),
+                                         use_container_width=True)
+                    
+                    # 세율 Risk: 세번부호 계층(류 → 호 → 소호)별 보기
+                    if tab_type == 'tariff_risk' and '세번부호' in data.columns:
+                        data = render_hs_drilldown(data)
+                    
+                    # 검색 기능
+                    search_term = st.text_input(f"{tab_names[i]} 검색", key=f"search_{tab_type}")
+                    
+                    try:
+                        if search_term:
+                            # 안전한 검색을 위해 모든 컬럼을 문자열로 변환
+                            data_str = data.astype(str)
+                            mask = data_str.apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
+                            filtered_data = data[mask]
+                            st.write(f"검색 결과: {len(filtered_data)}건")
+                            
+                            # 검색 결과 표시
+                            if len(filtered_data) > 0:
+                                # 안전한 표시를 위해 문자열 변환
+                                display_data = filtered_data.copy()
+                                for col in display_data.columns:
+                                    display_data[col] = display_data[col].astype(str)
+                                st.dataframe(display_data, use_container_width=True)
+                            else:
+                                st.info("검색 결과가 없습니다.")
+                        else:
+                            # 페이지네이션
+                            page_size = 100
+                            total_pages = (len(data) - 1) // page_size + 1
+                            page = st.selectbox(f"페이지 ({total_pages}페이지 중)", range(1, total_pages + 1), key=f"page_{tab_type}")
+                            
+                            start_idx = (page - 1) * page_size
+                            end_idx = start_idx + page_size
+                            display_data = data.iloc[start_idx:end_idx].copy()
+                            
+                            # 안전한 표시를 위해 문자열 변환
+                            for col in display_data.columns:
+                                display_data[col] = display_data[col].astype(str)
+                            st.dataframe(display_data, use_container_width=True)
+                            
+                    except Exception as display_error:
+                        st.error(f"데이터 표시 중 오류: {display_error}")
+                        st.info("데이터 형식에 문제가 있어 표시할 수 없습니다. 분석은 정상적으로 완료되었습니다.")
+    
+    # 파일 다운로드
+    st.markdown("---")
+    st.subheader("📥 결과 파일 다운로드")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if excel_data:
+            st.download_button(
+                label="📊 Excel 파일 다운로드",
+                data=excel_data,
+                file_name=f"수입신고분석_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+    
+    with col2:
+        if word_data:
+            st.download_button(
+                label="📄 Word 파일 다운로드",
+                data=word_data,
+                file_name=f"수입신고분석_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+    
+    # 데이터 내보내기 (압축 CSV / Parquet)
+    render_data_export(results, metrics.run_id)
+    render_result_diff(results, metrics.run_id)
+    
+    # 단계별 성능
+    with st.expander("⏱️ 성능"):
+        st.caption(f"실행 ID {metrics.run_id} · 전체 {metrics.total_seconds():.2f}초")
+        st.dataframe(metrics.to_frame(), use_container_width=True)
+        st.caption("CPU 시간은 단계를 실행한 스레드 기준, 메모리 증가는 프로세스 전체 기준입니다 "
+                   "(백그라운드 작업이 동시에 실행되면 다른 작업의 사용량이 포함될 수 있음).")
+        st.caption(
+            f"메모리 예산 {memory_plan['budget_mb']:,.0f}MB · 원본 데이터 약 {memory_plan['frame_mb']:,.0f}MB"
+        )
+        if memory_plan['analyses']:
+            st.dataframe(pd.DataFrame([
+                {'분석': name, '실행 방식': '분할 처리' if entry['chunk_rows'] else '메모리 내 처리',
+                 '예상 메모리(MB)': entry['estimate_mb'], '청크 행수': entry['chunk_rows']}
+                for name, entry in memory_plan['analyses'].items()
+            ]), use_container_width=True)
 
-def create_word_document(eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data):
-    """워드 문서 생성"""
-    try:
-        doc = Document()
-        
-        # 제목 추가
-        doc.add_heading('수입신고 분석 보고서', 0)
-        
-        # 날짜 추가
-        doc.add_paragraph(datetime.datetime.now().strftime("%Y년 %m월 %d일"))
-        
-        # Summary 정보
-        if summary_data:
-            doc.add_heading('분석 요약', level=1)
-            p = doc.add_paragraph()
-            p.add_run(f"전체 신고 건수: {summary_data.get('전체 신고 건수', 0)}건").bold = True
-            
-            if 'Risk분석' in summary_data:
-                risk_df = summary_data['Risk분석']
-                p.add_run("\n\nRisk 분석 결과:")
-                for _, row in risk_df.iterrows():
-                    p.add_run(f"\n- {row['Risk 유형']}: {row['신고건수']}건 ({row['비율(%)']:.1f}%)")
-        
-        # 8% 환급 검토
-        if not eight_percent_data.empty:
-            doc.add_heading('8% 환급 검토', level=1)
-            doc.add_paragraph(f'총 {len(eight_percent_data)}건의 8% 환급 검토 대상이 발견되었습니다.')
-        
-        # 0% Risk
-        if not zero_risk_data.empty:
-            doc.add_heading('0% Risk 분석', level=1)
-            doc.add_paragraph(f'총 {len(zero_risk_data)}건의 0% Risk가 발견되었습니다.')
-        
-        # 세율 Risk
-        if not tariff_risk_data.empty:
-            doc.add_heading('세율 Risk 분석', level=1)
-            doc.add_paragraph(f'총 {len(tariff_risk_data)}건의 세율 Risk가 발견되었습니다.')
-        
-        # 단가 Risk
-        if not price_risk_data.empty:
-            doc.add_heading('단가 Risk 분석', level=1)
-            doc.add_paragraph(f'총 {len(price_risk_data)}건의 단가 Risk가 발견되었습니다.')
-            
-            # 위험도별 분포
-            if '위험도' in price_risk_data.columns:
-                risk_summary = price_risk_data['위험도'].value_counts()
-                p = doc.add_paragraph("위험도 분포:")
-                for risk, count in risk_summary.items():
-                    p.add_run(f"\n- {risk}: {count}건")
-        
-        # 워드 파일을 메모리에서 생성
-        doc_output = io.BytesIO()
-        doc.save(doc_output)
-        doc_output.seek(0)
-        return doc_output.getvalue()
-        
-    except Exception as e:
-        st.error(f"워드 문서 생성 중 오류 발생: {str(e)}")
-        return None
 
 # 메인 애플리케이션
 def main():
@@ -1007,11 +616,33 @@ def main():
         help="분석할 수입신고 데이터가 포함된 엑셀 파일을 업로드하세요."
     )
     
+    # 진행 중이거나 완료된 백그라운드 작업이 있으면 이어서 표시 (?job=<작업 ID>로 재접속 가능)
+    job_id = st.session_state.get('analysis_job') or st.query_params.get('job')
+    if job_id and render_analysis_job(job_id):
+        return
+    
     if uploaded_file is not None:
         try:
             # 파일 정보 표시
             st.success(f"✅ 파일 업로드 완료: {uploaded_file.name}")
             
+            # 업로드 파일 메모리 사용량 사전 추정
+            memory_budget_mb = resolve_memory_budget_mb()
+            upload_estimate_mb = estimate_upload_bytes(uploaded_file.size) / 1024 / 1024
+            if upload_estimate_mb > memory_budget_mb:
+                st.warning(
+                    f"⚠️ 파일 로드에 약 {upload_estimate_mb:,.0f}MB가 필요할 것으로 예상되어 "
+                    f"메모리 예산({memory_budget_mb:,.0f}MB)을 초과합니다. "
+                    "세율 Risk / 단가 Risk는 자동으로 분할 처리됩니다."
+                )
+            
+            # 처음 읽는 대용량 파일은 전체 로드 전에 표본 추정부터 표시 (여러 시트 워크북은 표본 추정 없음)
+            key = upload_dataset_key(uploaded_file)
+            if (uploaded_file.size >= SAMPLE_PREVIEW_MIN_BYTES and
+                    st.sidebar.checkbox("⚡ 로드 전 표본 추정 표시", value=True, key='sample_preview_enabled') and
+                    not get_dataset_store().contains(key)):
+                render_sample_preview(uploaded_file, key)
+            
             # 데이터 읽기
             progress_container = st.container()
             with progress_container:
@@ -1021,10 +652,19 @@ def main():
                 status_text.text("📊 엑셀 파일 읽기 시작...")
                 progress_bar.progress(10)
                 
-                df_original = read_excel_file(uploaded_file, progress_bar, status_text)
+                # 단계별 성능 계측 (성능 패널 및 JSON 로그)
+                metrics = PipelineMetrics(context={'file': uploaded_file.name, 'file_size': uploaded_file.size})
+                # 세션 간 공용 저장소 사용 (재실행이나 다른 세션의 같은 파일은 다시 읽지 않음)
+                if 'dataset_holder' not in st.session_state:
+                    st.session_state['dataset_holder'] = DatasetHolder()
+                with metrics.stage('ingest') as record:
+                    df_original, loaded = load_shared_dataset(
+                        uploaded_file, key, st.session_state['dataset_holder'].holder_id,
+                        progress_bar, status_text, metrics
+                    )
+                    record['rows_out'] = len(df_original) if df_original is not None else 0
+                    record['dataset_cache'] = 'miss' if loaded else 'hit'
                 
-                # 잠시 완료 메시지 표시 후 정리
-                time.sleep(1)
                 progress_bar.empty()
                 status_text.empty()
                 
@@ -1045,7 +685,13 @@ def main():
                         st.info(f"총 {len(df_original):,}행, {len(df_original.columns)}열")
                         
                         # 중복 컬럼이 있었는지 표시
-                        duplicate_cols = [col for col in df_original.columns if '_1' in col or '_2' in col]
+                        loaded_sheets = df_original.attrs.get('ingest_notes', {}).get('sheets', [])
+                        if loaded_sheets:
+                            st.info("여러 시트를 결합했습니다: " + ", ".join(
+                                f"{sheet['시트']} ({sheet['구분']}, {sheet['행수']:,}행)" for sheet in loaded_sheets
+                            ))
+                        
+                        duplicate_cols = df_original.attrs.get('ingest_notes', {}).get('duplicates', [])
                         if duplicate_cols:
                             st.warning(f"중복된 컬럼명이 감지되어 자동으로 처리되었습니다: {', '.join(duplicate_cols[:5])}")
                             
@@ -1057,12 +703,121 @@ def main():
                 st.sidebar.markdown("### 분석 옵션")
                 analysis_options = st.sidebar.multiselect(
                     "수행할 분석을 선택하세요:",
-                    ["Summary", "8% 환급 검토", "0% Risk", "세율 Risk", "단가 Risk"],
-                    default=["Summary", "8% 환급 검토", "0% Risk", "세율 Risk", "단가 Risk"]
+                    ANALYSIS_OPTIONS,
+                    default=ANALYSIS_OPTIONS
                 )
                 
+                # 단가 변동 분석 설정
+                drift_settings = None
+                if "단가 변동" in analysis_options:
+                    drift_settings = {
+                        'window_days': int(st.sidebar.number_input(
+                            "📈 단가 변동 비교 구간 (일)", min_value=1, max_value=365, value=DEFAULT_WINDOW_DAYS,
+                            help="각 행의 단가를 같은 규격1의 직전 구간(수리일자 기준, 당일 제외) 평균과 비교합니다."
+                        )),
+                        'threshold': st.sidebar.slider(
+                            "📈 단가 변동률 기준 (%)", min_value=5, max_value=200,
+                            value=int(DEFAULT_DRIFT_THRESHOLD * 100), step=5
+                        ) / 100,
+                    }
+                
+                # 중복/분할 신고 탐지 설정
+                duplicate_settings = None
+                if "중복/분할 신고" in analysis_options:
+                    duplicate_settings = {
+                        'window_days': int(st.sidebar.number_input(
+                            "🧾 분할 신고 판정 간격 (일)", min_value=0, max_value=90, value=DEFAULT_SPLIT_WINDOW_DAYS,
+                            help="무역거래처상호와 거래품명이 같은 신고가 이 간격 이내로 이어지면 분할 신고 의심으로 묶습니다."
+                        )),
+                    }
+                
+                # 세율 Risk / 단가 Risk 규격 그룹 기준 (기본: 규격1)
+                spec_columns = None
+                spec_choices = [col for col in SPEC_KEY_COLUMNS if col in df_original.columns]
+                if {"세율 Risk", "단가 Risk"} & set(analysis_options) and len(spec_choices) > 1:
+                    spec_columns = resolve_spec_columns(st.sidebar.multiselect(
+                        "🏷️ 규격 그룹 기준",
+                        spec_choices,
+                        default=['규격1'],
+                        help="세율 Risk / 단가 Risk를 선택한 규격 컬럼의 조합으로 묶습니다. "
+                             "규격1이 같아도 규격2/규격3/성분이 다르면 다른 제품으로 봅니다."
+                    ), spec_choices)
+                    if not is_composite(spec_columns):
+                        spec_columns = None
+                
+                # Summary 신고 건수 집계 방식 (기본: 정확)
+                distinct_mode = DISTINCT_EXACT
+                if "Summary" in analysis_options and st.sidebar.checkbox(
+                    "📊 Summary 신고 건수 근사 집계",
+                    value=False,
+                    help="HyperLogLog 스케치로 거래구분별/세율구분별/Risk별 신고 건수를 한 번에 추정합니다 "
+                         "(상대 오차 약 1% 이내, 대용량 데이터에서 메모리 사용량이 일정)."
+                ):
+                    distinct_mode = DISTINCT_SKETCH
+                
+                # 분석 규칙 (기본: rules/default_rules.json)
+                rules_file = st.sidebar.file_uploader(
+                    "📐 사용자 규칙 파일 (선택)",
+                    type=['json', 'yaml', 'yml'],
+                    help="기본 규칙(rules/default_rules.json)과 같은 형식의 JSON/YAML 규칙 파일"
+                )
+                rule_set = load_rule_set()
+                rules_option = None
+                if rules_file is not None:
+                    try:
+                        rules_option = {
+                            'text': rules_file.getvalue().decode('utf-8'),
+                            'format': os.path.splitext(rules_file.name)[1].lstrip('.').lower(),
+                        }
+                        rule_set = resolve_rule_set(rules_option)
+                        missing_rules = [name for name in ('zero_risk', 'eight_percent') if name not in rule_set['rules']]
+                        if missing_rules:
+                            st.sidebar.error(f"필수 규칙이 없습니다: {missing_rules} (기본 규칙 사용)")
+                            rule_set, rules_option = load_rule_set(), None
+                        else:
+                            st.sidebar.success(f"✅ 규칙 {len(rule_set['rules'])}개 로드")
+                    except (RuleError, ValueError) as rule_error:
+                        st.sidebar.error(f"규칙 파일 오류: {rule_error} (기본 규칙 사용)")
+                        rule_set, rules_option = load_rule_set(), None
+                
+                # 백그라운드 실행 여부
+                background_mode = st.sidebar.checkbox(
+                    "🕒 백그라운드 작업으로 실행",
+                    value=True,
+                    help="브라우저를 닫거나 연결이 끊겨도 분석이 계속되며, 다시 접속하면 결과를 확인할 수 있습니다."
+                )
+                
+                # 작업 옵션 (백그라운드 작업과 예측 작업 공용)
+                options = {'analyses': analysis_options, 'rules': rules_option, 'file_name': uploaded_file.name,
+                           'price_drift': drift_settings, 'distinct_mode': distinct_mode,
+                           'duplicates': duplicate_settings, 'spec_columns': spec_columns}
+                
+                # 옵션을 검토하는 동안 현재 옵션으로 미리 분석 (옵션이 바뀌면 이전 예측 작업 철회)
+                speculative_job = None
+                if st.sidebar.checkbox(
+                    "⚡ 업로드 직후 미리 분석",
+                    value=True,
+                    help="옵션을 고르는 동안 현재 옵션으로 분석을 먼저 시작합니다. "
+                         "'분석 시작' 시 옵션이 같으면 진행 중이거나 완료된 결과를 바로 사용합니다."
+                ) and analysis_options:
+                    speculative_job = schedule_speculative_job(uploaded_file, key, options)
+                else:
+                    cancel_speculative_job()
+                
                 if st.sidebar.button("🔍 분석 시작", type="primary"):
-                    results = {}
+                    speculative_state = speculative_job and analysis_queue().get_state(speculative_job)
+                    speculative_ready = bool(speculative_state) and speculative_state['status'] in (
+                        *ACTIVE_STATUSES, STATUS_DONE
+                    )
+                    if background_mode or speculative_ready:
+                        # 작업 큐에 제출 후 진행 상황 화면으로 전환 (예측 작업과 옵션이 같으면 같은 작업을 이어서 사용)
+                        job_id = analysis_queue().submit(
+                            uploaded_file.getvalue(), uploaded_file.name, options, owner=session_owner()
+                        )
+                        st.session_state.pop('speculative_job', None)
+                        st.session_state['analysis_job'] = job_id
+                        st.query_params['job'] = job_id
+                        st.rerun()
                     
                     # 각 분석 수행
                     analysis_container = st.container()
@@ -1070,205 +825,20 @@ def main():
                         progress_bar = st.progress(0)
                         status_text = st.empty()
                         
-                        total_analyses = len(analysis_options)
-                        current_step = 0
-                        
-                        status_text.text("🚀 분석을 시작합니다...")
-                        progress_bar.progress(0)
-                    
-                        # Summary 분석
-                        if "Summary" in analysis_options:
-                            current_step += 1
-                            status_text.text(f"📊 Summary 분석 중... ({current_step}/{total_analyses})")
-                            progress_bar.progress(current_step / total_analyses)
-                            results['summary'] = create_summary_analysis(df_original)
-                        
-                        # 8% 환급 검토
-                        if "8% 환급 검토" in analysis_options:
-                            current_step += 1
-                            status_text.text(f"💰 8% 환급 검토 분석 중... ({current_step}/{total_analyses})")
-                            progress_bar.progress(current_step / total_analyses)
-                            results['eight_percent'] = create_eight_percent_refund_analysis(df_original)
-                        
-                        # 0% Risk
-                        if "0% Risk" in analysis_options:
-                            current_step += 1
-                            status_text.text(f"🟢 0% Risk 분석 중... ({current_step}/{total_analyses})")
-                            progress_bar.progress(current_step / total_analyses)
-                            results['zero_risk'] = create_zero_percent_risk_analysis(df_original)
-                        
-                        # 세율 Risk
-                        if "세율 Risk" in analysis_options:
-                            current_step += 1
-                            status_text.text(f"⚠️ 세율 Risk 분석 중... ({current_step}/{total_analyses})")
-                            progress_bar.progress(current_step / total_analyses)
-                            results['tariff_risk'] = create_tariff_risk_analysis(df_original)
-                        
-                        # 단가 Risk
-                        if "단가 Risk" in analysis_options:
-                            current_step += 1
-                            status_text.text(f"💲 단가 Risk 분석 중... ({current_step}/{total_analyses})")
-                            progress_bar.progress(current_step / total_analyses)
-                            results['price_risk'] = create_price_risk_analysis(df_original)
-                        
-                        progress_bar.progress(1.0)
-                        status_text.text("🎉 모든 분석이 완료되었습니다!")
-                    
-                    # 결과 표시
-                    st.success("🎉 분석이 완료되었습니다!")
-                    
-                    # 탭으로 결과 표시
-                    tab_names = []
-                    tab_data = []
-                    
-                    if 'summary' in results and results['summary']:
-                        tab_names.append("📊 Summary")
-                        tab_data.append(('summary', results['summary']))
-                    
-                    if 'eight_percent' in results and not results['eight_percent'].empty:
-                        tab_names.append("💰 8% 환급 검토")
-                        tab_data.append(('eight_percent', results['eight_percent']))
-                    
-                    if 'zero_risk' in results and not results['zero_risk'].empty:
-                        tab_names.append("🟢 0% Risk")
-                        tab_data.append(('zero_risk', results['zero_risk']))
-                    
-                    if 'tariff_risk' in results and not results['tariff_risk'].empty:
-                        tab_names.append("⚠️ 세율 Risk")
-                        tab_data.append(('tariff_risk', results['tariff_risk']))
-                    
-                    if 'price_risk' in results and not results['price_risk'].empty:
-                        tab_names.append("💲 단가 Risk")
-                        tab_data.append(('price_risk', results['price_risk']))
-                    
-                    if tab_names:
-                        tabs = st.tabs(tab_names)
+                        def report(progress, message):
+                            status_text.text(message)
+                            progress_bar.progress(progress)
                         
-                        for i, (tab_type, data) in enumerate(tab_data):
-                            with tabs[i]:
-                                if tab_type == 'summary':
-                                    st.subheader("분석 요약")
-                                    
-                                    col1, col2, col3 = st.columns(3)
-                                    with col1:
-                                        st.metric("전체 신고 건수", f"{data.get('전체 신고 건수', 0):,}건")
-                                    
-                                    if 'Risk분석' in data:
-                                        risk_df = data['Risk분석']
-                                        with col2:
-                                            zero_risk = risk_df[risk_df['Risk 유형'] == '0% Risk']['신고건수'].iloc[0] if len(risk_df) > 0 else 0
-                                            st.metric("0% Risk", f"{zero_risk:,}건")
-                                        with col3:
-                                            eight_percent = risk_df[risk_df['Risk 유형'] == '8% 환급 검토']['신고건수'].iloc[0] if len(risk_df) > 1 else 0
-                                            st.metric("8% 환급 검토", f"{eight_percent:,}건")
-                                    
-                                    # 상세 분석 결과 표시
-                                    if 'Risk분석' in data:
-                                        st.subheader("Risk 분석 상세")
-                                        try:
-                                            st.dataframe(data['Risk분석'], use_container_width=True)
-                                        except Exception as e:
-                                            st.error(f"Risk 분석 표시 중 오류: {e}")
-                                    
-                                    if '거래구분별' in data:
-                                        st.subheader("거래구분별 분석")
-                                        try:
-                                            st.dataframe(data['거래구분별'], use_container_width=True)
-                                        except Exception as e:
-                                            st.error(f"거래구분별 분석 표시 중 오류: {e}")
-                                    
-                                    if '세율구분별' in data:
-                                        st.subheader("세율구분별 분석")
-                                        try:
-                                            st.dataframe(data['세율구분별'], use_container_width=True)
-                                        except Exception as e:
-                                            st.error(f"세율구분별 분석 표시 중 오류: {e}")
-                                
-                                else:
-                                    # 데이터프레임 표시
-                                    st.subheader(f"총 {len(data):,}건의 데이터")
-                                    
-                                    # 검색 기능
-                                    search_term = st.text_input(f"{tab_names[i]} 검색", key=f"search_{tab_type}")
-                                    
-                                    try:
-                                        if search_term:
-                                            # 안전한 검색을 위해 모든 컬럼을 문자열로 변환
-                                            data_str = data.astype(str)
-                                            mask = data_str.apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-                                            filtered_data = data[mask]
-                                            st.write(f"검색 결과: {len(filtered_data)}건")
-                                            
-                                            # 검색 결과 표시
-                                            if len(filtered_data) > 0:
-                                                # 안전한 표시를 위해 문자열 변환
-                                                display_data = filtered_data.copy()
-                                                for col in display_data.columns:
-                                                    display_data[col] = display_data[col].astype(str)
-                                                st.dataframe(display_data, use_container_width=True)
-                                            else:
-                                                st.info("검색 결과가 없습니다.")
-                                        else:
-                                            # 페이지네이션
-                                            page_size = 100
-                                            total_pages = (len(data) - 1) // page_size + 1
-                                            page = st.selectbox(f"페이지 ({total_pages}페이지 중)", range(1, total_pages + 1), key=f"page_{tab_type}")
-                                            
-                                            start_idx = (page - 1) * page_size
-                                            end_idx = start_idx + page_size
-                                            display_data = data.iloc[start_idx:end_idx].copy()
-                                            
-                                            # 안전한 표시를 위해 문자열 변환
-                                            for col in display_data.columns:
-                                                display_data[col] = display_data[col].astype(str)
-                                            st.dataframe(display_data, use_container_width=True)
-                                            
-                                    except Exception as display_error:
-                                        st.error(f"데이터 표시 중 오류: {display_error}")
-                                        st.info("데이터 형식에 문제가 있어 표시할 수 없습니다. 분석은 정상적으로 완료되었습니다.")
-                    
-                    # 파일 다운로드
-                    st.markdown("---")
-                    st.subheader("📥 결과 파일 다운로드")
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # 엑셀 파일 생성 및 다운로드
-                        excel_data = create_excel_file(
-                            df_original,
-                            results.get('eight_percent', pd.DataFrame()),
-                            results.get('zero_risk', pd.DataFrame()),
-                            results.get('tariff_risk', pd.DataFrame()),
-                            results.get('price_risk', pd.DataFrame()),
-                            results.get('summary', {})
+                        results, memory_plan = run_analyses(
+                            df_original, analysis_options, rule_set, metrics, report, memory_budget_mb,
+                            drift_settings, distinct_mode, {'key': key, 'file_name': uploaded_file.name},
+                            duplicate_settings, spec_columns
                         )
-                        
-                        if excel_data:
-                            st.download_button(
-                                label="📊 Excel 파일 다운로드",
-                                data=excel_data,
-                                file_name=f"수입신고분석_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
                     
-                    with col2:
-                        # 워드 문서 생성 및 다운로드
-                        word_data = create_word_document(
-                            results.get('eight_percent', pd.DataFrame()),
-                            results.get('zero_risk', pd.DataFrame()),
-                            results.get('tariff_risk', pd.DataFrame()),
-                            results.get('price_risk', pd.DataFrame()),
-                            results.get('summary', {})
-                        )
-                        
-                        if word_data:
-                            st.download_button(
-                                label="📄 Word 파일 다운로드",
-                                data=word_data,
-                                file_name=f"수입신고분석_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-                                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                            )
+                    # 결과 파일 생성
+                    excel_data, word_data = build_reports(df_original, results, metrics)
+                    
+                    render_results(results, excel_data, word_data, metrics, memory_plan)
             
         except Exception as e:
             st.error(f"❌ 오류가 발생했습니다: {str(e)}")
@@ -1281,9 +851,12 @@ def main():
             elif "duplicate" in error_message:
                 st.warning("💡 **해결 방법:** 중복된 컬럼명이 있습니다.")
                 st.info("엑셀 파일의 헤더(첫 번째 행)에 같은 이름의 컬럼이 여러 개 있는지 확인해주세요.")
-            elif "memory" in error_message or "size" in error_message:
+            elif isinstance(e, MemoryError) or "memory" in error_message or "size" in error_message:
                 st.warning("💡 **해결 방법:** 파일이 너무 큽니다.")
-                st.info("더 작은 데이터 파일로 테스트하거나, 데이터를 분할해서 업로드해보세요.")
+                st.info(
+                    "세율 Risk / 단가 Risk는 메모리 예산을 초과하면 자동으로 분할 처리됩니다.\n"
+                    "환경변수 ANALYSIS_MEMORY_BUDGET_MB로 예산을 낮추거나, 필요한 분석만 선택해서 실행해보세요."
+                )
             else:
                 st.warning("💡 **일반적인 해결 방법:**")
                 st.info("1. 파일이 .xlsx 또는 .xls 형식인지 확인\n2. 파일이 손상되지 않았는지 확인\n3. 다른 파일로 테스트\n4. 브라우저 새로고침 후 재시도")
@@ -1293,6 +866,12 @@ def main():
                 st.code(traceback.format_exc())
     
     else:
+        # 업로드 파일을 지우면 공용 저장소의 참조 해제
+        if 'dataset_holder' in st.session_state:
+            get_dataset_store().release(st.session_state['dataset_holder'].holder_id)
+        # 미리 시작한 분석도 철회
+        cancel_speculative_job()
+        
         # 사용법 안내
         st.info("👆 좌측 사이드바에서 엑셀 파일을 업로드해주세요.")
         
@@ -1311,6 +890,7 @@ def main():
             - **0% Risk**: 낮은 관세율 Risk 분석
             - **세율 Risk**: 세번부호 불일치 위험 분석
             - **단가 Risk**: 단가 변동성 위험 분석
+            - **분류 이력**: 이전에 분석한 파일과 세번부호가 다른 규격1
             
             ### 📁 지원 파일 형식
             - Excel 파일 (.xlsx, .xls)
@@ -0,0 +1,81 @@
+"""Excel 리포트 생성 벤치마크 (to_excel 방식 vs 템플릿 + 일괄 기록)
+
+대용량 분석 시트 4개(8% 환급 검토, 0% Risk, 세율 Risk, 단가 Risk)로 구성된 리포트를
+기존 pd.ExcelWriter/to_excel 방식과 excel_report.build_excel_report로 각각 생성해
+소요 시간과 파일 크기를 비교합니다.
+
+사용 예:
+    python benchmarks/bench_excel_report.py               # 시트당 500,000행
+    python benchmarks/bench_excel_report.py --rows 100000
+    python benchmarks/bench_excel_report.py --workers 1 4 --skip-legacy  # 작업자 수별 비교
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd  # noqa: E402
+
+from excel_report import (  # noqa: E402
+    PARALLEL_SHEET_MIN_ROWS,
+    build_excel_report,
+    create_verification_methods_excel_sheet,
+    resolve_report_workers,
+    shutdown_report_pool,
+)
+from synthetic_data import generate_declarations  # noqa: E402
+
+SHEET_NAMES = ('8% 환급 검토', '0% Risk', '세율 Risk', '단가 Risk')
+
+
+def build_with_to_excel(df_original, frames, summary_data):
+    """기존 create_excel_file과 같은 pd.ExcelWriter/to_excel 방식"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for name, frame in zip(SHEET_NAMES, frames):
+            frame.to_excel(writer, sheet_name=name, index=False)
+        df_original.head(1000).to_excel(writer, sheet_name='원본데이터', index=False)
+        create_verification_methods_excel_sheet(writer)
+    return output.getvalue()
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    data = func(*args)
+    return time.perf_counter() - started, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel 리포트 생성 벤치마크")
+    parser.add_argument('--rows', type=int, default=500_000, help="시트당 행 수")
+    parser.add_argument('--skip-legacy', action='store_true', help="to_excel 방식 측정 생략")
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="시트 렌더링 작업자 수 목록 (기본: REPORT_WORKERS 또는 CPU 수)")
+    args = parser.parse_args()
+
+    df = generate_declarations(args.rows, max(100, args.rows // 20))
+    frames = [df] * len(SHEET_NAMES)
+    print(f"시트 {len(SHEET_NAMES)}개 × {args.rows:,}행 × {df.shape[1]}열")
+
+    for workers in args.workers or [None]:
+        if workers is not None:
+            os.environ['REPORT_WORKERS'] = str(workers)
+        # 작업자 프로세스 기동 시간 제외
+        build_excel_report(df.head(PARALLEL_SHEET_MIN_ROWS), *[df.head(PARALLEL_SHEET_MIN_ROWS)] * 4, {})
+        template_s, template_size = measure(build_excel_report, df, *frames, {})
+        label = f"template(w={resolve_report_workers()})"
+        print(f"  {label:16s}: {template_s:8.2f}s  {template_size / 1024 / 1024:7.1f}MB")
+        shutdown_report_pool()
+    if not args.skip_legacy:
+        legacy_s, legacy_size = measure(build_with_to_excel, df, frames, {})
+        print(f"  {'to_excel':16s}: {legacy_s:8.2f}s  {legacy_size / 1024 / 1024:7.1f}MB")
+        print(f"  속도 향상: {legacy_s / template_s:.1f}배")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""분석 파이프라인 벤치마크
+
+합성 워크북(benchmarks/synthetic_data.py)을 크기별로 생성/캐시한 뒤
+단계별(ingest, 등록된 배치 ingest, 여러 시트 ingest, 각 create_* 분석, create_excel_file, create_word_document) 소요 시간과
+최대 메모리 증가(단계 구간의 프로세스 RSS 샘플링)를 측정하고 저장된 기준값(benchmarks/baseline.json)과 비교합니다.
+크기별로 --repeat회 반복해 단계별 최소 시간을 기록하며, 기준값 저장과 비교에 같은 반복 횟수를 사용하세요.
+
+사용 예:
+    python benchmarks/run_benchmarks.py                       # 10k/100k/1M 전체
+    python benchmarks/run_benchmarks.py --sizes 10000 100000  # 일부 크기만
+    python benchmarks/run_benchmarks.py --save-baseline       # 기준값 갱신
+"""
+import argparse
+import contextlib
+import datetime
+import logging
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd  # noqa: E402
+
+import analysis_engine as engine  # noqa: E402
+from perf_monitor import PipelineMetrics  # noqa: E402
+from result_diff import diff_results  # noqa: E402
+from sample_preview import build_sample_preview  # noqa: E402
+from synthetic_data import generate_declarations, write_workbook  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+# 여러 시트 워크북 ingest 측정용 시트 수 (같은 데이터를 나눠 기록)
+MULTI_SHEET_COUNT = 4
+
+# 단계 계측 (JSON 로그는 출력하지 않음, 메모리는 단계 구간의 프로세스 RSS 최대 증가량)
+_SILENT_LOGGER = logging.getLogger('benchmarks.silent')
+_SILENT_LOGGER.addHandler(logging.NullHandler())
+_SILENT_LOGGER.propagate = False
+_METRICS = PipelineMetrics(logger=_SILENT_LOGGER)
+
+# 기준값 대비 이 비율 이상 느려지면 회귀로 표시
+REGRESSION_TOLERANCE = 0.20
+
+# 늘어난 시간이 이 값(초) 미만이면 비율과 무관하게 회귀로 보지 않음 (수 ms 단계의 측정 잡음)
+MIN_REGRESSION_SECONDS = 0.05
+
+# 크기별 파이프라인 반복 횟수 (단계별 최소 시간을 기록해 공유 머신의 측정 잡음 완화)
+DEFAULT_REPEAT = 3
+
+# 측정 전 워밍업 워크북 행수 (모듈 import, matplotlib 글꼴 캐시, 프로세스 풀 기동을 측정에서 제외)
+WARMUP_ROWS = 1_000
+
+
+@contextlib.contextmanager
+def temporary_env(name, value):
+    """환경변수를 임시로 지정하고 끝나면 원래 값으로 복원"""
+    previous = os.environ.get(name)
+    os.environ[name] = value
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+
+
+def ensure_workbook(rows, specs=None, seed=42, sheets=1):
+    """크기별 합성 워크북을 생성하거나 캐시된 파일 사용 (sheets > 1이면 같은 데이터를 시트로 나눠 기록)"""
+    specs = specs or max(100, rows // 20)
+    suffix = f'_{sheets}sheets' if sheets > 1 else ''
+    path = os.path.join(DATA_DIR, f'declarations_{rows}_{specs}_{seed}{suffix}.xlsx')
+    if not os.path.exists(path):
+        print(f"  합성 워크북 생성 중: {os.path.basename(path)}")
+        write_workbook(generate_declarations(rows, specs, seed=seed), path, sheets=sheets)
+    return path
+
+
+def time_stage(results, name, func, *args, **kwargs):
+    """단계 하나의 소요 시간/최대 메모리 증가 기록 (perf_monitor 단계 계측 사용)"""
+    gc.collect()
+    with _METRICS.stage(name) as record:
+        value = func(*args, **kwargs)
+    results[name] = {'seconds': record['wall_s'], 'peak_delta_mb': record['process_peak_delta_mb']}
+    print(f"  {name:<38} {record['wall_s']:>9.3f}s  최대 메모리 증가 {results[name]['peak_delta_mb']:>8.1f} MB")
+    return value
+
+
+def run_pipeline(path, multi_sheet_path=None):
+    """업로드 → 분석 → 리포트 생성 전체 단계 측정 (multi_sheet_path: 같은 데이터의 여러 시트 워크북)"""
+    stages = {}
+    with tempfile.TemporaryDirectory() as schema_dir, \
+            temporary_env('ANALYSIS_SCHEMA_CACHE', os.path.join(schema_dir, 'schemas.json')):
+        # 처음 보는 배치(일반 로드 + 등록)와 등록된 배치(고속 읽기)를 각각 측정
+        df = time_stage(stages, 'ingest', engine.read_excel_file, path)
+        time_stage(stages, 'ingest_known_layout', engine.read_excel_file, path)
+        if multi_sheet_path:
+            time_stage(stages, 'ingest_multi_sheet', engine.read_excel_file, multi_sheet_path)
+    time_stage(stages, 'build_sample_preview', build_sample_preview, path, engine.load_rule_set())
+    rule_masks = time_stage(stages, 'evaluate_rules', engine.evaluate_rules, df)
+    decl_index = time_stage(stages, 'build_declaration_index', engine.build_declaration_index, df)
+    time_stage(stages, 'validate_dataset', engine.validate_dataset, df, decl_index)
+    summary = time_stage(stages, 'create_summary_analysis', engine.create_summary_analysis, df, rule_masks,
+                         decl_index=decl_index)
+    time_stage(stages, 'create_summary_analysis_sketch', engine.create_summary_analysis, df, rule_masks,
+               distinct_mode=engine.DISTINCT_SKETCH)
+    eight = time_stage(stages, 'create_eight_percent_refund_analysis',
+                       engine.create_eight_percent_refund_analysis, df, rule_masks)
+    zero = time_stage(stages, 'create_zero_percent_risk_analysis',
+                      engine.create_zero_percent_risk_analysis, df, rule_masks)
+    tariff = time_stage(stages, 'create_tariff_risk_analysis', engine.create_tariff_risk_analysis, df)
+    price = time_stage(stages, 'create_price_risk_analysis', engine.create_price_risk_analysis, df)
+    composite = ['규격1', '규격2', '규격3', '성분1']
+    time_stage(stages, 'create_tariff_risk_analysis_composite', engine.create_tariff_risk_analysis, df,
+               spec_columns=composite)
+    time_stage(stages, 'create_price_risk_analysis_composite', engine.create_price_risk_analysis, df,
+               spec_columns=composite)
+    time_stage(stages, 'create_price_drift_analysis', engine.create_price_drift_analysis, df)
+    with tempfile.TemporaryDirectory() as history_dir, \
+            temporary_env('ANALYSIS_HISTORY_DB', os.path.join(history_dir, 'history.sqlite')):
+        # 빈 이력에 한 번 누적한 뒤 같은 규격1 이력과 대조하는 시간 측정
+        engine.create_spec_history_analysis(df, {'key': 'benchmark'})
+        time_stage(stages, 'create_spec_history_analysis', engine.create_spec_history_analysis, df)
+    time_stage(stages, 'create_duplicate_analysis', engine.create_duplicate_analysis, df)
+
+    # 이전 결과 비교 (같은 결과끼리: 키 결합과 내용 해시 비교 전체 수행)
+    snapshot = {'tariff_risk': tariff, 'price_risk': price}
+    time_stage(stages, 'diff_results', diff_results, snapshot, snapshot)
+    frames = [frame if frame is not None else pd.DataFrame() for frame in (eight, zero, tariff, price)]
+    time_stage(stages, 'create_excel_file', engine.create_excel_file, df, *frames, summary)
+    time_stage(stages, 'create_word_document', engine.create_word_document, *frames, summary)
+    return {'rows': len(df), 'stages': stages}
+
+
+def best_of(runs):
+    """반복 측정 결과 → 단계별 최소 시간 / 최대 메모리 증가"""
+    stages = {}
+    for name in runs[0]['stages']:
+        measured = [run['stages'][name] for run in runs]
+        stages[name] = {
+            'seconds': min(entry['seconds'] for entry in measured),
+            'peak_delta_mb': max(entry['peak_delta_mb'] for entry in measured),
+        }
+    return {'rows': runs[0]['rows'], 'stages': stages}
+
+
+def compare_with_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """기준값 대비 단계별 변화율 출력, 회귀 단계 목록 반환 (min_seconds 미만 증가는 제외)"""
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            print(f"\n[{size}행] 기준값 없음")
+            continue
+        print(f"\n[{size}행] 기준값 대비")
+        for stage, metrics in result['stages'].items():
+            base_metrics = base['stages'].get(stage)
+            if not base_metrics or base_metrics['seconds'] <= 0:
+                continue
+            change = metrics['seconds'] / base_metrics['seconds'] - 1
+            flag = ''
+            if change > tolerance and metrics['seconds'] - base_metrics['seconds'] >= min_seconds:
+                flag = '  ⚠️ 회귀'
+                regressions.append((size, stage, change))
+            print(f"  {stage:<38} {base_metrics['seconds']:>9.3f}s → {metrics['seconds']:>9.3f}s ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수입신고 분석 파이프라인 벤치마크")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--specs', type=int, default=None, help="고유 규격1 개수 (기본: 행수/20)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="크기별 반복 횟수 (단계별 최소 시간 기록)")
+    parser.add_argument('--min-seconds', type=float, default=MIN_REGRESSION_SECONDS,
+                        help="회귀로 표시할 최소 증가 시간(초)")
+    parser.add_argument('-o', '--output', help="측정 결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    # 첫 호출에만 드는 비용이 첫 번째 크기의 측정값에 섞이지 않도록 작은 워크북으로 한 번 실행
+    print(f"\n=== 워밍업 ({WARMUP_ROWS:,}행, 기록하지 않음) ===")
+    run_pipeline(ensure_workbook(WARMUP_ROWS), ensure_workbook(WARMUP_ROWS, sheets=MULTI_SHEET_COUNT))
+
+    results = {}
+    for rows in args.sizes:
+        print(f"\n=== {rows:,}행 ===")
+        path = ensure_workbook(rows, args.specs)
+        multi_sheet_path = ensure_workbook(rows, args.specs, sheets=MULTI_SHEET_COUNT)
+        runs = []
+        for attempt in range(max(1, args.repeat)):
+            if args.repeat > 1:
+                print(f"  --- {attempt + 1}/{args.repeat}회차 ---")
+            runs.append(run_pipeline(path, multi_sheet_path))
+        results[str(rows)] = best_of(runs)
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'repeat': max(1, args.repeat),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        baseline = {'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in report.items() if k != 'results'})
+        baseline.setdefault('results', {}).update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n기준값 저장: {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)}개 단계가 기준값보다 {args.tolerance:.0%} 이상 느려졌습니다.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""합성 수입신고 데이터 생성기
+
+실제 UNI-PASS 수입신고 RAW 엑셀과 같은 구조(중복 헤더, '수량_1'/'수량단위_1',
+70/71번째 위치의 세율구분/관세실행세율 컬럼)를 가진 벤치마크용 워크북을 생성합니다.
+
+사용 예:
+    python benchmarks/synthetic_data.py --rows 100000 --specs 5000 -o benchmarks/data/decl_100k.xlsx
+"""
+import argparse
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+# 세율구분 코드와 대략적인 출현 비율
+RATE_TYPES = ['A', 'C', 'FCN1', 'FUS1', 'FEU1', 'FAS1', 'E1', 'U']
+RATE_TYPE_WEIGHTS = [0.35, 0.15, 0.15, 0.1, 0.08, 0.05, 0.07, 0.05]
+RATE_DESCRIPTIONS = {
+    'A': '기본세율', 'C': 'WTO협정세율', 'FCN1': '한-중 FTA', 'FUS1': '한-미 FTA',
+    'FEU1': '한-EU FTA', 'FAS1': '한-아세안 FTA', 'E1': '아시아태평양협정', 'U': '잠정세율',
+}
+TARIFF_RATES = [0, 3, 5, 6.5, 8, 13]
+COUNTRIES = ['CN', 'US', 'DE', 'JP', 'VN', 'TW', 'IT', 'FR']
+TRADE_TYPES = ['11', '15', '21', '29', '87', '94']
+PAYMENT_METHODS = ['TT', 'LC', 'DA', 'DP', 'GN']
+CURRENCIES = ['USD', 'EUR', 'JPY', 'CNY']
+UNITS = ['KG', 'EA', 'L', 'M']
+
+# 위치 기반 매핑(70/71번째 컬럼) 재현을 위한 원본 헤더명
+POSITIONAL_RATE_HEADERS = ('세율코드', '실행세율')
+
+
+def _hs_codes(rng, n_codes):
+    """10자리 세번부호 목록 (장/호/소호가 겹치도록 생성)"""
+    chapters = rng.choice(np.arange(25, 98), size=max(1, n_codes // 20))
+    codes = set()
+    while len(codes) < n_codes:
+        chapter = rng.choice(chapters)
+        heading = rng.integers(1, 20)
+        sub = rng.integers(10, 99)
+        tail = rng.integers(0, 10000)
+        codes.add(f"{chapter:02d}{heading:02d}{sub:02d}{tail:04d}")
+    return np.array(sorted(codes))
+
+
+def generate_declarations(rows=10000, specs=1000, lines_per_declaration=3, rows_per_line=2,
+                          conflict_ratio=0.05, price_noise=0.15, start_date='2024-01-01',
+                          days=365, seed=42):
+    """합성 수입신고 데이터프레임 생성
+
+    Args:
+        rows: 생성할 행 수
+        specs: 고유 규격1 개수 (카디널리티)
+        lines_per_declaration: 신고당 평균 란 수
+        rows_per_line: 란당 평균 행 수
+        conflict_ratio: 두 개 이상의 세번부호로 분류되는 규격1 비율 (세율 Risk)
+        price_noise: 규격1별 단가 변동 표준편차 (기준단가 대비 비율, 단가 Risk)
+        seed: 난수 시드
+
+    Returns:
+        분석 컬럼명을 가진 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+
+    # 규격1별 기본 속성
+    spec_names = np.array([f"SPEC-{i:07d} {rng.choice(['LG', 'SM', 'XL'])}" for i in range(specs)])
+    hs_pool = _hs_codes(rng, max(10, specs // 4))
+    spec_hs = rng.choice(hs_pool, size=specs)
+    spec_alt_hs = rng.choice(hs_pool, size=specs)
+    spec_conflict = rng.random(specs) < conflict_ratio
+    spec_price = np.round(rng.lognormal(mean=3, sigma=1.2, size=specs), 2)
+    spec_rate = rng.choice(TARIFF_RATES, size=specs)
+
+    # 신고 → 란 → 행 계층
+    rows_per_decl = lines_per_declaration * rows_per_line
+    n_decl = max(1, rows // rows_per_decl)
+    decl_idx = np.sort(rng.integers(0, n_decl, size=rows))
+    line_no = rng.integers(1, lines_per_declaration + 1, size=rows)
+    order = np.lexsort((line_no, decl_idx))
+    decl_idx, line_no = decl_idx[order], line_no[order]
+    row_no = pd.Series(np.ones(rows, dtype=int)).groupby([decl_idx, line_no]).cumsum().to_numpy()
+
+    spec_idx = rng.integers(0, specs, size=rows)
+    use_alt = spec_conflict[spec_idx] & (rng.random(rows) < 0.3)
+    hs = np.where(use_alt, spec_alt_hs[spec_idx], spec_hs[spec_idx])
+
+    base_date = np.datetime64(start_date)
+    decl_day = rng.integers(0, days, size=n_decl)
+    accept_date = base_date + decl_day[decl_idx].astype('timedelta64[D]')
+
+    rate_type = rng.choice(RATE_TYPES, size=rows, p=RATE_TYPE_WEIGHTS)
+    tariff_rate = np.where(np.char.startswith(rate_type.astype(str), 'F'), 0, spec_rate[spec_idx])
+
+    quantity = rng.integers(1, 500, size=rows)
+    unit_price = np.round(spec_price[spec_idx] * (1 + rng.normal(0, price_noise, size=rows)).clip(0.05), 2)
+    amount = np.round(quantity * unit_price, 2)
+
+    line_key = pd.MultiIndex.from_arrays([decl_idx, line_no])
+    line_amount = pd.Series(amount).groupby(line_key).transform('sum').to_numpy()
+    taxable_krw = np.round(line_amount * 1300)
+    actual_duty = np.round(taxable_krw * tariff_rate / 100)
+
+    origin = rng.choice(COUNTRIES, size=rows)
+    export_country = np.where(rng.random(rows) < 0.7, origin, rng.choice(COUNTRIES, size=rows))
+    partner = rng.integers(0, max(1, specs // 10), size=rows)
+
+    df = pd.DataFrame({
+        '수입신고번호': np.char.add('43210-24-', np.char.zfill(decl_idx.astype(str), 7)),
+        '수리일자': pd.to_datetime(accept_date).strftime('%Y-%m-%d'),
+        'B/L번호': np.char.add('BL', np.char.zfill((decl_idx * 7 + 13).astype(str), 9)),
+        '거래구분': rng.choice(TRADE_TYPES, size=n_decl)[decl_idx],
+        '결제방법': rng.choice(PAYMENT_METHODS, size=n_decl)[decl_idx],
+        '결제통화단위': rng.choice(CURRENCIES, size=n_decl)[decl_idx],
+        '무역거래처상호': np.char.add('TRADER ', partner.astype(str)),
+        '무역거래처국가코드': origin,
+        '적출국코드': export_country,
+        '원산지코드': origin,
+        '란번호': line_no,
+        '행번호': row_no,
+        '세번부호': hs,
+        '거래품명': np.char.add('GOODS ', (spec_idx % 500).astype(str)),
+        '규격1': spec_names[spec_idx],
+        '규격2': np.char.add('SIZE ', (spec_idx % 37).astype(str)),
+        '규격3': np.char.add('LOT ', (spec_idx % 11).astype(str)),
+        '성분1': np.char.add('COMP ', (spec_idx % 13).astype(str)),
+        '성분2': '',
+        '성분3': '',
+        '수량': quantity,
+        '수량단위': rng.choice(UNITS, size=specs)[spec_idx],
+        '수량_1': quantity,
+        '수량단위_1': rng.choice(UNITS, size=specs)[spec_idx],
+        '단가': unit_price,
+        '금액': amount,
+        '란결제금액': line_amount,
+        '과세가격달러': np.round(line_amount * 1.02, 2),
+        '실제관세액': actual_duty,
+        '세율설명': pd.Series(rate_type).map(RATE_DESCRIPTIONS).to_numpy(),
+        '세율구분': rate_type,
+        '관세실행세율': tariff_rate,
+    })
+    return df
+
+
+def to_export_layout(df, width=72, positional_rate_columns=True, duplicate_headers=True):
+    """분석 컬럼을 UNI-PASS 내보내기 헤더 배치로 변환
+
+    - 세율구분/관세실행세율을 70/71번째 위치에 배치 (positional_rate_columns=True이면 다른 헤더명 사용)
+    - duplicate_headers=True이면 '비고' 헤더를 중복으로 기록 (중복 컬럼명 처리 경로 재현)
+    - 나머지 위치는 '예비항목N' 컬럼으로 채움
+
+    Returns:
+        (헤더 목록, 컬럼 배열 목록)
+    """
+    core = [col for col in df.columns if col not in ('세율구분', '관세실행세율')]
+    fillers = ['비고', '비고'] if duplicate_headers else []
+    fillers += [f'예비항목{i}' for i in range(max(0, 70 - len(core) - len(fillers)))]
+    headers = core + fillers
+    rate_headers = POSITIONAL_RATE_HEADERS if positional_rate_columns else ('세율구분', '관세실행세율')
+    headers += list(rate_headers)
+    headers += [f'예비항목{i}' for i in range(len(fillers), len(fillers) + max(0, width - len(headers)))]
+
+    values = []
+    for col in core:
+        values.append(df[col].to_numpy())
+    values += [None] * len(fillers)
+    values += [df['세율구분'].to_numpy(), df['관세실행세율'].to_numpy()]
+    values += [None] * (len(headers) - len(values))
+
+    return headers, values
+
+
+def write_workbook(df, path, sheets=1, **layout_kwargs):
+    """xlsxwriter constant_memory 모드로 워크북 기록 (1M행도 메모리 일정)
+
+    sheets > 1이면 행을 순서대로 나눠 같은 헤더의 시트 여러 개로 기록 (기간별 분할 내보내기 재현)
+    """
+    import xlsxwriter
+
+    headers, values = to_export_layout(df, **layout_kwargs)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    columns = [(c, v.tolist() if v is not None else None) for c, v in enumerate(values)]
+    bounds = np.linspace(0, len(df), sheets + 1).astype(int)
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        worksheet = workbook.add_worksheet(f'Sheet{i + 1}')
+        worksheet.write_row(0, 0, headers)
+        for r in range(start, end):
+            for c, col_values in columns:
+                if col_values is not None:
+                    worksheet.write(r - start + 1, c, col_values[r])
+    workbook.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 수입신고 워크북 생성")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--specs', type=int, default=1000)
+    parser.add_argument('--conflict-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--named-rate-columns', action='store_true',
+                        help="세율구분/관세실행세율을 위치 기반이 아닌 원래 헤더명으로 기록")
+    parser.add_argument('--sheets', type=int, default=1, help="행을 나눠 기록할 시트 수")
+    parser.add_argument('-o', '--output', required=True)
+    args = parser.parse_args()
+
+    started = datetime.datetime.now()
+    df = generate_declarations(args.rows, args.specs, conflict_ratio=args.conflict_ratio, seed=args.seed)
+    write_workbook(df, args.output, sheets=args.sheets, positional_rate_columns=not args.named_rate_columns)
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    print(f"{args.output}: {len(df):,}행 생성 ({elapsed:.1f}초)")
+
+
+if __name__ == '__main__':
+    main()
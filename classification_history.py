@@ -0,0 +1,198 @@
+"""규격1 → 세번부호 분류 이력 (업로드 간 누적 인덱스)
+
+세율 Risk는 한 파일 안에서만 같은 규격1의 세번부호 충돌을 찾으므로,
+지난 분기에 3901.10으로, 이번 달에 3901.20으로 신고한 규격은 보이지 않습니다.
+
+분석한 업로드마다 (규격1, 세번부호)별 행수, 최초/최종 수리일자, 최종 수리일자의 관세실행세율을
+로컬 SQLite 파일에 누적하고, 새 업로드는 그 이력과 대조해 과거에만 쓰인 세번부호가 있는 규격1을 찾습니다.
+
+- 대조: 업로드의 고유 규격1을 임시 테이블에 일괄 입력한 뒤 이력 테이블과 한 번의 JOIN으로 읽고,
+  이후 비교는 pandas merge로 처리합니다 (행/규격별 개별 조회 없음)
+- 누적: 같은 파일(내용 해시)은 한 번만 반영하며 (규격1, 세번부호) 단위 UPSERT로 병합합니다
+- 세번부호는 숫자만 남겨 비교합니다 ('3901100000.0' = '3901100000')
+- 저장 위치: 환경변수 ANALYSIS_HISTORY_DB (기본: ~/.cache/import_analysis/classification_history.sqlite)
+"""
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from hs_index import normalize_hs, pairwise_divergence
+from price_drift import parse_accept_dates
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'import_analysis', 'classification_history.sqlite'
+)
+
+# SQLite 잠금 대기 시간 (초, 여러 세션/작업이 동시에 기록하는 경우)
+LOCK_TIMEOUT = 30
+
+# 임시 테이블 일괄 입력 단위
+INSERT_BATCH_ROWS = 50_000
+
+HISTORY_COLUMNS = ['규격1', '세번부호', '관세실행세율', '이번 행수', '과거 세번부호', '과거 관세실행세율',
+                   '과거 최초 수리일자', '과거 최종 수리일자', '과거 행수', '과거 업로드 수',
+                   '분류차이', '분류차이점수']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    dataset_key TEXT PRIMARY KEY,
+    file_name TEXT,
+    recorded_at TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spec_history (
+    spec TEXT NOT NULL,
+    hs_code TEXT NOT NULL,
+    rate REAL,
+    first_date TEXT,
+    last_date TEXT,
+    rows INTEGER NOT NULL,
+    uploads INTEGER NOT NULL,
+    PRIMARY KEY (spec, hs_code)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO spec_history (spec, hs_code, rate, first_date, last_date, rows, uploads)
+VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (spec, hs_code) DO UPDATE SET
+    rate = CASE WHEN last_date IS NULL OR excluded.last_date >= last_date
+                THEN COALESCE(excluded.rate, rate) ELSE rate END,
+    first_date = CASE WHEN first_date IS NULL OR excluded.first_date < first_date
+                      THEN excluded.first_date ELSE first_date END,
+    last_date = CASE WHEN last_date IS NULL OR excluded.last_date > last_date
+                     THEN excluded.last_date ELSE last_date END,
+    rows = rows + excluded.rows,
+    uploads = uploads + 1
+"""
+
+
+def history_path():
+    return os.environ.get('ANALYSIS_HISTORY_DB') or DEFAULT_HISTORY_PATH
+
+
+def _connect(path=None):
+    path = path or history_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _iso_dates(days):
+    """1970-01-01 기준 일수 → 'YYYY-MM-DD' (NaN은 None)"""
+    days = np.asarray(days, dtype='float64')
+    text = np.datetime_as_string(np.where(np.isnan(days), 0, days).astype('int64').astype('datetime64[D]'))
+    return np.where(np.isnan(days), None, text.astype(object))
+
+
+def summarize_classifications(df):
+    """업로드 → (규격1, 세번부호)별 행수, 최초/최종 수리일자, 최종 수리일자의 관세실행세율
+
+    규격1 또는 세번부호가 비어 있는 행은 제외합니다.
+    """
+    columns = ['규격1', '세번부호', '관세실행세율', '최초 수리일자', '최종 수리일자', '행수']
+    if not {'규격1', '세번부호'} <= set(df.columns):
+        return pd.DataFrame(columns=columns)
+    spec = df['규격1'].astype(str).str.strip().where(df['규격1'].notna(), '')
+    work = pd.DataFrame({
+        '규격1': spec.to_numpy(dtype=object),
+        '세번부호': normalize_hs(df['세번부호']).to_numpy(dtype=object),
+        '관세실행세율': (pd.to_numeric(df['관세실행세율'], errors='coerce').to_numpy(dtype='float64')
+                   if '관세실행세율' in df.columns else np.nan),
+        'days': parse_accept_dates(df['수리일자']) if '수리일자' in df.columns else np.nan,
+    })
+    work = work[(work['규격1'] != '') & (work['세번부호'] != '')]
+    if work.empty:
+        return pd.DataFrame(columns=columns)
+    # 최종 수리일자 행의 세율을 쓰기 위해 일자순 정렬 후 그룹별 마지막 값
+    work = work.sort_values('days', kind='stable', na_position='first')
+    grouped = work.groupby(['규격1', '세번부호'], sort=True)
+    table = grouped.agg(관세실행세율=('관세실행세율', 'last'), first=('days', 'min'), last=('days', 'max'),
+                        행수=('days', 'size')).reset_index()
+    table['최초 수리일자'] = _iso_dates(table.pop('first'))
+    table['최종 수리일자'] = _iso_dates(table.pop('last'))
+    return table[columns]
+
+
+def load_history(specs, path=None):
+    """규격1 목록의 누적 이력 (임시 테이블 JOIN 한 번으로 조회)"""
+    specs = pd.unique(pd.Series(specs, dtype=object))
+    conn = _connect(path)
+    try:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS upload_specs (spec TEXT PRIMARY KEY) WITHOUT ROWID")
+        conn.execute("DELETE FROM upload_specs")
+        for start in range(0, len(specs), INSERT_BATCH_ROWS):
+            conn.executemany("INSERT OR IGNORE INTO upload_specs VALUES (?)",
+                             ((spec,) for spec in specs[start:start + INSERT_BATCH_ROWS]))
+        return pd.read_sql_query(
+            "SELECT h.spec AS 규격1, h.hs_code AS '과거 세번부호', h.rate AS '과거 관세실행세율', "
+            "h.first_date AS '과거 최초 수리일자', h.last_date AS '과거 최종 수리일자', "
+            "h.rows AS '과거 행수', h.uploads AS '과거 업로드 수' "
+            "FROM spec_history h JOIN upload_specs USING (spec)",
+            conn,
+        )
+    finally:
+        conn.close()
+
+
+def check_against_history(summary, path=None):
+    """이번 업로드 요약과 이력 대조 → 과거에만 쓰인 세번부호가 있는 규격1의 (이번, 과거) 세번부호 쌍
+
+    분류차이/분류차이점수는 두 세번부호가 갈라지는 최상위 계층 기준입니다 (hs_index와 같은 점수).
+    """
+    if summary.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    history = load_history(summary['규격1'], path)
+    if history.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    # 이번 업로드에도 있는 (규격1, 세번부호)는 충돌이 아님
+    current_pairs = pd.MultiIndex.from_frame(summary[['규격1', '세번부호']])
+    past_only = ~pd.MultiIndex.from_arrays([history['규격1'], history['과거 세번부호']]).isin(current_pairs)
+    history = history[past_only]
+    if history.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    current = summary[['규격1', '세번부호', '관세실행세율', '행수']].rename(columns={'행수': '이번 행수'})
+    pairs = current.merge(history, on='규격1', how='inner')
+    pairs['분류차이'], pairs['분류차이점수'] = pairwise_divergence(pairs['세번부호'], pairs['과거 세번부호'])
+    pairs = pairs.sort_values(['분류차이점수', '규격1', '세번부호', '과거 세번부호'],
+                              ascending=[False, True, True, True], kind='stable')
+    return pairs[HISTORY_COLUMNS].reset_index(drop=True)
+
+
+def record_upload(summary, dataset_key, file_name=None, rows=0, path=None):
+    """업로드 요약을 이력에 누적 (이미 반영한 파일이면 건너뛰고 False)"""
+    conn = _connect(path)
+    try:
+        with conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO uploads VALUES (?, ?, ?, ?)",
+                (dataset_key, file_name, datetime.datetime.now().isoformat(timespec='seconds'), int(rows)),
+            ).rowcount
+            if not inserted:
+                return False
+            rates = summary['관세실행세율'].astype(object).where(summary['관세실행세율'].notna(), None)
+            conn.executemany(_UPSERT, zip(
+                summary['규격1'], summary['세번부호'], rates,
+                summary['최초 수리일자'], summary['최종 수리일자'], summary['행수'].astype(int).tolist(),
+            ))
+        return True
+    finally:
+        conn.close()
+
+
+def summarize_history_conflicts(conflicts):
+    """규격1별 과거 분류 충돌 요약 (이번/과거 세번부호 목록, 최고 분류차이점수)"""
+    if conflicts.empty:
+        return pd.DataFrame(columns=['규격1', '이번 세번부호', '과거 세번부호', '분류차이점수'])
+
+    def join(values):
+        return ', '.join(sorted(set(values)))
+
+    return (conflicts.groupby('규격1', sort=False)
+            .agg(**{'이번 세번부호': ('세번부호', join), '과거 세번부호': ('과거 세번부호', join),
+                    '분류차이점수': ('분류차이점수', 'max')})
+            .reset_index())
@@ -0,0 +1,233 @@
+"""분석 결과 데이터 내보내기 (압축 CSV / Parquet)
+
+분석 결과 데이터프레임을 gzip·zstd 압축 CSV 또는 Parquet 파일로 변환해 하나의 zip 파일에 담습니다.
+각 데이터프레임은 청크 단위로 압축 스트림에 바로 기록하므로 전체 파일을 메모리에 만들지 않습니다.
+(Streamlit 다운로드 버튼은 완성된 zip 파일 전체를 메모리에 올리므로, 생성 단계에만 해당)
+
+- CSV (gzip): 추가 패키지 불필요, UTF-8 BOM 포함 (엑셀에서 한글 표시), pyarrow가 있으면 pyarrow CSV writer 사용
+- CSV (zstd): zstandard 패키지 필요
+- Parquet: pyarrow 패키지 필요 (zstd 압축, 청크별 row group)
+
+저장 위치: 환경변수 ANALYSIS_EXPORT_DIR (기본: ~/.cache/import_analysis/exports)
+"""
+import gzip
+import io
+import os
+import re
+import time
+import zipfile
+
+DEFAULT_EXPORT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'import_analysis', 'exports')
+
+# 청크당 행수
+EXPORT_CHUNK_ROWS = 200_000
+
+# 엑셀에서 한글이 깨지지 않도록 CSV 앞에 기록
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# 압축 수준 (속도 우선)
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+# 내보내기 파일 보관 기간 (시간)
+EXPORT_RETENTION_HOURS = 24
+
+EXPORT_FORMATS = {
+    'csv_gzip': {'label': 'CSV (gzip)', 'extension': '.csv.gz'},
+    'csv_zstd': {'label': 'CSV (zstd)', 'extension': '.csv.zst'},
+    'parquet': {'label': 'Parquet', 'extension': '.parquet'},
+}
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def available_export_formats():
+    """설치된 패키지로 사용 가능한 내보내기 형식 목록"""
+    formats = ['csv_gzip']
+    if _has_module('zstandard'):
+        formats.append('csv_zstd')
+    if _has_module('pyarrow'):
+        formats.append('parquet')
+    return formats
+
+
+def safe_entry_name(name):
+    """시트명 → zip 항목 파일명 (공백/특수문자 → '_')"""
+    return re.sub(r'[^\w.-]+', '_', str(name)).strip('_') or 'data'
+
+
+def _normalize_chunk(chunk):
+    """혼합 타입 object 컬럼을 문자열로 통일 (결측값 유지)"""
+    chunk = chunk.copy()
+    for i in range(chunk.shape[1]):
+        series = chunk.iloc[:, i]
+        if series.dtype == object:
+            chunk.iloc[:, i] = series.where(series.isna(), series.astype(str))
+    # 중복/비문자열 컬럼명 정리 (Parquet 스키마용)
+    chunk.columns = _unique_columns(chunk.columns)
+    return chunk
+
+
+def _unique_columns(columns):
+    seen = {}
+    names = []
+    for col in map(str, columns):
+        count = seen.get(col, 0)
+        seen[col] = count + 1
+        names.append(col if count == 0 else f'{col}_{count}')
+    return names
+
+
+def _iter_chunks(frame, chunk_rows):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield start, frame.iloc[start:start + chunk_rows]
+
+
+def _write_csv(frame, stream, chunk_rows):
+    """CSV 청크 기록 (pyarrow가 있으면 pyarrow CSV writer 사용)"""
+    stream.write(UTF8_BOM)
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa = None
+
+    if pa is None:
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        for start, chunk in _iter_chunks(frame, chunk_rows):
+            chunk.to_csv(text, header=start == 0, index=False)
+        text.flush()
+        text.detach()
+        return
+
+    for start, chunk in _iter_chunks(frame, chunk_rows):
+        table = pa.Table.from_pandas(_normalize_chunk(chunk), preserve_index=False)
+        options = pa_csv.WriteOptions(include_header=start == 0, quoting_style='needed')
+        pa_csv.write_csv(table, stream, write_options=options)
+
+
+def write_csv_gzip(frame, entry, chunk_rows=EXPORT_CHUNK_ROWS):
+    """gzip 압축 CSV 기록"""
+    with gzip.GzipFile(fileobj=entry, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as stream:
+        _write_csv(frame, stream, chunk_rows)
+
+
+def write_csv_zstd(frame, entry, chunk_rows=EXPORT_CHUNK_ROWS):
+    """zstd 압축 CSV 기록"""
+    import zstandard
+
+    with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(entry, closefd=False) as stream:
+        _write_csv(frame, stream, chunk_rows)
+
+
+def _parquet_schema(frame):
+    """전체 데이터프레임의 dtype 기준 Parquet 스키마 (청크마다 추론하지 않음)
+
+    object 컬럼은 _normalize_chunk가 문자열로 통일하므로 문자열, 나머지는 dtype 그대로 사용합니다.
+    """
+    import pyarrow as pa
+
+    head = _normalize_chunk(frame.iloc[:0])
+    schema = pa.Schema.from_pandas(head, preserve_index=False)
+    for i, field in enumerate(schema):
+        if frame.dtypes.iloc[i] == object or pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def write_parquet(frame, entry, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Parquet 기록 (청크별 row group, 모든 청크를 같은 스키마로 변환)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(frame)
+    with pq.ParquetWriter(entry, schema, compression='zstd') as writer:
+        for _, chunk in _iter_chunks(frame, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(_normalize_chunk(chunk), schema=schema, preserve_index=False))
+
+
+_WRITERS = {
+    'csv_gzip': write_csv_gzip,
+    'csv_zstd': write_csv_zstd,
+    'parquet': write_parquet,
+}
+
+
+def write_export_archive(frames, fmt, target, chunk_rows=EXPORT_CHUNK_ROWS):
+    """데이터프레임들을 지정 형식으로 변환해 zip 파일에 기록
+
+    Args:
+        frames: [(이름, DataFrame)] 목록
+        fmt: EXPORT_FORMATS 키
+        target: zip 파일 경로 또는 바이너리 파일 객체
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"지원하지 않는 내보내기 형식입니다: {fmt}")
+    write = _WRITERS[fmt]
+    extension = EXPORT_FORMATS[fmt]['extension']
+
+    # 항목 자체가 압축되어 있으므로 zip은 무압축 저장
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_STORED) as archive:
+        used = set()
+        for name, frame in frames:
+            entry_name = safe_entry_name(name)
+            while entry_name in used:
+                entry_name += '_'
+            used.add(entry_name)
+            with archive.open(entry_name + extension, 'w', force_zip64=True) as entry:
+                write(frame, entry, chunk_rows)
+    return target
+
+
+def export_frames(results):
+    """분석 결과 dict → 내보내기 대상 [(이름, DataFrame)]"""
+    frames = []
+    summary = results.get('summary') or {}
+    for key, value in summary.items():
+        if hasattr(value, 'to_csv') and not value.empty:
+            frames.append((f'Summary_{key}', value))
+    for key, name in (('eight_percent', '8% 환급 검토'), ('zero_risk', '0% Risk'),
+                      ('tariff_risk', '세율 Risk'), ('price_risk', '단가 Risk'),
+                      ('price_drift', '단가 변동'), ('spec_history', '분류 이력'),
+                      ('duplicates', '중복 신고')):
+        frame = results.get(key)
+        if frame is not None and not frame.empty:
+            frames.append((name, frame))
+    return frames
+
+
+def purge_old_exports(export_dir, retention_hours=EXPORT_RETENTION_HOURS):
+    """보관 기간이 지난 내보내기 파일 삭제"""
+    cutoff = time.time() - retention_hours * 3600
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def create_export_archive(results, fmt, run_id, export_dir=None):
+    """분석 결과 내보내기 zip 파일 생성 후 경로 반환 (같은 실행/형식은 재사용)"""
+    export_dir = export_dir or os.environ.get('ANALYSIS_EXPORT_DIR') or DEFAULT_EXPORT_DIR
+    os.makedirs(export_dir, exist_ok=True)
+    purge_old_exports(export_dir)
+
+    path = os.path.join(export_dir, f'{run_id}_{fmt}.zip')
+    if os.path.exists(path):
+        return path
+    tmp_path = f'{path}.tmp'
+    try:
+        write_export_archive(export_frames(results), fmt, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
@@ -0,0 +1,141 @@
+"""프로세스 공용 업로드 데이터셋 저장소
+
+Streamlit은 위젯을 조작할 때마다 스크립트를 다시 실행하고 세션마다 df_original을 따로 읽으므로,
+여러 분석자가 같은 대용량 파일을 검토하면 같은 데이터가 세션 수만큼 메모리에 올라갑니다.
+
+파일 내용 해시를 키로 읽은 DataFrame을 한 벌만 보관하고
+    - 같은 파일을 동시에 업로드하면 한 세션만 읽고 나머지는 완료를 기다림 (single-flight)
+    - 세션/작업에는 얕은 복사본(데이터 버퍼 공유)을 전달
+      (pandas Copy-on-Write로 한 세션의 수정이 다른 세션이나 저장소에 반영되지 않음.
+       Copy-on-Write가 항상 켜져 있는 pandas 3.0 이상이 필요하며 requirements.txt에 고정되어 있음 -
+       pandas 2.x 이하에서는 얕은 복사본의 제자리 수정이 저장소의 DataFrame을 바꿈)
+    - 세션/작업별 참조를 세어 마지막 참조가 해제되면 저장소에서 제거합니다
+      (세션은 session_state의 DatasetHolder가 정리될 때, 작업은 분석이 끝날 때 해제)
+"""
+import hashlib
+import threading
+import uuid
+import weakref
+
+
+def dataset_key(file_bytes):
+    """파일 내용 해시 (저장소 키)"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class _Entry:
+    def __init__(self):
+        self.frame = None
+        self.holders = set()
+        self.ready = threading.Event()
+
+
+class DatasetStore:
+    """내용 해시 → DataFrame (참조 수 기반 제거)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # 키 → _Entry
+        self._held = {}     # 참조자 → 키
+
+    def acquire(self, key, loader, holder):
+        """저장소의 데이터셋 얕은 복사본 (없으면 loader()로 읽어 등록)
+
+        Args:
+            key: dataset_key 결과
+            loader: 인자 없는 로드 함수 (실패 시 None 반환)
+            holder: 참조자 ID (세션/작업) - 다른 키를 잡고 있었으면 그 참조는 해제
+
+        Returns:
+            (DataFrame 또는 None, 이번 호출에서 직접 읽었는지 여부)
+        """
+        while True:
+            with self._lock:
+                self._release_locked(holder, keep=key)
+                entry = self._entries.get(key)
+                loading = entry is None
+                if loading:
+                    entry = self._entries[key] = _Entry()
+                entry.holders.add(holder)
+                self._held[holder] = key
+
+            if loading:
+                return self._load(key, entry, loader), True
+
+            entry.ready.wait()
+            if entry.frame is not None:
+                return entry.frame.copy(deep=False), False
+            # 먼저 읽던 쪽이 실패하면 직접 다시 시도
+
+    def _load(self, key, entry, loader):
+        frame = None
+        try:
+            frame = loader()
+        finally:
+            with self._lock:
+                if frame is None:
+                    # 실패한 로드는 보관하지 않음 (대기 중인 쪽이 다시 시도)
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                    for holder in entry.holders:
+                        if self._held.get(holder) == key:
+                            del self._held[holder]
+                else:
+                    entry.frame = frame
+                    if not entry.holders and self._entries.get(key) is entry:
+                        # 읽는 동안 참조가 모두 해제됨
+                        del self._entries[key]
+                entry.ready.set()
+        return frame.copy(deep=False) if frame is not None else None
+
+    def contains(self, key):
+        """읽기가 끝난 데이터셋이 있는지"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.frame is not None
+
+    def release(self, holder):
+        """참조 해제 (마지막 참조면 저장소에서 제거)"""
+        with self._lock:
+            self._release_locked(holder)
+
+    def _release_locked(self, holder, keep=None):
+        key = self._held.get(holder)
+        if key is None or key == keep:
+            return
+        del self._held[holder]
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.holders.discard(holder)
+        if not entry.holders and entry.ready.is_set():
+            del self._entries[key]
+
+    def stats(self):
+        """보관 중인 데이터셋 수, 참조 수, 메모리(MB)"""
+        with self._lock:
+            frames = [entry.frame for entry in self._entries.values() if entry.frame is not None]
+            holders = sum(len(entry.holders) for entry in self._entries.values())
+        memory = sum(int(frame.memory_usage(index=True, deep=False).sum()) for frame in frames)
+        return {'datasets': len(frames), 'holders': holders, 'memory_mb': round(memory / 1024 / 1024, 1)}
+
+
+class DatasetHolder:
+    """세션에 보관하는 참조 토큰 (세션 종료로 토큰이 정리되면 참조 해제)"""
+
+    def __init__(self, store=None):
+        self.holder_id = uuid.uuid4().hex
+        weakref.finalize(self, (store or get_dataset_store()).release, self.holder_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    """프로세스 공용 데이터셋 저장소 (Streamlit 재실행/세션 간에 유지)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
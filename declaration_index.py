@@ -0,0 +1,163 @@
+"""수입신고 계층 인덱스 (수입신고번호 → 란번호 → 행번호)
+
+업로드당 한 번 수입신고번호와 (수입신고번호, 란번호)를 정수 코드로 바꾸고
+신고별/란별 집계(행수, 란수, 금액합계, 란결제금액, 실제관세액)를 미리 계산합니다.
+
+이후 분석에서 반복되던 수입신고번호 nunique(문자열 해시)는 정수 코드의 bincount로,
+신고번호 조회(drill-down)는 정렬된 란 집계표의 오프셋 조회로 처리합니다.
+
+행별관세는 (실제관세액 × 금액) ÷ 란결제금액으로 배분되므로,
+란의 금액 합계가 란결제금액과 다르면 배분된 행별관세 합계도 실제관세액과 달라집니다.
+란 집계표의 '배분차이'로 이런 란을 바로 확인할 수 있습니다.
+"""
+import numpy as np
+import pandas as pd
+
+DECLARATION_COLUMN = '수입신고번호'
+LINE_COLUMN = '란번호'
+
+# 란결제금액 대비 금액 합계 차이가 이 비율을 넘으면 배분 불일치
+APPORTION_TOLERANCE = 0.01
+
+# 그룹별 신고 건수 집계에서 비트맵을 쓰는 최대 (그룹 수 × 신고 수)
+BITMAP_MAX_KEYS = 32_000_000
+
+
+def _numeric(frame, column):
+    if column not in frame.columns:
+        return None
+    return pd.to_numeric(frame[column], errors='coerce').fillna(0).to_numpy(dtype='float64')
+
+
+def build_declaration_index(df, tolerance=APPORTION_TOLERANCE):
+    """수입신고 계층 인덱스 생성
+
+    Returns:
+        {
+            'declarations': 정렬된 고유 수입신고번호 pd.Index,
+            'decl_ids': 행별 신고 코드 (결측은 -1),
+            'line_ids': 행별 란 코드 (결측은 -1),
+            'declaration_table': 신고별 집계 (declarations 순서),
+            'line_table': 란별 집계 (신고 코드, 란번호 순),
+            'line_offsets': 신고 코드별 line_table 시작 위치 (길이 = 신고 수 + 1),
+        }
+    """
+    decl_ids, declarations = pd.factorize(df[DECLARATION_COLUMN], sort=True)
+    n_decl = len(declarations)
+
+    if LINE_COLUMN in df.columns:
+        line_no, line_values = pd.factorize(df[LINE_COLUMN], sort=True)
+    else:
+        line_no, line_values = np.zeros(len(df), dtype='int64'), pd.Index([1])
+    valid = (decl_ids >= 0) & (line_no >= 0)
+
+    # (신고 코드, 란 코드) 결합 키 → 란 코드 (정렬되어 있으므로 신고별로 연속)
+    pair_key = np.where(valid, decl_ids.astype('int64') * max(len(line_values), 1) + line_no, -1)
+    line_keys, first_rows, line_ids = np.unique(pair_key[valid], return_index=True, return_inverse=True)
+    valid_rows = np.flatnonzero(valid)
+    first_rows = valid_rows[first_rows]
+    line_ids_full = np.full(len(df), -1, dtype='int64')
+    line_ids_full[valid_rows] = line_ids
+    n_line = len(line_keys)
+    line_decl = line_keys // max(len(line_values), 1)
+
+    # 란결제금액/실제관세액은 란 단위 값이므로 란의 첫 행 값 사용
+    amount = _numeric(df, '금액')
+    line_rows = np.bincount(line_ids, minlength=n_line)
+    line_amount = (np.bincount(line_ids, weights=amount[valid], minlength=n_line)
+                   if amount is not None else np.zeros(n_line))
+    paid = _numeric(df, '란결제금액')
+    line_paid = paid[first_rows] if paid is not None else line_amount
+    duty = _numeric(df, '실제관세액')
+    line_duty = duty[first_rows] if duty is not None else np.zeros(n_line)
+
+    difference = line_paid - line_amount
+    mismatch = np.abs(difference) > tolerance * np.abs(line_paid)
+
+    line_table = pd.DataFrame({
+        '수입신고번호': declarations[line_decl],
+        '란번호': line_values[line_keys % max(len(line_values), 1)],
+        '행수': line_rows,
+        '금액합계': line_amount,
+        '란결제금액': line_paid,
+        '실제관세액': line_duty,
+        '배분차이': np.round(difference, 2),
+        '배분불일치': mismatch,
+    })
+    declaration_table = pd.DataFrame({
+        '수입신고번호': declarations,
+        '란수': np.bincount(line_decl, minlength=n_decl),
+        '행수': np.bincount(decl_ids[decl_ids >= 0], minlength=n_decl),
+        '금액합계': np.bincount(line_decl, weights=line_amount, minlength=n_decl),
+        '실제관세액': np.bincount(line_decl, weights=line_duty, minlength=n_decl),
+        '배분불일치란수': np.bincount(line_decl, weights=mismatch, minlength=n_decl).astype('int64'),
+    })
+    return {
+        'declarations': pd.Index(declarations),
+        'decl_ids': decl_ids,
+        'line_ids': line_ids_full,
+        'declaration_table': declaration_table,
+        'line_table': line_table,
+        'line_offsets': np.searchsorted(line_decl, np.arange(n_decl + 1)),
+    }
+
+
+def count_declarations(decl_index, mask=None):
+    """마스크에 해당하는 행의 고유 신고 건수 (mask가 없으면 전체 신고 건수)"""
+    if mask is None:
+        return len(decl_index['declarations'])
+    ids = decl_index['decl_ids'][np.asarray(mask, dtype=bool)]
+    seen = np.zeros(len(decl_index['declarations']), dtype=bool)
+    seen[ids[ids >= 0]] = True
+    return int(seen.sum())
+
+
+def declaration_counts_by(decl_index, values):
+    """그룹 값별 고유 신고 건수 (groupby(values)['수입신고번호'].nunique()와 동일, 그룹 정렬)
+
+    Returns:
+        (그룹별 신고 건수 Series, 그룹 값이 있는 행 전체의 고유 신고 건수)
+    """
+    group_ids, groups = pd.factorize(pd.Series(values, copy=False), sort=True)
+    ids = decl_index['decl_ids']
+    n_decl = max(len(decl_index['declarations']), 1)
+    valid = (group_ids >= 0) & (ids >= 0)
+    # (그룹, 신고) 고유 쌍을 정수 키로 세기 (키 범위가 작으면 해시 대신 비트맵 사용)
+    keys = group_ids[valid].astype('int64') * n_decl + ids[valid]
+    if len(groups) * n_decl <= BITMAP_MAX_KEYS:
+        seen = np.zeros(len(groups) * n_decl, dtype=bool)
+        seen[keys] = True
+        pairs = np.flatnonzero(seen)
+    else:
+        pairs = np.unique(keys)
+    counts = np.bincount(pairs // n_decl, minlength=len(groups))
+    return pd.Series(counts, index=groups), count_declarations(decl_index, valid)
+
+
+def declaration_lines(decl_index, declaration):
+    """신고번호의 란별 집계 (없으면 빈 데이터프레임)"""
+    position = decl_index['declarations'].get_indexer([declaration])[0]
+    if position < 0:
+        return decl_index['line_table'].iloc[:0]
+    start, end = decl_index['line_offsets'][position], decl_index['line_offsets'][position + 1]
+    return decl_index['line_table'].iloc[start:end]
+
+
+def declaration_structure(decl_index):
+    """신고 구조 요약표 (Summary용)"""
+    lines = decl_index['line_table']
+    return pd.DataFrame({
+        '구분': ['신고 건수', '란 수', '행 수', '배분 불일치 란 수', '배분 불일치 신고 건수'],
+        '건수': [
+            len(decl_index['declarations']),
+            len(lines),
+            int(lines['행수'].sum()),
+            int(lines['배분불일치'].sum()),
+            int((decl_index['declaration_table']['배분불일치란수'] > 0).sum()),
+        ],
+    })
+
+
+def lookup_tables(decl_index):
+    """행 단위 배열을 제외한 조회용 인덱스 (결과 저장/화면 조회용)"""
+    return {key: value for key, value in decl_index.items() if key not in ('decl_ids', 'line_ids')}
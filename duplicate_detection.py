@@ -0,0 +1,182 @@
+"""중복 신고 / 분할 신고 의심 탐지 (복합 키 해시 블로킹)
+
+기존 분석은 신고 한 건 안의 세율/단가만 보므로, 같은 화물을 두 번 신고했거나
+한 건의 화물을 여러 신고로 나눈 경우는 보이지 않습니다.
+
+    - 중복 신고 의심: B/L번호 + 규격1 + 금액이 같은 행이 서로 다른 수입신고번호에 있는 경우
+    - 분할 신고 의심: 무역거래처상호 + 거래품명이 같은 신고가 수리일자 기준 window_days일 이내로
+      이어지는 경우 (신고 간 간격이 모두 window_days일 이내인 신고 묶음)
+
+키 컬럼마다 고유값만 정규화(공백 정리, 대문자, 금액은 소수 둘째 자리)해 64비트 해시로 만들고,
+행별 복합 해시를 factorize한 정수 블록 코드로 묶습니다. 블록 안에서만 신고를 비교하므로
+쌍별 비교 없이 정렬 한 번과 해시 조회로 수백만 행을 처리합니다.
+"""
+import numpy as np
+import pandas as pd
+
+from price_drift import parse_accept_dates
+
+DECLARATION_COLUMN = '수입신고번호'
+
+TYPE_DUPLICATE = '중복 신고 의심'
+TYPE_SPLIT = '분할 신고 의심'
+
+# 유형별 블록 키
+DUPLICATE_KEYS = ['B/L번호', '규격1', '금액']
+SPLIT_KEYS = ['무역거래처상호', '거래품명']
+
+# 숫자로 비교할 키 (소수 둘째 자리 반올림)
+NUMERIC_KEYS = {'금액'}
+
+# 분할 신고로 묶을 신고 간 최대 간격 (일)
+DEFAULT_SPLIT_WINDOW_DAYS = 3
+
+DUPLICATE_COLUMNS = ['유형', '클러스터', '클러스터 신고 건수', '수입신고번호', '란번호', '행번호', '수리일자',
+                     'B/L번호', '무역거래처상호', '거래품명', '규격1', '세번부호', '금액']
+
+
+def _normalize_keys(values, numeric=False):
+    """키 고유값 → (해시할 값, 유효 여부)
+
+    문자열은 공백 정리 후 대문자, 금액은 소수 둘째 자리까지의 정수(원 단위 × 100)로 비교합니다.
+    """
+    if numeric:
+        amounts = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype='float64')
+        valid = ~np.isnan(amounts)
+        return np.round(np.where(valid, amounts, 0) * 100).astype('int64'), valid
+    text = pd.Series(values, dtype=object).astype(str).str.replace(r'\.0$', '', regex=True)
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip().str.upper().to_numpy(dtype=object)
+    return text, text != ''
+
+
+def block_codes(frame, columns):
+    """복합 키 → 행별 블록 코드 (키 컬럼이 없거나 하나라도 비어 있으면 -1)"""
+    if not set(columns) <= set(frame.columns):
+        return np.full(len(frame), -1, dtype='int64')
+    valid = np.ones(len(frame), dtype=bool)
+    hashed = {}
+    for col in columns:
+        codes, uniques = pd.factorize(frame[col])
+        if len(uniques) == 0:
+            return np.full(len(frame), -1, dtype='int64')
+        keys, present = _normalize_keys(uniques, numeric=col in NUMERIC_KEYS)
+        ids = np.maximum(codes, 0)
+        valid &= (codes >= 0) & present[ids]
+        hashed[col] = pd.util.hash_array(keys, categorize=False)[ids]
+    row_hash = pd.util.hash_pandas_object(pd.DataFrame(hashed), index=False).to_numpy()
+    codes, _ = pd.factorize(row_hash)
+    return np.where(valid, codes, -1).astype('int64')
+
+
+def _declaration_codes(frame):
+    codes, _ = pd.factorize(frame[DECLARATION_COLUMN])
+    return codes.astype('int64')
+
+
+def duplicate_clusters(frame):
+    """중복 신고 의심 → 행별 클러스터 코드 (해당 없음은 -1)
+
+    같은 블록(B/L번호 + 규격1 + 금액)에 신고번호가 둘 이상이면 블록 전체를 한 클러스터로 봅니다.
+    """
+    blocks = block_codes(frame, DUPLICATE_KEYS)
+    declarations = _declaration_codes(frame)
+    keep = (blocks >= 0) & (declarations >= 0)
+    pairs = pd.DataFrame({'block': blocks[keep], 'decl': declarations[keep]}).drop_duplicates()
+    counts = pairs['block'].value_counts()
+    multi = counts.index[counts.to_numpy() > 1].to_numpy()
+    return np.where(keep & np.isin(blocks, multi), blocks, -1)
+
+
+def split_clusters(frame, window_days=DEFAULT_SPLIT_WINDOW_DAYS):
+    """분할 신고 의심 → 행별 클러스터 코드 (해당 없음은 -1)
+
+    블록(무역거래처상호 + 거래품명)별로 신고를 최초 수리일자 순으로 정렬하고,
+    직전 신고와의 간격이 window_days일을 넘으면 새 클러스터를 시작합니다.
+    """
+    if '수리일자' not in frame.columns:
+        return np.full(len(frame), -1, dtype='int64')
+    blocks = block_codes(frame, SPLIT_KEYS)
+    declarations = _declaration_codes(frame)
+    days = parse_accept_dates(frame['수리일자'])
+    keep = (blocks >= 0) & (declarations >= 0) & ~np.isnan(days)
+    if not keep.any():
+        return np.full(len(frame), -1, dtype='int64')
+
+    # 신고 단위 (블록, 신고번호)별 최초 수리일자
+    stride = int(declarations.max()) + 1
+    pair_key = blocks * stride + declarations
+    first_day = pd.Series(days[keep]).groupby(pair_key[keep]).min()
+    pair_block = first_day.index.to_numpy() // stride
+    order = np.lexsort((first_day.to_numpy(), pair_block))
+    sorted_block = pair_block[order]
+    sorted_day = first_day.to_numpy()[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = (sorted_block[1:] != sorted_block[:-1]) | (np.diff(sorted_day) > window_days)
+    cluster = np.cumsum(starts) - 1
+    sizes = np.bincount(cluster)
+
+    # 신고가 둘 이상인 클러스터만 행에 다시 연결
+    pair_cluster = np.empty(len(order), dtype='int64')
+    pair_cluster[order] = np.where(sizes[cluster] > 1, cluster, -1)
+    positions = pd.Index(first_day.index).get_indexer(pair_key[keep])
+    result = np.full(len(frame), -1, dtype='int64')
+    result[keep] = pair_cluster[positions]
+    return result
+
+
+def detect_duplicates(frame, window_days=DEFAULT_SPLIT_WINDOW_DAYS):
+    """중복/분할 신고 의심 행 (클러스터별로 묶어 신고 건수가 많은 순)
+
+    Returns:
+        DUPLICATE_COLUMNS 중 데이터에 있는 컬럼 (한 행이 두 유형 모두에 나올 수 있음)
+    """
+    columns = [col for col in DUPLICATE_COLUMNS[3:] if col in frame.columns]
+    if DECLARATION_COLUMN not in frame.columns:
+        return pd.DataFrame(columns=DUPLICATE_COLUMNS[:3] + columns)
+    parts = []
+    for label, clusters in ((TYPE_DUPLICATE, duplicate_clusters(frame)),
+                            (TYPE_SPLIT, split_clusters(frame, window_days))):
+        rows = np.flatnonzero(clusters >= 0)
+        if len(rows) == 0:
+            continue
+        part = frame.iloc[rows][columns].reset_index(drop=True)
+        codes, _ = pd.factorize(clusters[rows], sort=True)
+        part.insert(0, '유형', label)
+        part.insert(1, '클러스터', codes + 1)
+        part.insert(2, '클러스터 신고 건수',
+                    part.groupby('클러스터')[DECLARATION_COLUMN].transform('nunique').to_numpy())
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=DUPLICATE_COLUMNS[:3] + columns)
+    result = pd.concat(parts, ignore_index=True)
+    sort_columns = ['유형', '클러스터 신고 건수', '클러스터', DECLARATION_COLUMN]
+    return result.sort_values(sort_columns, ascending=[True, False, True, True], kind='stable',
+                              ignore_index=True)
+
+
+def summarize_duplicate_clusters(duplicates):
+    """클러스터별 요약 (유형, 신고 건수, 행수, 금액 합계, 신고번호 목록, 수리일자 범위)"""
+    columns = ['유형', '클러스터', '신고 건수', '행수', '금액 합계', '수입신고번호', '최초 수리일자', '최종 수리일자']
+    if duplicates.empty:
+        return pd.DataFrame(columns=columns)
+    work = duplicates.assign(
+        금액=pd.to_numeric(duplicates['금액'], errors='coerce') if '금액' in duplicates.columns else np.nan,
+        days=parse_accept_dates(duplicates['수리일자']) if '수리일자' in duplicates.columns else np.nan,
+    )
+    table = work.groupby(['유형', '클러스터'], sort=False).agg(**{
+        '신고 건수': (DECLARATION_COLUMN, 'nunique'),
+        '행수': (DECLARATION_COLUMN, 'size'),
+        '금액 합계': ('금액', 'sum'),
+        'first': ('days', 'min'),
+        'last': ('days', 'max'),
+    }).reset_index()
+    # 신고번호 목록: (클러스터, 신고번호) 고유 쌍을 한 번 정렬한 뒤 클러스터 경계로 잘라 연결
+    groups = work.groupby(['유형', '클러스터'], sort=False).ngroup().to_numpy()
+    pairs = (pd.DataFrame({'group': groups, 'decl': work[DECLARATION_COLUMN].astype(str).to_numpy(dtype=object)})
+             .drop_duplicates().sort_values(['group', 'decl']))
+    bounds = np.searchsorted(pairs['group'].to_numpy(), np.arange(len(table) + 1))
+    values = pairs['decl'].tolist()
+    table[DECLARATION_COLUMN] = [', '.join(values[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+    table['최초 수리일자'] = pd.to_datetime(table.pop('first'), unit='D').dt.strftime('%Y-%m-%d')
+    table['최종 수리일자'] = pd.to_datetime(table.pop('last'), unit='D').dt.strftime('%Y-%m-%d')
+    return table[columns]
@@ -0,0 +1,760 @@
+"""템플릿 기반 Excel 리포트 빌더
+
+정적인 부분(검증방법 시트, 스타일, Summary 서식)은 xlsxwriter로 한 번만 만들어
+OOXML 파트 단위로 캐시하고, 분석 결과 시트는 컬럼 dtype별로 셀 XML을 일괄 생성하는
+행 블록 단위 writer로 기록한 뒤 zip 패키지로 조립합니다.
+
+DataFrame.to_excel의 셀 단위 기록 대비 대용량 시트의 조립 시간이 크게 줄어듭니다.
+20,000행 이상의 큰 시트는 작업자 프로세스 풀에서 각자 XML 파트를 렌더링하고,
+현재 프로세스는 작은 시트를 처리한 뒤 zipfile로 전체 패키지를 조립합니다.
+(벤치마크: benchmarks/bench_excel_report.py)
+"""
+import datetime
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+# 시트 XML 생성 단위 (행)
+ROW_BLOCK_SIZE = 20_000
+
+# 대용량 XML 압축 속도를 위해 낮은 압축 수준 사용
+ZIP_COMPRESSLEVEL = 1
+
+# Excel 셀 최대 문자 수
+MAX_CELL_CHARS = 32767
+
+# 이 행수 이상인 시트는 작업자 프로세스에서 렌더링 (작업자 수: 환경변수 REPORT_WORKERS, 기본 CPU 수)
+PARALLEL_SHEET_MIN_ROWS = 20_000
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 원본데이터 시트 최대 행수
+ORIGINAL_DATA_ROWS = 1000
+
+VERIFICATION_SHEET = '검증방법'
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_WORKSHEET = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_EXCEL_EPOCH = np.datetime64('1899-12-30')
+_ILLEGAL_XML_CHARS = r'[\x00-\x08\x0b\x0c\x0e-\x1f]'
+_NEEDS_ESCAPE = r'[&<>\x00-\x08\x0b\x0c\x0e-\x1f]'
+
+
+def create_verification_methods_excel_sheet(writer):
+    """검증방법 시트 생성 (엑셀용)"""
+    try:
+        # 워크시트 생성
+        worksheet = writer.book.add_worksheet('검증방법')
+        workbook = writer.book
+        
+        # 포맷 설정
+        title_format = workbook.add_format({
+            'font_name': 'Arial',
+            'font_size': 14,
+            'bold': True,
+            'align': 'center',
+            'valign': 'vcenter',
+            'bg_color': '#4472C4',
+            'font_color': 'white',
+            'border': 1
+        })
+        
+        subtitle_format = workbook.add_format({
+            'font_name': 'Arial',
+            'font_size': 12,
+            'bold': True,
+            'align': 'left',
+            'valign': 'vcenter',
+            'bg_color': '#D9E1F2',
+            'border': 1
+        })
+        
+        content_format = workbook.add_format({
+            'font_name': 'Arial',
+            'font_size': 10,
+            'align': 'left',
+            'valign': 'top',
+            'border': 1,
+            'text_wrap': True
+        })
+        
+        highlight_format = workbook.add_format({
+            'font_name': 'Arial',
+            'font_size': 10,
+            'align': 'left',
+            'valign': 'top',
+            'border': 1,
+            'text_wrap': True,
+            'bg_color': '#FFFF00'  # 노란색 배경
+        })
+        
+        # 열 너비 설정
+        worksheet.set_column(0, 0, 25)  # A열 - 시트명
+        worksheet.set_column(1, 1, 60)  # B열 - 검증로직
+        worksheet.set_column(2, 2, 40)  # C열 - 특이사항
+        
+        current_row = 0
+        
+        # 제목
+        worksheet.merge_range(current_row, 0, current_row, 2, '수입신고 분석 검증방법', title_format)
+        worksheet.set_row(current_row, 30)
+        current_row += 2
+        
+        # 1. 8% 환급 검토
+        worksheet.write(current_row, 0, '1. 8% 환급 검토', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 필터링 조건: 세율구분 = "A" AND 관세실행세율 ≥ 8%\n' +
+            '• 목적: 8% 환급 검토가 필요한 수입신고 건들 식별\n' +
+            '• 추가 컬럼: 적출국코드, 원산지코드, 무역거래처상호, 무역거래처국가코드\n' +
+            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 세율구분 "A"는 일반적으로 가장 관세율이 높은 구분\n' +
+            '• 8% 이상의 관세율은 환급 대상이 될 수 있음\n' +
+            '• FTA사후환급 검토: 적출국=원산지인 경우 표시', 
+            highlight_format)
+        worksheet.set_row(current_row, 80)
+        current_row += 1
+        
+        # 2. 0% Risk
+        worksheet.write(current_row, 0, '2. 0% Risk', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 필터링 조건: 관세실행세율 < 8% AND 세율구분 ≠ F***\n' +
+            '• 목적: 관세율이 낮거나 면세 대상이지만 추가 검토가 필요한 건들\n' +
+            '• F로 시작하는 4자리 코드는 특별한 세율구분으로 제외\n' +
+            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 관세율이 낮은데도 특별한 세율구분이 아닌 경우 주의 필요\n' +
+            '• 면세 대상이지만 실제로는 관세가 부과될 수 있는 경우\n' +
+            '• 관세실행세율이 0%인 경우 노란색으로 강조 표시', 
+            highlight_format)
+        worksheet.set_row(current_row, 80)
+        current_row += 1
+        
+        # 3. 세율 Risk
+        worksheet.write(current_row, 0, '3. 세율 Risk', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 분석 방법: 규격1 기준으로 그룹화하여 세번부호의 고유값 개수 확인\n' +
+            '• 위험 판정: 동일 규격1에 대해 서로 다른 세번부호가 2개 이상인 경우\n' +
+            '• 목적: 동일 상품(규격1)에 대한 세번부호 불일치 위험 식별\n' +
+            '• 예시: "DEMO SYS 1ML LG 0000-S000P1MLF"에 여러 세번부호 적용\n' +
+            '• 행별관세 계산: (실제관세액 × 금액) ÷ 란결제금액', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 동일 상품인데 다른 세번부호가 적용되면 관세율 차이 발생\n' +
+            '• 세번부호 분류 오류 가능성 또는 상품 특성 차이\n' +
+            '• 세율 Risk 발견 시 해당 규격1의 세번부호들을 상세 검토 필요\n' +
+            '• 세번부호가 다른 경우 노란색으로 강조 표시', 
+            highlight_format)
+        worksheet.set_row(current_row, 100)
+        current_row += 1
+        
+        # 4. 단가 Risk
+        worksheet.write(current_row, 0, '4. 단가 Risk', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 그룹화 기준: 규격1\n' +
+            '• 위험도 계산: 단가편차율 = (최고단가 - 최저단가) ÷ 평균단가\n' +
+            '• 위험도 분류:\n' +
+            '  - 10% 초과~30% 이하: "보통"\n' +
+            '  - 30% 초과~50% 이하: "높음"\n' +
+            '  - 50% 초과: "매우높음"\n' +
+            '• 특이사항: 평균단가가 0인 경우 "확인필요"로 분류\n' +
+            '• 추가 정보: Min/Max 신고번호의 수리일자 표시', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 단가 변동성이 10% 초과하면 주의 필요\n' +
+            '• 30% 초과는 높은 위험, 50% 초과는 매우 비정상적인 가격 차이\n' +
+            '• 평균단가 0은 데이터 오류 또는 특별한 거래 형태\n' +
+            '• 수리일자 차이로 시간적 변동성 확인 가능\n' +
+            '• 위험도가 "높음", "매우높음", "확인필요"인 경우 노란색 강조', 
+            highlight_format)
+        worksheet.set_row(current_row, 120)
+        current_row += 1
+        
+        # 5. Summary
+        worksheet.write(current_row, 0, '5. Summary', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 전체 신고 건수: 수입신고번호 기준 고유 건수\n' +
+            '• 거래구분별 분석: 거래구분별 신고건수 피벗 테이블\n' +
+            '• 세율구분별 분석: 세율구분별 신고건수 및 비중\n' +
+            '• Risk 분석 요약: 0% Risk와 8% 환급 검토 건수 및 비율\n' +
+            '• 세번부호별 세율구분 및 실행세율 분석', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 전체적인 수입신고 현황 파악\n' +
+            '• Risk 분포를 통한 우선순위 설정 가능\n' +
+            '• 차트와 그래프로 시각적 분석 제공', 
+            highlight_format)
+        worksheet.set_row(current_row, 80)
+        current_row += 1
+        
+        # 6. 원본데이터
+        worksheet.write(current_row, 0, '6. 원본데이터', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 분석에 사용된 원본 엑셀 파일의 모든 데이터\n' +
+            '• 상위 1000개 행만 표시 (파일 크기 제한)\n' +
+            '• 모든 컬럼과 원본 데이터 구조 확인 가능\n' +
+            '• 필터링 및 정렬 기능 제공\n' +
+            '• 중복 컬럼명 자동 처리됨', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 원본 데이터와 분석 결과 비교 검토 가능\n' +
+            '• 데이터 품질 및 구조 확인용\n' +
+            '• 중복 컬럼은 _1, _2 등으로 구분', 
+            highlight_format)
+        worksheet.set_row(current_row, 80)
+        current_row += 1
+        
+        # 특이사항 표시 방법
+        worksheet.write(current_row, 0, '특이사항 표시 방법', subtitle_format)
+        worksheet.write(current_row, 1, 
+            '• 노란색 배경: 각 시트에서 특별히 주의가 필요한 항목\n' +
+            '• 8% 환급 검토: 관세실행세율 8% 이상, FTA사후환급 검토 대상\n' +
+            '• 0% Risk: 관세실행세율이 0%인 경우\n' +
+            '• 세율 Risk: 동일 규격1에 다른 세번부호 적용\n' +
+            '• 단가 Risk: 위험도 "높음", "매우높음", "확인필요"\n' +
+            '• Summary: 세율구분/실행세율 종류수가 2개 이상인 세번부호', 
+            content_format)
+        worksheet.write(current_row, 2, 
+            '• 노란색으로 표시된 항목은 반드시 검토 필요\n' +
+            '• 데이터 오류 또는 비정상적인 거래 형태일 가능성\n' +
+            '• 세관 신고 시 추가 확인이 필요한 항목들\n' +
+            '• Made by 전자동 (Wooshin Customs Broker)', 
+            highlight_format)
+        worksheet.set_row(current_row, 100)
+        
+        # 페이지 설정
+        worksheet.set_header('&C&B검증방법')
+        worksheet.set_footer('&R&D &T')
+        
+        return True
+        
+    except Exception as e:
+        print(f"검증방법 시트 생성 중 오류 발생: {str(e)}")
+        return False
+
+# 템플릿에 미리 등록하는 셀 서식
+TEMPLATE_FORMATS = {
+    # pandas to_excel 기본 헤더 서식
+    'header': {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'},
+    'summary_title': {'bold': True, 'font_size': 16, 'align': 'center'},
+    'summary_header': {'bold': True, 'bg_color': '#D9E1F2', 'border': 1, 'align': 'center'},
+    'date': {'num_format': 'yyyy-mm-dd'},
+    'datetime': {'num_format': 'yyyy-mm-dd hh:mm:ss'},
+}
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def _build_template():
+    """검증방법 시트와 서식이 포함된 템플릿 패키지 생성"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        workbook = writer.book
+        formats = {name: workbook.add_format(spec) for name, spec in TEMPLATE_FORMATS.items()}
+        # 서식 인덱스 확정용 임시 시트 (조립 시 제외)
+        style_sheet = workbook.add_worksheet('_styles')
+        for row, fmt in enumerate(formats.values()):
+            style_sheet.write_blank(row, 0, None, fmt)
+        create_verification_methods_excel_sheet(writer)
+
+    with zipfile.ZipFile(buffer) as package:
+        parts = {name: package.read(name) for name in package.namelist()}
+
+    return {
+        'styles': {name: fmt.xf_index for name, fmt in formats.items()},
+        'verification_sheet': parts['xl/worksheets/sheet2.xml'],
+        'parts': {
+            name: parts[name]
+            for name in ('xl/styles.xml', 'xl/theme/theme1.xml', 'xl/sharedStrings.xml')
+            if name in parts
+        },
+    }
+
+
+def get_report_template():
+    """프로세스당 한 번 생성되는 리포트 템플릿"""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = _build_template()
+        return _template
+
+
+def column_letter(index):
+    """0부터 시작하는 컬럼 번호 → Excel 컬럼 문자"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _escape_strings(values):
+    """문자열 배열 XML 이스케이프 (제어문자 제거, 최대 길이 제한)"""
+    strings = [v if isinstance(v, str) else str(v) for v in values]
+    series = pd.Series(strings, dtype=str)
+    text = np.array(strings, dtype=object)
+    # 이스케이프/절단이 필요한 문자열만 변환
+    needs = series.str.contains(_NEEDS_ESCAPE, regex=True).to_numpy(dtype=bool)
+    needs = needs | (series.str.len().to_numpy() > MAX_CELL_CHARS)
+    if needs.any():
+        text[needs] = [
+            escape(re.sub(_ILLEGAL_XML_CHARS, '', v)[:MAX_CELL_CHARS]) for v in text[needs]
+        ]
+    return text
+
+
+def _number_text(values):
+    """숫자 배열 → <v> 텍스트 (정수값은 소수점 없이)"""
+    if values.dtype.kind in 'iu':
+        return values.astype(str).astype(object)
+    return pd.Series(values).astype(str).str.removesuffix('.0').to_numpy(dtype=object)
+
+
+def _number_cells(refs, values, style):
+    style_attr = f' s="{style}"' if style else ''
+    finite = np.isfinite(values) if values.dtype.kind == 'f' else np.ones(len(values), dtype=bool)
+    cells = np.full(len(values), '', dtype=object)
+    if finite.any():
+        text = _number_text(values[finite])
+        cells[finite] = '<c r="' + refs[finite] + f'"{style_attr}><v>' + text + '</v></c>'
+    return cells
+
+
+def _string_cells(refs, values, mask=None):
+    cells = np.full(len(values), '', dtype=object)
+    if mask is None:
+        mask = np.ones(len(values), dtype=bool)
+    if mask.any():
+        text = _escape_strings(values[mask])
+        cells[mask] = '<c r="' + refs[mask] + '" t="inlineStr"><is><t xml:space="preserve">' + text + '</t></is></c>'
+    return cells
+
+
+def _datetime_serial(values):
+    """datetime64 배열 → Excel 일련번호"""
+    values = np.asarray(values, dtype='datetime64[ns]')
+    return (values - _EXCEL_EPOCH) / np.timedelta64(1, 'D')
+
+
+# 객체 컬럼 원소 분류
+_KIND_NULL, _KIND_NUMBER, _KIND_STRING, _KIND_DATETIME, _KIND_BOOL = range(5)
+
+
+def _classify(value):
+    if value is None:
+        return _KIND_NULL
+    if isinstance(value, bool) or isinstance(value, np.bool_):
+        return _KIND_BOOL
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return _KIND_NULL if value != value else _KIND_NUMBER
+    if isinstance(value, (datetime.date, np.datetime64)):
+        return _KIND_NULL if pd.isna(value) else _KIND_DATETIME
+    if value is pd.NaT or value is pd.NA:
+        return _KIND_NULL
+    return _KIND_STRING
+
+
+def column_cells(series, letter, rows, styles):
+    """컬럼 하나의 셀 XML 배열 (dtype별 일괄 변환)
+
+    Args:
+        series: 기록할 값
+        letter: 컬럼 문자 (A, B, ...)
+        rows: 행 번호 문자열 배열
+        styles: 템플릿 서식 인덱스
+    """
+    refs = letter + rows
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        values = series.to_numpy()
+        return '<c r="' + refs + '" t="b"><v>' + np.where(values, '1', '0').astype(object) + '</v></c>'
+    if pd.api.types.is_integer_dtype(dtype) and not series.hasnans:
+        return _number_cells(refs, series.to_numpy(dtype='int64'), None)
+    if pd.api.types.is_numeric_dtype(dtype):
+        return _number_cells(refs, series.to_numpy(dtype='float64', na_value=np.nan), None)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        if getattr(dtype, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        return _number_cells(refs, _datetime_serial(series.to_numpy()), styles['datetime'])
+
+    values = series.to_numpy(dtype=object)
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'string':
+        # 전부 문자열인 경우 원소별 분류 생략
+        return _string_cells(refs, values, ~pd.isna(values))
+
+    kinds = np.fromiter((_classify(v) for v in values), dtype=np.int8, count=len(values))
+    cells = np.full(len(values), '', dtype=object)
+
+    mask = kinds == _KIND_STRING
+    if mask.any():
+        cells[mask] = _string_cells(refs[mask], values[mask])
+    mask = kinds == _KIND_NUMBER
+    if mask.any():
+        cells[mask] = _number_cells(refs[mask], values[mask].astype('float64'), None)
+    mask = kinds == _KIND_DATETIME
+    if mask.any():
+        stamps = pd.to_datetime(pd.Series(values[mask]), utc=False)
+        if getattr(stamps.dtype, 'tz', None) is not None:
+            stamps = stamps.dt.tz_localize(None)
+        cells[mask] = _number_cells(refs[mask], _datetime_serial(stamps.to_numpy()), styles['date'])
+    mask = kinds == _KIND_BOOL
+    if mask.any():
+        flags = np.where(values[mask].astype(bool), '1', '0').astype(object)
+        cells[mask] = '<c r="' + refs[mask] + '" t="b"><v>' + flags + '</v></c>'
+    return cells
+
+
+def _header_row_xml(columns, row, styles, start_col=0):
+    cells = ''.join(
+        f'<c r="{column_letter(start_col + i)}{row}" s="{styles["header"]}" t="inlineStr">'
+        f'<is><t xml:space="preserve">{escape(str(col))}</t></is></c>'
+        for i, col in enumerate(columns)
+    )
+    return cells
+
+
+def iter_frame_rows_xml(df, styles, start_row=1, start_col=0, block_size=ROW_BLOCK_SIZE):
+    """데이터프레임을 <row> XML 블록 단위로 생성 (헤더 포함, 인덱스 제외)"""
+    yield f'<row r="{start_row}">{_header_row_xml(df.columns, start_row, styles, start_col)}</row>'
+    letters = [column_letter(start_col + i) for i in range(df.shape[1])]
+    for block_start in range(0, len(df), block_size):
+        block = df.iloc[block_start:block_start + block_size]
+        rows = (np.arange(len(block)) + start_row + 1 + block_start).astype(str).astype(object)
+        columns = [('<row r="' + rows + '">').tolist()]
+        columns += [column_cells(block.iloc[:, i], letter, rows, styles).tolist() for i, letter in enumerate(letters)]
+        columns.append(['</row>'] * len(block))
+        # 행 단위 결합 (컬럼 순서대로)
+        yield ''.join(''.join(cells) for cells in zip(*columns))
+
+
+def _sheet_xml_head(dimension, selected=False):
+    view = '<sheetView tabSelected="1" workbookViewId="0"/>' if selected else '<sheetView workbookViewId="0"/>'
+    return (
+        f'{XML_DECL}<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}">'
+        f'<dimension ref="{dimension}"/><sheetViews>{view}</sheetViews>'
+        '<sheetFormatPr defaultRowHeight="15"/><sheetData>'
+    )
+
+
+_SHEET_XML_TAIL = (
+    '</sheetData><pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/>'
+    '</worksheet>'
+)
+
+
+def iter_frame_sheet_xml(df, styles, selected=False):
+    """데이터 시트 XML 조각 생성"""
+    last = f'{column_letter(max(df.shape[1] - 1, 0))}{len(df) + 1}'
+    yield _sheet_xml_head(f'A1:{last}', selected)
+    yield from iter_frame_rows_xml(df, styles)
+    yield _SHEET_XML_TAIL
+
+
+def summary_sheet_xml(summary_data, styles, selected=False):
+    """Summary 시트 XML (create_excel_file의 기존 배치와 동일)"""
+    rows = {}
+
+    def put(row, cells):
+        rows.setdefault(row, []).append(cells)
+
+    def text_cell(row, col, value, style):
+        return (f'<c r="{column_letter(col)}{row}" s="{style}" t="inlineStr">'
+                f'<is><t xml:space="preserve">{escape(str(value))}</t></is></c>')
+
+    # 1행: 제목 (A1:D1 병합)
+    put(1, text_cell(1, 0, '수입신고 분석 보고서', styles['summary_title']))
+    row = 3
+    put(row, text_cell(row, 0, '전체 신고 건수', styles['summary_header']))
+    put(row, f'<c r="B{row}"><v>{summary_data.get("전체 신고 건수", 0)}</v></c>')
+    row += 2
+
+    for key, label in (('거래구분별', '거래구분별 분석'), ('세율구분별', '세율구분별 분석'),
+                       ('Risk분석', 'Risk 분석 요약'), ('규칙별', '규칙별 해당 건수'), ('신고구조', '신고 구조')):
+        if key not in summary_data:
+            continue
+        table = summary_data[key]
+        put(row, text_cell(row, 0, label, styles['summary_header']))
+        row += 1
+        put(row, _header_row_xml(table.columns, row, styles))
+        row_numbers = (np.arange(len(table)) + row + 1).astype(str).astype(object)
+        for i in range(table.shape[1]):
+            cells = column_cells(table.iloc[:, i], column_letter(i), row_numbers, styles)
+            for r, cell in zip(range(row + 1, row + 1 + len(table)), cells):
+                if cell:
+                    put(r, cell)
+        row += len(table) + 2
+
+    last_row = max(rows)
+    body = ''.join(f'<row r="{r}">{"".join(rows[r])}</row>' for r in sorted(rows))
+    return (
+        _sheet_xml_head(f'A1:D{last_row}', selected) + body + '</sheetData>'
+        '<mergeCells count="1"><mergeCell ref="A1:D1"/></mergeCells>'
+        '<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/>'
+        '</worksheet>'
+    )
+
+
+def _package_parts(sheet_names):
+    """시트 목록에 맞춘 workbook/관계/콘텐츠 형식 파트"""
+    sheets = ''.join(
+        f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+        for i, name in enumerate(sheet_names, start=1)
+    )
+    n = len(sheet_names)
+    workbook = (
+        f'{XML_DECL}<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><workbookPr/>'
+        f'<bookViews><workbookView activeTab="0"/></bookViews><sheets>{sheets}</sheets>'
+        '<calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>'
+    )
+    rel_type = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    workbook_rels = ''.join(
+        f'<Relationship Id="rId{i}" Type="{rel_type}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, n + 1)
+    ) + (
+        f'<Relationship Id="rId{n + 1}" Type="{rel_type}/theme" Target="theme/theme1.xml"/>'
+        f'<Relationship Id="rId{n + 2}" Type="{rel_type}/styles" Target="styles.xml"/>'
+        f'<Relationship Id="rId{n + 3}" Type="{rel_type}/sharedStrings" Target="sharedStrings.xml"/>'
+    )
+    content_types = (
+        f'{XML_DECL}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/docProps/app.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+        '<Override PartName="/docProps/core.xml" '
+        'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/theme/theme1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{CT_WORKSHEET}"/>'
+            for i in range(1, n + 1)
+        ) +
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'
+    )
+    now = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    core = (
+        f'{XML_DECL}<cp:coreProperties '
+        'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        f'<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+        f'<dcterms:modified xsi:type="dcterms:W3CDTF">{now}</dcterms:modified>'
+        '</cp:coreProperties>'
+    )
+    app = (
+        f'{XML_DECL}<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+        '<Application>Microsoft Excel</Application></Properties>'
+    )
+    root_rels = (
+        f'{XML_DECL}<Relationships xmlns="{NS_PKG_REL}">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="xl/workbook.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/'
+        'core-properties" Target="docProps/core.xml"/>'
+        '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'extended-properties" Target="docProps/app.xml"/>'
+        '</Relationships>'
+    )
+    return {
+        '[Content_Types].xml': content_types,
+        '_rels/.rels': root_rels,
+        'xl/workbook.xml': workbook,
+        'xl/_rels/workbook.xml.rels': f'{XML_DECL}<Relationships xmlns="{NS_PKG_REL}">{workbook_rels}</Relationships>',
+        'docProps/core.xml': core,
+        'docProps/app.xml': app,
+    }
+
+
+def report_sheets(df_original, eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data, summary_data,
+                  extra_sheets=None):
+    """리포트 시트 순서와 내용: [(시트명, 종류, 데이터)]
+
+    Args:
+        extra_sheets: 단가 Risk 다음에 넣을 추가 분석 시트 [(시트명, DataFrame)]
+    """
+    sheets = []
+    if summary_data:
+        sheets.append(('Summary', 'summary', summary_data))
+    for name, frame in [('8% 환급 검토', eight_percent_data), ('0% Risk', zero_risk_data),
+                        ('세율 Risk', tariff_risk_data), ('단가 Risk', price_risk_data)] + list(extra_sheets or []):
+        if frame is not None and not frame.empty:
+            sheets.append((name, 'frame', frame))
+    # 원본데이터 시트 (상위 1000개 행만)
+    sheets.append(('원본데이터', 'frame', df_original.head(ORIGINAL_DATA_ROWS)))
+    sheets.append((VERIFICATION_SHEET, 'static', None))
+    return sheets
+
+
+def iter_sheet_xml(kind, data, template, selected=False):
+    """시트 종류별 XML 조각 생성"""
+    if kind == 'summary':
+        yield summary_sheet_xml(data, template['styles'], selected)
+    elif kind == 'frame':
+        yield from iter_frame_sheet_xml(data, template['styles'], selected)
+    else:
+        yield template['verification_sheet'].decode('utf-8')
+
+
+def assemble_package(sheet_names, sheet_writers, template):
+    """시트 XML과 템플릿 파트를 xlsx zip으로 조립
+
+    Args:
+        sheet_writers: 시트별 write(zip 항목 파일객체) 함수 목록
+    """
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as package:
+        for name, content in _package_parts(sheet_names).items():
+            package.writestr(name, content)
+        for name, content in template['parts'].items():
+            package.writestr(name, content)
+        for i, write in enumerate(sheet_writers, start=1):
+            with package.open(f'xl/worksheets/sheet{i}.xml', 'w', force_zip64=True) as entry:
+                write(entry)
+    return output.getvalue()
+
+
+def _render_sheet_file(kind, data, selected, path):
+    """작업자 프로세스: 시트 XML을 임시 파일로 기록"""
+    template = get_report_template()
+    with open(path, 'wb') as f:
+        for chunk in iter_sheet_xml(kind, data, template, selected):
+            f.write(chunk.encode('utf-8'))
+    return path
+
+
+def resolve_report_workers():
+    """시트 렌더링 작업자 프로세스 수"""
+    configured = os.environ.get('REPORT_WORKERS')
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_report_pool():
+    """프로세스 공용 시트 렌더링 풀 (작업자 1개 이하면 None)"""
+    global _pool
+    workers = resolve_report_workers()
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Streamlit 서버 스레드와 fork 충돌을 피하기 위해 spawn 사용
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_report_pool():
+    """렌더링 풀 종료 (다음 호출 시 새로 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_sheets_parallel(sheets, template, work_dir, pool=None):
+    """큰 시트는 작업자 프로세스에서, 나머지는 현재 프로세스에서 렌더링
+
+    Returns:
+        시트별 write(zip 항목 파일객체) 함수 목록
+    """
+    pool = pool if pool is not None else get_report_pool()
+    futures = {}
+    if pool is not None:
+        # 큰 시트부터 제출해 작업자 간 부하 균형
+        order = sorted(range(len(sheets)), key=lambda i: -_sheet_rows(sheets[i]))
+        for i in order:
+            _, kind, data = sheets[i]
+            if kind == 'frame' and len(data) >= PARALLEL_SHEET_MIN_ROWS:
+                path = os.path.join(work_dir, f'sheet{i + 1}.xml')
+                futures[i] = pool.submit(_render_sheet_file, kind, data, i == 0, path)
+
+    writers = []
+    for i, (_, kind, data) in enumerate(sheets):
+        if i in futures:
+            writers.append(_copy_writer(futures[i]))
+        else:
+            writers.append(_inline_writer(kind, data, i == 0, template))
+    return writers
+
+
+def _sheet_rows(sheet):
+    _, kind, data = sheet
+    return len(data) if kind == 'frame' else 0
+
+
+def _inline_writer(kind, data, selected, template):
+    def write(entry):
+        for chunk in iter_sheet_xml(kind, data, template, selected):
+            entry.write(chunk.encode('utf-8'))
+    return write
+
+
+def _copy_writer(future):
+    def write(entry):
+        with open(future.result(), 'rb') as f:
+            shutil.copyfileobj(f, entry, COPY_BUFFER_SIZE)
+    return write
+
+
+def build_excel_report(df_original, eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data,
+                       summary_data, extra_sheets=None):
+    """분석 결과 엑셀 파일(bytes) 생성 (extra_sheets: 추가 분석 시트 [(시트명, DataFrame)])"""
+    template = get_report_template()
+    sheets = report_sheets(df_original, eight_percent_data, zero_risk_data, tariff_risk_data,
+                           price_risk_data, summary_data, extra_sheets)
+
+    if not any(_sheet_rows(sheet) >= PARALLEL_SHEET_MIN_ROWS for sheet in sheets):
+        return assemble_package(
+            [name for name, _, _ in sheets],
+            [_inline_writer(kind, data, i == 0, template) for i, (_, kind, data) in enumerate(sheets)],
+            template,
+        )
+
+    with tempfile.TemporaryDirectory(prefix='excel_report_') as work_dir:
+        try:
+            writers = render_sheets_parallel(sheets, template, work_dir)
+            return assemble_package([name for name, _, _ in sheets], writers, template)
+        except BrokenProcessPool:
+            # 작업자 프로세스 비정상 종료 시 풀을 재생성하고 현재 프로세스에서 렌더링
+            shutdown_report_pool()
+            return assemble_package(
+                [name for name, _, _ in sheets],
+                [_inline_writer(kind, data, i == 0, template) for i, (_, kind, data) in enumerate(sheets)],
+                template,
+            )
@@ -0,0 +1,207 @@
+"""FTA 협정세율 기반 예상 환급액 산출
+
+8% 환급 검토 대상 행의 세번부호·원산지코드를 로컬 FTA 협정세율 표와 결합하여
+협정세율 적용 시 돌려받을 수 있는 관세액(예상환급액)을 계산합니다.
+
+협정세율 표(CSV)는 HS 접두어 길이별 해시 인덱스로 컴파일되며,
+결합은 접두어 길이마다 한 번씩 전체 행을 벡터 연산으로 조회합니다 (긴 접두어 우선).
+행 단위 조회가 없으므로 100만 행도 수 초 내에 처리됩니다.
+
+협정세율 표는 환경변수 FTA_RATE_TABLE_PATH로 지정한 CSV만 사용하며, 지정하지 않으면
+예상환급액을 계산하지 않습니다 (rules/fta_rates.example.csv는 형식 예시일 뿐 실제 세율이 아님).
+
+표 형식:
+    원산지코드,세번부호,협정,협정세율
+    CN,8516,한-중 FTA,5.6
+    US,*,한-미 FTA,0
+
+예상환급액 = 행별관세 × (관세실행세율 - 협정세율) / 관세실행세율 (종가세 기준)
+"""
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+# 협정세율 표 경로 환경변수 (지정하지 않으면 예상환급액 미계산)
+FTA_TABLE_ENV = 'FTA_RATE_TABLE_PATH'
+
+TABLE_COLUMNS = ('원산지코드', '세번부호', '협정', '협정세율')
+
+# 모든 원산지/세번부호에 적용되는 표 항목
+WILDCARD = '*'
+
+# 예상환급액 결과 컬럼
+REFUND_COLUMNS = ['적용협정', '협정세율', '예상환급액']
+
+
+class FtaTableError(ValueError):
+    """FTA 협정세율 표 오류"""
+
+
+def _normalize_hs(values):
+    """세번부호 → 숫자만 남긴 문자열 (10자리 정수로 읽힌 값 포함)"""
+    text = pd.Series(values, copy=False).astype(str).str.replace(r'\.0$', '', regex=True)
+    return text.str.replace(r'\D', '', regex=True)
+
+
+def _normalize_country(values):
+    return pd.Series(values, copy=False).astype(str).str.strip().str.upper()
+
+
+def compile_fta_table(table):
+    """협정세율 표 → HS 접두어 길이별 인덱스
+
+    Returns:
+        {
+            'levels': [(접두어 길이, pd.Index(키), 협정 배열, 협정세율 배열)] (긴 접두어 순),
+            'rows': 표 항목 수,
+        }
+    """
+    missing = [col for col in TABLE_COLUMNS if col not in table.columns]
+    if missing:
+        raise FtaTableError(f"FTA 협정세율 표에 필요한 컬럼이 없습니다: {', '.join(missing)}")
+
+    hs = table['세번부호'].astype(str).str.strip()
+    frame = pd.DataFrame({
+        'country': _normalize_country(table['원산지코드']).to_numpy(),
+        'prefix': np.where(hs.isin([WILDCARD, '']), '', _normalize_hs(hs)),
+        'agreement': table['협정'].astype(str).to_numpy(),
+        'rate': pd.to_numeric(table['협정세율'], errors='coerce').to_numpy(),
+    })
+    if frame['rate'].isna().any():
+        raise FtaTableError("협정세율에 숫자가 아닌 값이 있습니다.")
+
+    # 같은 원산지/접두어가 여러 번 나오면 가장 낮은 협정세율 사용
+    frame = frame.sort_values('rate', kind='stable').drop_duplicates(['country', 'prefix'])
+    frame['length'] = frame['prefix'].str.len()
+
+    levels = []
+    for length in sorted(frame['length'].unique(), reverse=True):
+        level = frame[frame['length'] == length]
+        keys = pd.Index(level['country'] + '|' + level['prefix'])
+        levels.append((int(length), keys, level['agreement'].to_numpy(), level['rate'].to_numpy(dtype='float64')))
+    return {'levels': levels, 'rows': len(frame)}
+
+
+def parse_fta_table(source):
+    """CSV 경로/파일 객체 → 컴파일된 협정세율 표"""
+    try:
+        table = pd.read_csv(source, dtype=str, comment='#', skipinitialspace=True)
+    except (OSError, ValueError) as e:
+        raise FtaTableError(f"FTA 협정세율 표를 읽을 수 없습니다: {e}")
+    return compile_fta_table(table)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_fta_table_cached(path, mtime):
+    return parse_fta_table(path)
+
+
+def fta_table_path():
+    """환경변수 FTA_RATE_TABLE_PATH로 지정된 협정세율 표 경로 (없으면 None)"""
+    return os.environ.get(FTA_TABLE_ENV) or None
+
+
+def load_fta_table(path=None):
+    """협정세율 표 로드 (기본: FTA_RATE_TABLE_PATH, 지정된 표가 없으면 None)"""
+    path = path or fta_table_path()
+    if not path:
+        return None
+    return _load_fta_table_cached(os.path.abspath(path), os.path.getmtime(path))
+
+
+def lookup_fta_rates(hs_codes, countries, fta_table):
+    """행별 적용 협정과 협정세율 조회 (벡터 결합, 긴 접두어 우선, 원산지 지정 항목 우선)
+
+    Returns:
+        (협정 배열, 협정세율 배열) - 해당 항목이 없으면 None / NaN
+    """
+    hs = _normalize_hs(hs_codes).to_numpy(dtype=object)
+    country = _normalize_country(countries).to_numpy(dtype=object)
+    n = len(hs)
+
+    agreements = np.full(n, None, dtype=object)
+    rates = np.full(n, np.nan)
+    unmatched = np.ones(n, dtype=bool)
+
+    # 고유 (원산지, 세번부호) 조합만 조회한 뒤 행으로 펼침
+    pairs = pd.DataFrame({'country': country, 'hs': hs})
+    codes, uniques = pd.MultiIndex.from_frame(pairs).factorize()
+    unique_country = uniques.get_level_values(0).to_numpy(dtype=object)
+    unique_hs = pd.Series(uniques.get_level_values(1), dtype=object)
+
+    unique_agreement = np.full(len(uniques), None, dtype=object)
+    unique_rate = np.full(len(uniques), np.nan)
+    pending = np.ones(len(uniques), dtype=bool)
+
+    for length, keys, level_agreements, level_rates in fta_table['levels']:
+        if not pending.any():
+            break
+        prefix = unique_hs.str.slice(0, length).to_numpy(dtype=object)
+        too_short = unique_hs.str.len().to_numpy() < length
+        for origin in (unique_country, WILDCARD):
+            position = keys.get_indexer(origin + '|' + prefix)
+            hit = pending & (position >= 0) & ~too_short
+            unique_agreement[hit] = level_agreements[position[hit]]
+            unique_rate[hit] = level_rates[position[hit]]
+            pending &= ~hit
+
+    if len(uniques):
+        agreements = unique_agreement[codes]
+        rates = unique_rate[codes]
+        unmatched = pending[codes]
+    agreements[unmatched] = None
+    return agreements, rates
+
+
+def estimate_refunds(frame, fta_table=None):
+    """8% 환급 검토 결과에 적용협정/협정세율/예상환급액 컬럼 추가
+
+    Args:
+        frame: 세번부호, 원산지코드, 관세실행세율, 행별관세 컬럼을 가진 데이터프레임
+        fta_table: compile_fta_table 결과 (None이면 load_fta_table)
+
+    협정세율 표가 지정되지 않았으면 컬럼을 추가하지 않고 그대로 반환합니다.
+    """
+    fta_table = fta_table or load_fta_table()
+    if fta_table is None:
+        return frame
+    result = frame.copy()
+    if len(result) == 0 or not {'세번부호', '원산지코드'} <= set(result.columns):
+        for col in REFUND_COLUMNS:
+            result[col] = pd.Series(dtype='float64' if col != '적용협정' else object)
+        return result
+
+    agreements, fta_rates = lookup_fta_rates(result['세번부호'], result['원산지코드'], fta_table)
+    applied = pd.to_numeric(result.get('관세실행세율', 0), errors='coerce').to_numpy(dtype='float64')
+    duty = pd.to_numeric(result.get('행별관세', 0), errors='coerce').fillna(0).to_numpy(dtype='float64')
+
+    # 협정세율이 실행세율보다 낮은 경우만 환급 (종가세 비례)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where((applied > 0) & (fta_rates < applied), (applied - fta_rates) / applied, 0.0)
+    ratio = np.nan_to_num(ratio, nan=0.0)
+
+    result['적용협정'] = np.where(pd.isna(agreements), '', agreements)
+    result['협정세율'] = fta_rates
+    result['예상환급액'] = np.round(duty * ratio)
+    return result
+
+
+def summarize_refunds(frame):
+    """신고번호별 예상환급액 (큰 순서)"""
+    if frame is None or frame.empty or '예상환급액' not in frame.columns:
+        return pd.DataFrame(columns=['수입신고번호', '행수', '행별관세', '예상환급액'])
+    key = '수입신고번호' if '수입신고번호' in frame.columns else None
+    work = pd.DataFrame({
+        '수입신고번호': frame[key] if key else '전체',
+        '행별관세': pd.to_numeric(frame.get('행별관세', 0), errors='coerce').fillna(0),
+        '예상환급액': frame['예상환급액'],
+    })
+    grouped = work.groupby('수입신고번호', sort=False).agg(
+        행수=('예상환급액', 'size'),
+        행별관세=('행별관세', 'sum'),
+        예상환급액=('예상환급액', 'sum'),
+    ).reset_index()
+    grouped = grouped[grouped['예상환급액'] > 0]
+    return grouped.sort_values('예상환급액', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,164 @@
+"""세번부호(HS) 계층 접두어 인덱스
+
+세번부호를 류(2단위) / 호(4단위) / 소호(6단위) / 세번(10단위) 계층으로 나눈 인덱스입니다.
+업로드당 한 번, 고유 세번부호에 대해서만 벡터 문자열 연산으로 접두어를 추출하고
+계층별 코드(factorize 정수)를 보관하므로 이후 조회는 해시 조회와 정수 배열 연산만 사용합니다.
+
+세율 Risk 충돌(같은 규격1, 다른 세번부호)의 심각도는 세번부호가 갈라지는 가장 상위 계층으로 평가합니다.
+    - 류 상이 (점수 4): 서로 다른 류(Chapter)로 분류 → 가장 의심스러움
+    - 호 상이 (점수 3)
+    - 소호 상이 (점수 2)
+    - 세번 상이 (점수 1): 같은 6단위 소호 내 10단위만 다름
+"""
+import numpy as np
+import pandas as pd
+
+# (계층명, 접두어 길이)
+HS_LEVELS = [('류', 2), ('호', 4), ('소호', 6), ('세번', 10)]
+HS_LEVEL_NAMES = [name for name, _ in HS_LEVELS]
+
+# 갈라지는 계층별 점수/표시명
+DIVERGENCE_SCORES = {'류': 4, '호': 3, '소호': 2, '세번': 1}
+DIVERGENCE_LABELS = {
+    '류': '류(2단위) 상이',
+    '호': '호(4단위) 상이',
+    '소호': '소호(6단위) 상이',
+    '세번': '세번(10단위) 상이',
+}
+
+
+def normalize_hs(values):
+    """세번부호 → 숫자만 남긴 문자열 (숫자로 읽힌 '8471300000.0' 포함)"""
+    text = pd.Series(values, copy=False, dtype=object).astype(str)
+    text = text.str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+    return text.where(pd.notna(pd.Series(values, copy=False, dtype=object)).to_numpy(), '')
+
+
+def build_hs_index(hs_values):
+    """세번부호 컬럼 → 계층 인덱스
+
+    Returns:
+        {
+            'index': 고유 세번부호 pd.Index (원래 값 그대로),
+            'row_ids': 행별 고유값 번호 (결측은 -1),
+            'normalized': 고유값별 숫자 문자열,
+            'levels': {계층명: (고유값별 계층 코드, 계층 접두어 pd.Index)},
+        }
+    """
+    row_ids, uniques = pd.factorize(pd.Series(hs_values, copy=False))
+    normalized = normalize_hs(uniques).reset_index(drop=True)
+    levels = {}
+    for name, length in HS_LEVELS:
+        prefix = normalized.str.slice(0, length)
+        codes, prefixes = pd.factorize(prefix)
+        # 숫자가 없는 세번부호는 계층 비교에서 제외
+        codes = np.where(normalized.to_numpy(dtype=object) == '', -1, codes)
+        levels[name] = (codes, pd.Index(prefixes))
+    return {
+        'index': pd.Index(uniques),
+        'row_ids': row_ids,
+        'normalized': normalized,
+        'levels': levels,
+    }
+
+
+def lookup_ids(hs_index, hs_values):
+    """세번부호 값 → 인덱스의 고유값 번호 (없으면 -1)"""
+    return hs_index['index'].get_indexer(pd.Series(hs_values, copy=False))
+
+
+def level_codes(hs_index, level, ids):
+    """고유값 번호 배열 → 계층 코드 배열 (없으면 -1)"""
+    codes = hs_index['levels'][level][0]
+    return np.where(ids >= 0, codes[np.maximum(ids, 0)], -1)
+
+
+def level_prefixes(hs_index, level, ids):
+    """고유값 번호 배열 → 계층 접두어 문자열 배열"""
+    length = dict(HS_LEVELS)[level]
+    normalized = hs_index['normalized'].str.slice(0, length).to_numpy(dtype=object)
+    return np.where(ids >= 0, normalized[np.maximum(ids, 0)], '')
+
+
+def score_divergence(spec_values, hs_values, hs_index=None):
+    """규격1별 세번부호가 갈라지는 최상위 계층과 점수 (행 단위로 반환)
+
+    Returns:
+        (계층 표시명 배열, 점수 배열)
+    """
+    hs_index = hs_index or build_hs_index(hs_values)
+    ids = lookup_ids(hs_index, hs_values)
+    spec_codes, _ = pd.factorize(pd.Series(spec_values, copy=False))
+
+    frame = pd.DataFrame({'spec': spec_codes})
+    for name in HS_LEVEL_NAMES:
+        codes = level_codes(hs_index, name, ids).astype('float64')
+        codes[codes < 0] = np.nan
+        frame[name] = codes
+    distinct = frame.groupby('spec')[HS_LEVEL_NAMES].nunique()
+
+    conditions = [distinct[name].to_numpy() > 1 for name in HS_LEVEL_NAMES[:-1]]
+    spec_level = np.select(conditions, HS_LEVEL_NAMES[:-1], default='세번')
+    level_by_spec = pd.Series(spec_level, index=distinct.index)
+
+    row_level = level_by_spec.reindex(spec_codes).to_numpy(dtype=object)
+    labels = pd.Series(row_level).map(DIVERGENCE_LABELS).to_numpy(dtype=object)
+    scores = pd.Series(row_level).map(DIVERGENCE_SCORES).fillna(0).astype('int64').to_numpy()
+    return labels, scores
+
+
+def pairwise_divergence(left_values, right_values):
+    """두 세번부호 배열의 행별 갈라지는 최상위 계층과 점수 (같으면 빈 문자열/0)
+
+    Returns:
+        (계층 표시명 배열, 점수 배열)
+    """
+    left = normalize_hs(left_values)
+    right = normalize_hs(right_values).set_axis(left.index)
+    conditions = [(left.str.slice(0, length) != right.str.slice(0, length)).to_numpy(dtype=bool)
+                  for _, length in HS_LEVELS]
+    level = np.select(conditions, HS_LEVEL_NAMES, default='')
+    labels = pd.Series(level).map(DIVERGENCE_LABELS).fillna('').to_numpy(dtype=object)
+    scores = pd.Series(level).map(DIVERGENCE_SCORES).fillna(0).astype('int64').to_numpy()
+    return labels, scores
+
+
+def hs_drilldown(frame, level, parent_prefix='', hs_index=None, duty_column='행별관세'):
+    """세율 Risk 결과를 계층별로 집계 (parent_prefix로 시작하는 세번부호만)
+
+    Args:
+        level: 집계할 계층명 ('류', '호', '소호', '세번')
+        parent_prefix: 상위 계층 접두어 (예: '84')
+
+    Returns:
+        계층 접두어별 규격1 수, 행수, 행별관세 합계
+    """
+    hs_index = hs_index or build_hs_index(frame['세번부호'])
+    ids = lookup_ids(hs_index, frame['세번부호'])
+    prefixes = level_prefixes(hs_index, level, ids)
+    work = pd.DataFrame({
+        level: prefixes,
+        '규격1': frame['규격1'].to_numpy() if '규격1' in frame.columns else '',
+        '행별관세': (pd.to_numeric(frame[duty_column], errors='coerce').fillna(0).to_numpy()
+                  if duty_column in frame.columns else 0.0),
+    })
+    if parent_prefix:
+        work = work[work[level].str.startswith(parent_prefix)]
+    work = work[work[level] != '']
+    table = work.groupby(level, sort=True).agg(
+        규격1수=('규격1', 'nunique'),
+        행수=(level, 'size'),
+        행별관세합계=('행별관세', 'sum'),
+    ).reset_index()
+    return table
+
+
+def filter_by_prefix(frame, prefix, hs_index=None):
+    """세번부호가 접두어로 시작하는 행만 선택"""
+    if not prefix:
+        return frame
+    hs_index = hs_index or build_hs_index(frame['세번부호'])
+    ids = lookup_ids(hs_index, frame['세번부호'])
+    normalized = hs_index['normalized'].to_numpy(dtype=object)
+    values = np.where(ids >= 0, normalized[np.maximum(ids, 0)], '')
+    return frame[pd.Series(values, dtype=object).str.startswith(prefix).to_numpy()]
@@ -0,0 +1,513 @@
+"""로컬 분석 작업 큐
+
+업로드 파일의 분석(로드 + 분석 + 리포트 생성)을 Streamlit 스크립트 스레드가 아닌
+서버 프로세스의 작업자 스레드 풀에서 실행합니다. 작업 상태와 결과는 디스크에 저장되므로
+브라우저 탭을 닫거나 웹소켓 연결이 끊겨도 작업이 계속되고, 다시 접속하면 이어서 확인할 수 있습니다.
+
+- 작업 ID: 파일 내용 + 분석 옵션의 해시 (같은 파일/옵션은 같은 작업을 재사용)
+- 공정성: 사용자(세션)별 대기열을 라운드로빈으로 처리
+- 예측 작업: 업로드 직후 미리 제출한 작업(speculative)은 일반 대기 작업이 없을 때만 실행하고,
+  같은 작업이 정식으로 제출되면 일반 작업으로 전환, 예측한 세션이 모두 철회하면 취소합니다
+  (실행 중이면 다음 진행 보고 시점에 중단)
+- 확정(committer): 이력 누적 등 되돌릴 수 없는 기록은 작업이 정식 작업일 때만 수행합니다.
+  일반 작업은 완료 직후, 예측 작업은 완료 후 정식으로 제출(claim)되는 시점에 한 번 실행합니다
+- 입력 파일은 내용 해시별로 한 번만 저장하고(옵션이 다른 작업끼리 공유), 참조하는 작업이 모두 정리되면 삭제합니다
+- 정리: 보관 기간이 지난 작업은 시작 시와 PURGE_INTERVAL_SECONDS마다 삭제합니다
+- 여러 프로세스(Streamlit 화면, API 서버)가 같은 작업 디렉터리를 쓰면 디렉터리 잠금(owner.lock)을 잡은
+  한 프로세스만 작업을 실행/복구/정리합니다. 나머지 프로세스는 새 작업의 상태와 입력만 디스크에 쓰고
+  대기열 등록/재사용/철회는 요청 폴더(requests)로 넘기며, 소유 프로세스가 종료되면 잠금을 넘겨받습니다
+- 저장 위치: 환경변수 ANALYSIS_JOB_DIR (기본: ~/.cache/import_analysis/jobs)
+- 작업자 수: 환경변수 ANALYSIS_WORKERS (기본: 2)
+"""
+import collections
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import traceback
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_JOB_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'import_analysis', 'jobs')
+DEFAULT_WORKERS = 2
+
+# 완료된 작업 보관 기간 (시간)
+DEFAULT_RETENTION_HOURS = 24
+
+# 보관 기간이 지난 작업 정리 주기 (초)
+PURGE_INTERVAL_SECONDS = 600
+
+# 소유 프로세스가 요청 폴더를 확인하는 주기, 대기 프로세스가 소유권을 확인하는 주기 (초)
+REQUEST_POLL_SECONDS = 1.0
+OWNER_POLL_SECONDS = 5.0
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+INPUT_DIR = 'inputs'
+REQUEST_DIR = 'requests'
+OWNER_LOCK_FILE = 'owner.lock'
+STATE_FILE = 'state.json'
+RESULT_FILE = 'results.pkl'
+
+
+def input_key(file_bytes):
+    """입력 파일 내용 해시 (같은 파일은 작업이 달라도 한 번만 저장)"""
+    return hashlib.sha256(file_bytes).hexdigest()[:20]
+
+
+def make_job_id(file_bytes, options):
+    """파일 내용 + 옵션 해시 기반 작업 ID"""
+    digest = hashlib.sha256(file_bytes)
+    digest.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:20]
+
+
+class JobCancelled(Exception):
+    """실행 중 취소된 작업 (진행 보고 시점에 발생)"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def _atomic_write(path, data, mode='w'):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode, **({'encoding': 'utf-8'} if 'b' not in mode else {})) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _try_lock(handle):
+    """다른 프로세스가 잡고 있지 않으면 파일 잠금 (프로세스가 끝나면 자동 해제)"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class JobQueue:
+    """디스크 기반 작업 큐 + 작업자 스레드 풀
+
+    runner(input_path, options, report) -> dict 형태의 함수를 실행합니다.
+    report(progress, message)로 진행률(0~1)과 상태 메시지를 기록합니다.
+    committer(결과, 상태) -> 경고 메시지 목록은 작업이 정식 작업으로 완료될 때 한 번 실행합니다.
+    """
+
+    def __init__(self, runner, job_dir=None, workers=None, retention_hours=None, committer=None):
+        self.runner = runner
+        self.committer = committer
+        self.job_dir = job_dir or os.environ.get('ANALYSIS_JOB_DIR') or DEFAULT_JOB_DIR
+        self.workers = int(workers or os.environ.get('ANALYSIS_WORKERS') or DEFAULT_WORKERS)
+        self.retention_hours = retention_hours or DEFAULT_RETENTION_HOURS
+        os.makedirs(os.path.join(self.job_dir, INPUT_DIR), exist_ok=True)
+        os.makedirs(os.path.join(self.job_dir, REQUEST_DIR), exist_ok=True)
+
+        self._lock = threading.Condition()
+        self._queues = collections.OrderedDict()  # 사용자 → 대기 작업 ID deque
+        self._speculative = collections.deque()  # 예측 작업 ID (일반 대기 작업이 없을 때 실행)
+        self._cancelled = set()  # 실행 중 취소 요청된 작업 ID
+        self._threads = []
+        self._purged_at = time.monotonic()
+        self._owner_handle = None
+
+        if not self._acquire_ownership():
+            threading.Thread(target=self._standby_loop, name='analysis-queue-standby', daemon=True).start()
+
+    # ---- 소유권 ----
+    @property
+    def is_owner(self):
+        """이 프로세스가 작업을 실행하는 소유 프로세스인지"""
+        return self._owner_handle is not None
+
+    def _acquire_ownership(self):
+        """작업 디렉터리 잠금 시도. 얻으면 만료 작업 정리, 중단된 작업 복구 후 작업자/관리 스레드 시작"""
+        handle = open(os.path.join(self.job_dir, OWNER_LOCK_FILE), 'a+b')
+        if not _try_lock(handle):
+            handle.close()
+            return False
+        with self._lock:
+            self._owner_handle = handle
+            self._purged_at = time.monotonic()
+            self._purge_expired()
+            self._recover_pending()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work_loop, name=f'analysis-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._maintenance_loop, name='analysis-queue-maintenance', daemon=True).start()
+        return True
+
+    def _standby_loop(self):
+        """소유 프로세스가 종료되면 잠금을 넘겨받음"""
+        while not self._acquire_ownership():
+            time.sleep(OWNER_POLL_SECONDS)
+
+    def _request(self, job_id, action, **fields):
+        """소유 프로세스에 처리 요청 (요청 폴더의 파일을 소유 프로세스 작업자가 순서대로 처리)"""
+        name = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.json'
+        _atomic_write(os.path.join(self.job_dir, REQUEST_DIR, name),
+                      json.dumps(dict(fields, job_id=job_id, action=action), ensure_ascii=False))
+
+    def _process_requests(self):
+        """다른 프로세스의 제출/철회 요청 처리 (lock 보유 상태에서 호출, 확정할 작업 ID 목록 반환)"""
+        request_dir = os.path.join(self.job_dir, REQUEST_DIR)
+        commits = []
+        for name in sorted(os.listdir(request_dir)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(request_dir, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    request = json.load(f)
+            except (OSError, ValueError):
+                request = None
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            if request is None:
+                continue
+            job_id = request['job_id']
+            state = self.get_state(job_id)
+            if state is None:
+                continue
+            if request['action'] == 'cancel':
+                self.cancel_speculative(job_id, request['owner'])
+            elif request['action'] == 'enqueue':
+                if state['status'] == STATUS_QUEUED:
+                    self._schedule(job_id, state)
+            elif self._reusable(job_id, state):
+                if self._resubmit(job_id, state, request['owner'], request['speculative']):
+                    commits.append(job_id)
+            elif os.path.exists(self._input_path(state)):
+                # 요청을 처리하기 전에 취소/실패한 작업은 새로 제출한 것처럼 다시 대기
+                owner = request['owner']
+                state = self._update_state(job_id, status=STATUS_QUEUED, progress=0.0, message='대기 중',
+                                           owner=owner, speculative=[owner] if request['speculative'] else [],
+                                           committed=False)
+                self._schedule(job_id, state)
+        return commits
+
+    # ---- 경로/상태 ----
+    def _path(self, job_id, name=''):
+        return os.path.join(self.job_dir, job_id, name)
+
+    def _input_path(self, state):
+        return os.path.join(self.job_dir, INPUT_DIR, state['input_file'])
+
+    def get_state(self, job_id):
+        """작업 상태 (없으면 None)"""
+        try:
+            with open(self._path(job_id, STATE_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _update_state(self, job_id, **fields):
+        with self._lock:
+            state = self.get_state(job_id) or {}
+            state.update(fields, updated=_now())
+            _atomic_write(self._path(job_id, STATE_FILE), json.dumps(state, ensure_ascii=False))
+            return state
+
+    def load_results(self, job_id):
+        """완료된 작업의 결과"""
+        with open(self._path(job_id, RESULT_FILE), 'rb') as f:
+            return pickle.load(f)
+
+    # ---- 작업 제출 ----
+    def submit(self, file_bytes, file_name, options, owner='anonymous', speculative=False):
+        """작업 제출. 같은 파일/옵션의 작업이 진행 중이거나 완료되어 있으면 재사용
+
+        speculative=True면 예측 작업으로 제출합니다 (owner별로 cancel_speculative로 철회).
+        소유 프로세스가 아니면 새 작업의 상태와 입력만 쓰고, 대기열 등록/재사용은 소유 프로세스에 요청합니다.
+        """
+        job_id = make_job_id(file_bytes, options)
+        with self._lock:
+            state = self.get_state(job_id)
+            reuse = state and self._reusable(job_id, state)
+            commit = False
+            if reuse and not self.is_owner:
+                self._request(job_id, 'resubmit', owner=owner, speculative=speculative)
+            elif reuse:
+                commit = self._resubmit(job_id, state, owner, speculative)
+            else:
+                # 엑셀 엔진 판별을 위해 원본 확장자 유지, 같은 내용의 입력은 한 번만 저장
+                key = input_key(file_bytes)
+                input_file = key + (os.path.splitext(file_name)[1].lower() or '.xlsx')
+                input_path = os.path.join(self.job_dir, INPUT_DIR, input_file)
+                if not os.path.exists(input_path):
+                    _atomic_write(input_path, file_bytes, 'wb')
+                os.makedirs(self._path(job_id), exist_ok=True)
+                state = {
+                    'job_id': job_id,
+                    'file_name': file_name,
+                    'input_key': key,
+                    'input_file': input_file,
+                    'options': options,
+                    'owner': owner,
+                    'speculative': [owner] if speculative else [],
+                    'committed': False,
+                    'status': STATUS_QUEUED,
+                    'progress': 0.0,
+                    'message': '대기 중',
+                    'created': _now(),
+                    'updated': _now(),
+                }
+                _atomic_write(self._path(job_id, STATE_FILE), json.dumps(state, ensure_ascii=False))
+                if self.is_owner:
+                    self._schedule(job_id, state)
+                else:
+                    self._request(job_id, 'enqueue')
+        if commit:
+            self._commit(job_id, self.load_results(job_id))
+        return job_id
+
+    def _reusable(self, job_id, state):
+        """진행 중이거나 결과가 남아 있는 완료 작업인지"""
+        return state['status'] in ACTIVE_STATUSES or (
+            state['status'] == STATUS_DONE and os.path.exists(self._path(job_id, RESULT_FILE)))
+
+    def _resubmit(self, job_id, state, owner, speculative):
+        """진행 중이거나 완료된 작업을 다시 제출 (lock 보유 상태에서 호출, 미뤄 둔 기록을 확정할 차례면 True)"""
+        if state['status'] in ACTIVE_STATUSES:
+            # 취소 요청 후 아직 중단되지 않은 작업은 그대로 이어서 사용
+            revived = job_id in self._cancelled
+            self._cancelled.discard(job_id)
+            self._claim(job_id, state, owner, speculative, revived)
+            return False
+        # 완료된 예측 작업을 정식으로 제출하면 미뤄 둔 기록을 이번에 확정
+        commit = not speculative and not state.get('committed', True)
+        if commit:
+            self._update_state(job_id, speculative=[], owner=owner, committed=True)
+        return commit
+
+    def _schedule(self, job_id, state):
+        """대기 중인 작업을 대기열(예측 작업은 예측 대기열)에 등록, 이미 있으면 무시 (lock 보유 상태에서 호출)"""
+        if job_id in self._speculative or any(job_id in jobs for jobs in self._queues.values()):
+            return
+        if state.get('speculative'):
+            self._speculative.append(job_id)
+            self._lock.notify()
+        else:
+            self._enqueue(job_id, state.get('owner', 'anonymous'))
+
+    def _enqueue(self, job_id, owner):
+        self._queues.setdefault(owner, collections.deque()).append(job_id)
+        self._lock.notify()
+
+    def _claim(self, job_id, state, owner, speculative, revived=False):
+        """진행 중인 작업을 다시 제출한 경우: 예측 세션 추가 또는 일반 작업으로 전환 (lock 보유 상태에서 호출)
+
+        revived: 취소 요청 후 중단 전에 다시 제출된 예측 작업
+        """
+        holders = state.get('speculative') or []
+        if speculative:
+            if (holders or revived) and owner not in holders:
+                self._update_state(job_id, speculative=holders + [owner])
+            return
+        if holders:
+            self._update_state(job_id, speculative=[], owner=owner)
+            if job_id in self._speculative:
+                self._speculative.remove(job_id)
+                self._enqueue(job_id, owner)
+
+    def cancel_speculative(self, job_id, owner):
+        """owner의 예측 작업 철회. 예측한 세션이 모두 철회했고 아직 끝나지 않았으면 취소하고 True
+
+        소유 프로세스가 아니면 철회를 요청하고 False
+        """
+        if not self.is_owner:
+            self._request(job_id, 'cancel', owner=owner)
+            return False
+        with self._lock:
+            state = self.get_state(job_id)
+            holders = (state or {}).get('speculative') or []
+            if owner not in holders:
+                return False
+            holders = [holder for holder in holders if holder != owner]
+            if holders or state['status'] not in ACTIVE_STATUSES:
+                self._update_state(job_id, speculative=holders)
+                return False
+            if job_id in self._speculative:
+                self._speculative.remove(job_id)
+                self._update_state(job_id, speculative=[], status=STATUS_CANCELLED,
+                                   message='취소됨 (옵션 변경)', finished=_now())
+            else:
+                self._cancelled.add(job_id)
+                self._update_state(job_id, speculative=[], message='취소 중...')
+            return True
+
+    def queue_position(self, job_id):
+        """대기 중인 작업의 순번 (라운드로빈 기준 근사값, 대기 중이 아니거나 소유 프로세스가 아니면 None)"""
+        with self._lock:
+            for owner, jobs in self._queues.items():
+                if job_id in jobs:
+                    depth = list(jobs).index(job_id)
+                    # 각 사용자 대기열에서 앞선 작업 수만큼 라운드가 돌아야 함
+                    return sum(min(len(other), depth + 1) for other in self._queues.values())
+            if job_id in self._speculative:
+                # 예측 작업은 일반 대기 작업이 모두 끝난 뒤 차례
+                return sum(len(jobs) for jobs in self._queues.values()) + list(self._speculative).index(job_id) + 1
+        return None
+
+    # ---- 작업자 ----
+    def _next_job(self):
+        """사용자별 대기열을 라운드로빈으로 하나씩 꺼냄, 없으면 예측 작업 (lock 보유 상태에서 호출)"""
+        while True:
+            for owner in list(self._queues):
+                jobs = self._queues.pop(owner)
+                job_id = jobs.popleft()
+                if jobs:
+                    # 남은 작업이 있으면 맨 뒤로 보내 다른 사용자에게 차례를 넘김
+                    self._queues[owner] = jobs
+                return job_id
+            if self._speculative:
+                return self._speculative.popleft()
+            self._lock.wait()
+
+    def _work_loop(self):
+        while True:
+            with self._lock:
+                job_id = self._next_job()
+            self._run(job_id)
+
+    def _maintenance_loop(self):
+        """다른 프로세스(API 서버 등)의 요청을 대기열에 반영하고 만료 작업을 주기적으로 정리 (작업자가 모두 바빠도 실행)"""
+        while True:
+            time.sleep(REQUEST_POLL_SECONDS)
+            with self._lock:
+                commits = self._process_requests()
+            for job_id in commits:
+                self._commit(job_id, self.load_results(job_id))
+            # 서버가 오래 떠 있어도 디스크가 계속 늘지 않도록
+            if time.monotonic() - self._purged_at >= PURGE_INTERVAL_SECONDS:
+                self._purged_at = time.monotonic()
+                self._purge_expired()
+
+    def _run(self, job_id):
+        state = self.get_state(job_id)
+        if state is None:
+            return
+        self._update_state(job_id, status=STATUS_RUNNING, started=_now(), message='분석 시작')
+
+        def report(progress, message):
+            with self._lock:
+                if job_id in self._cancelled:
+                    raise JobCancelled(job_id)
+            self._update_state(job_id, progress=round(float(progress), 4), message=message)
+
+        try:
+            results = self.runner(self._input_path(state), state['options'], report)
+            _atomic_write(self._path(job_id, RESULT_FILE), pickle.dumps(results), 'wb')
+            with self._lock:
+                # 아직 예측 작업이면 정식으로 제출될 때까지 확정을 미룸
+                commit = not (self.get_state(job_id) or {}).get('speculative')
+                self._update_state(job_id, status=STATUS_DONE, progress=1.0, message='완료', finished=_now(),
+                                   committed=commit)
+            if commit:
+                self._commit(job_id, results)
+        except JobCancelled:
+            self._update_state(job_id, status=STATUS_CANCELLED, message='취소됨 (옵션 변경)', finished=_now())
+        except Exception as e:
+            self._update_state(
+                job_id, status=STATUS_FAILED, message=f'{type(e).__name__}: {e}',
+                traceback=traceback.format_exc(), finished=_now()
+            )
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+    def _commit(self, job_id, results):
+        """정식 작업 결과 확정 (committer 경고/오류는 상태의 commit_warnings에 기록)"""
+        if self.committer is None:
+            return
+        try:
+            warnings = list(self.committer(results, self.get_state(job_id)) or [])
+        except Exception as e:
+            warnings = [f'{type(e).__name__}: {e}']
+        if warnings:
+            self._update_state(job_id, commit_warnings=warnings)
+
+    # ---- 복구/정리 ----
+    def _recover_pending(self):
+        """서버 재시작(또는 소유 프로세스 종료) 전 대기/실행 중이던 작업을 다시 대기열에 등록"""
+        for job_id in sorted(os.listdir(self.job_dir)):
+            state = self.get_state(job_id)
+            if (state and state['status'] in ACTIVE_STATUSES and
+                    os.path.exists(self._input_path(state))):
+                with self._lock:
+                    if state.get('speculative'):
+                        # 예측한 세션은 재시작으로 사라졌으므로 다시 실행하지 않음
+                        self._update_state(job_id, status=STATUS_CANCELLED, speculative=[],
+                                           message='서버 재시작으로 취소', finished=_now())
+                        continue
+                    state = self._update_state(job_id, status=STATUS_QUEUED, message='서버 재시작 후 재대기')
+                    self._schedule(job_id, dict(state, owner=state.get('owner', 'recovered')))
+
+    def _purge_expired(self):
+        """보관 기간이 지난 완료/실패 작업과 참조하는 작업이 없는 입력 파일 삭제
+
+        제출과 겹치지 않도록 lock을 잡고 실행합니다 (제출 중인 작업의 입력을 지우지 않음).
+        다른 프로세스가 상태보다 먼저 쓴 입력도 지우지 않도록 보관 기간이 지난 입력만 삭제합니다.
+        """
+        cutoff = time.time() - self.retention_hours * 3600
+        referenced = set()
+        with self._lock:
+            for job_id in os.listdir(self.job_dir):
+                state = self.get_state(job_id)
+                if state is None:
+                    continue
+                try:
+                    if (state['status'] not in ACTIVE_STATUSES and
+                            os.path.getmtime(self._path(job_id, STATE_FILE)) < cutoff):
+                        shutil.rmtree(self._path(job_id), ignore_errors=True)
+                        continue
+                except OSError:
+                    pass
+                referenced.add(state.get('input_file'))
+            input_dir = os.path.join(self.job_dir, INPUT_DIR)
+            for name in os.listdir(input_dir):
+                if name not in referenced:
+                    try:
+                        path = os.path.join(input_dir, name)
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                    except OSError:
+                        continue
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(runner, committer=None):
+    """프로세스 공용 작업 큐 (Streamlit 재실행 간에 유지)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(runner, committer=committer)
+        else:
+            # 스크립트 재실행 시 새로 정의된 runner/committer로 교체
+            _queue.runner = runner
+            _queue.committer = committer
+        return _queue
@@ -0,0 +1,293 @@
+"""메모리 예산 기반 실행 계획
+
+업로드 파일과 각 분석의 메모리 사용량을 컬럼 dtype과 행수로 미리 추정하고,
+예산을 초과할 것으로 예상되면 세율 Risk / 단가 Risk를 분할(chunk) 처리로 전환합니다.
+
+예산 설정:
+    - 환경변수 ANALYSIS_MEMORY_BUDGET_MB (MB 단위)
+    - 미설정 시 사용 가능 메모리(MemAvailable, cgroup 제한 중 작은 값)의 50%
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+MB = 1024 * 1024
+
+# 메모리 정보를 얻을 수 없을 때의 기본 예산 (README 권장 메모리 1GB)
+DEFAULT_BUDGET_MB = 1024
+
+# xlsx 파일 크기 대비 로드 중 최대 메모리 배율 (openpyxl 셀 객체 + DataFrame)
+XLSX_EXPANSION_FACTOR = 12
+
+# 분할 처리 시 최소 청크 크기
+MIN_CHUNK_ROWS = 10_000
+
+# 문자열 컬럼 크기 추정용 표본 수
+SAMPLE_SIZE = 1000
+
+CHUNKED_ANALYSES = ('세율 Risk', '단가 Risk')
+
+
+def _read_meminfo_available():
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _read_cgroup_limit():
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value != 'max' and int(value) < 1 << 60:
+                return int(value)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def resolve_memory_budget_mb():
+    """분석에 사용할 메모리 예산 (MB)"""
+    configured = os.environ.get('ANALYSIS_MEMORY_BUDGET_MB')
+    if configured:
+        try:
+            return float(configured)
+        except ValueError:
+            pass
+    candidates = [v for v in (_read_meminfo_available(), _read_cgroup_limit()) if v]
+    if not candidates:
+        return float(DEFAULT_BUDGET_MB)
+    return min(candidates) * 0.5 / MB
+
+
+def estimate_series_bytes(series, sample_size=SAMPLE_SIZE):
+    """컬럼 하나의 메모리 사용량 추정 (문자열은 표본 평균 크기 × 행수)"""
+    n = len(series)
+    if n == 0:
+        return 0
+    if series.dtype != object:
+        return int(series.memory_usage(index=False, deep=False))
+    step = max(1, n // sample_size)
+    sample = series.iloc[::step].head(sample_size)
+    avg = np.mean([sys.getsizeof(v) for v in sample]) if len(sample) else 0
+    # 포인터(8바이트) + 객체 크기
+    return int(n * (8 + avg))
+
+
+def estimate_frame_bytes(df, columns=None):
+    """데이터프레임(또는 일부 컬럼)의 메모리 사용량 추정"""
+    positions = range(df.shape[1]) if columns is None else [
+        i for i, col in enumerate(df.columns) if col in set(columns)
+    ]
+    return sum(estimate_series_bytes(df.iloc[:, i]) for i in positions) + int(df.index.memory_usage())
+
+
+def estimate_upload_bytes(file_size):
+    """업로드 파일 로드 중 최대 메모리 사용량 추정"""
+    return int(file_size * XLSX_EXPANSION_FACTOR)
+
+
+def estimate_analysis_bytes(df, analysis, columns):
+    """분석 하나의 추가 메모리 사용량 추정 (원본 데이터 제외)
+
+    Args:
+        analysis: '세율 Risk' 또는 '단가 Risk' 등 분석 이름
+        columns: 분석이 사용하는 컬럼 목록
+    """
+    rows = len(df)
+    subset_bytes = estimate_frame_bytes(df, columns)
+    if analysis == '단가 Risk':
+        # df.copy() 전체 복사 + 숫자 변환 + groupby 집계 버퍼
+        return estimate_frame_bytes(df) + rows * 8 * 4 + subset_bytes
+    if analysis == '세율 Risk':
+        # 규격1/세번부호 해시 + 대상 행 부분 복사(최악: 전체) + 숫자 변환 임시값
+        return rows * 16 * 2 + int(subset_bytes * 1.5)
+    return subset_bytes
+
+
+def plan_execution(df, analysis_columns, budget_mb=None):
+    """분석별 실행 방식(in_memory/chunked) 결정
+
+    Args:
+        analysis_columns: {분석 이름: 사용 컬럼 목록}
+        budget_mb: 메모리 예산 (None이면 resolve_memory_budget_mb)
+
+    Returns:
+        {
+            'budget_mb', 'frame_mb', 'headroom_mb',
+            'analyses': {분석 이름: {'mode', 'estimate_mb', 'chunk_rows'}}
+        }
+    """
+    budget_mb = budget_mb or resolve_memory_budget_mb()
+    frame_bytes = estimate_frame_bytes(df)
+    headroom = max(budget_mb * MB - frame_bytes, 0)
+    rows = max(len(df), 1)
+
+    plan = {
+        'budget_mb': round(budget_mb, 1),
+        'frame_mb': round(frame_bytes / MB, 1),
+        'headroom_mb': round(headroom / MB, 1),
+        'analyses': {},
+    }
+    for analysis, columns in analysis_columns.items():
+        estimate = estimate_analysis_bytes(df, analysis, columns)
+        entry = {'mode': 'in_memory', 'estimate_mb': round(estimate / MB, 1), 'chunk_rows': None}
+        if analysis in CHUNKED_ANALYSES and estimate > headroom:
+            # 청크당 작업 메모리가 여유분의 절반 이하가 되도록 청크 크기 결정
+            ratio = (headroom * 0.5) / estimate if estimate else 1
+            entry['mode'] = 'chunked'
+            entry['chunk_rows'] = int(max(MIN_CHUNK_ROWS, min(rows, rows * ratio)))
+        plan['analyses'][analysis] = entry
+    return plan
+
+
+def iter_chunks(df, chunk_rows, columns=None):
+    """행 구간별 부분 데이터프레임 생성 (필요한 컬럼만 복사)"""
+    if columns is not None:
+        positions = [i for i, col in enumerate(df.columns) if col in set(columns)]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk if columns is None else chunk.iloc[:, positions]
+
+
+def _attach_keys(chunk, key, keys, start):
+    """청크에 전체 행 기준 키 배열의 해당 구간을 key 컬럼으로 추가 (keys가 없으면 그대로)"""
+    if keys is None:
+        return chunk
+    return chunk.assign(**{key: keys[start:start + len(chunk)]})
+
+
+def chunked_filter(df, mask_func, columns, chunk_rows):
+    """청크별로 조건에 맞는 행의 지정 컬럼만 모아 결합
+
+    Args:
+        mask_func: 청크 → 행 마스크 함수, 또는 전체 행 마스크 배열
+    """
+    parts = []
+    for start, chunk in zip(range(0, len(df), chunk_rows), iter_chunks(df, chunk_rows)):
+        if callable(mask_func):
+            mask = np.asarray(mask_func(chunk), dtype=bool)
+        else:
+            mask = np.asarray(mask_func[start:start + len(chunk)], dtype=bool)
+        if mask.any():
+            parts.append(chunk.loc[mask, columns].copy())
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts)
+
+
+def chunked_group_nunique(df, key, value, chunk_rows, keys=None):
+    """groupby(key)[value].nunique()의 분할 처리 버전 (keys: key 컬럼 대신 쓸 전체 행 키 배열)"""
+    pairs = None
+    for start, chunk in zip(range(0, len(df), chunk_rows), iter_chunks(df, chunk_rows, [key, value])):
+        chunk = _attach_keys(chunk, key, keys, start)
+        chunk_pairs = chunk.dropna(subset=[value]).drop_duplicates()
+        pairs = chunk_pairs if pairs is None else pd.concat([pairs, chunk_pairs]).drop_duplicates()
+    if pairs is None:
+        return pd.Series(dtype='int64')
+    return pairs.groupby(key)[value].nunique()
+
+
+# 청크 간 병합 가능한 집계 방식
+_MERGE_FUNCS = {'first': 'first', 'min': 'min', 'max': 'max', 'sum': 'sum', 'count': 'sum'}
+_MOMENT_FUNCS = ('mean', 'std')
+
+
+def _partial_aggregate(chunk, key, agg_spec):
+    """청크 하나의 부분 집계 (평균/표준편차는 개수·평균·제곱편차합으로 보관)"""
+    grouped = chunk.groupby(key)
+    parts = {}
+    for col, funcs in agg_spec.items():
+        for func in funcs:
+            if func in _MERGE_FUNCS:
+                parts[(col, func)] = grouped[col].agg(func)
+        if any(func in _MOMENT_FUNCS for func in funcs):
+            n = grouped[col].count()
+            mean = grouped[col].mean()
+            parts[(col, '__n')] = n
+            parts[(col, '__mean')] = mean
+            parts[(col, '__m2')] = grouped[col].var(ddof=0).fillna(0) * n
+    return pd.DataFrame(parts)
+
+
+def _merge_partials(partials, agg_spec):
+    """부분 집계 결합 (Chan 병렬 분산 공식)"""
+    combined = pd.concat(partials)
+
+    def by_group(series):
+        return series.groupby(level=0, sort=True)
+
+    merged = {}
+    for col, funcs in agg_spec.items():
+        for func in funcs:
+            if func in _MERGE_FUNCS:
+                merged[(col, func)] = by_group(combined[(col, func)]).agg(_MERGE_FUNCS[func])
+        if any(func in _MOMENT_FUNCS for func in funcs):
+            n_i = combined[(col, '__n')]
+            mean_i = combined[(col, '__mean')].fillna(0)
+            n = by_group(n_i).sum()
+            mean = by_group(n_i * mean_i).sum() / n.replace(0, np.nan)
+            mean_aligned = mean.reindex(combined.index).fillna(0).to_numpy()
+            spread = n_i * (mean_i - mean_aligned) ** 2
+            m2 = by_group(combined[(col, '__m2')] + spread).sum()
+            merged[(col, '__n')] = n
+            merged[(col, '__mean')] = mean
+            merged[(col, '__m2')] = m2
+    return pd.DataFrame(merged)
+
+
+def chunked_groupby_agg(df, key, agg_spec, chunk_rows, prepare=None, merge_threshold=None, keys=None):
+    """groupby(key).agg(agg_spec).reset_index()의 분할 처리 버전
+
+    Args:
+        agg_spec: {컬럼: 집계함수 또는 목록} (first/min/max/sum/count/mean/std 지원)
+        prepare: 청크 전처리 함수 (숫자 변환, 필터 등)
+        merge_threshold: 누적 부분 집계 행수가 이 값을 넘으면 중간 병합
+        keys: key 컬럼 대신 쓸 전체 행 키 배열 (복합 규격 키 등, prepare 전에 추가)
+
+    Returns:
+        pandas agg 결과와 같은 (컬럼, 함수) MultiIndex 컬럼 구조의 DataFrame
+    """
+    agg_spec = {col: [funcs] if isinstance(funcs, str) else list(funcs) for col, funcs in agg_spec.items()}
+    merge_threshold = merge_threshold or chunk_rows * 4
+    columns = [key] + [col for col in agg_spec if col != key]
+
+    partials, pending_rows = [], 0
+    for start, chunk in zip(range(0, len(df), chunk_rows), iter_chunks(df, chunk_rows, columns)):
+        chunk = _attach_keys(chunk, key, keys, start)
+        if prepare is not None:
+            chunk = prepare(chunk)
+        if len(chunk) == 0:
+            continue
+        partial = _partial_aggregate(chunk, key, agg_spec)
+        partials.append(partial)
+        pending_rows += len(partial)
+        if pending_rows > merge_threshold and len(partials) > 1:
+            partials = [_merge_partials(partials, agg_spec)]
+            pending_rows = len(partials[0])
+
+    if not partials:
+        return pd.DataFrame()
+    merged = _merge_partials(partials, agg_spec) if len(partials) > 1 else partials[0]
+
+    result = {}
+    for col, funcs in agg_spec.items():
+        for func in funcs:
+            if func in _MERGE_FUNCS:
+                result[(col, func)] = merged[(col, func)]
+            elif func == 'mean':
+                result[(col, func)] = merged[(col, '__mean')].where(merged[(col, '__n')] > 0)
+            elif func == 'std':
+                n = merged[(col, '__n')]
+                result[(col, func)] = np.sqrt(merged[(col, '__m2')] / (n - 1)).where(n > 1)
+    result = pd.DataFrame(result)
+    result.index.name = key
+    result.columns = pd.MultiIndex.from_tuples(result.columns)
+    return result.reset_index()
@@ -0,0 +1,219 @@
+"""파이프라인 단계별 성능 계측
+
+각 단계(파일 로드, 규칙 평가, create_* 분석, 리포트 생성)의
+벽시계 시간, CPU 시간, 입력/출력 행수, 최대 메모리 증가량을 기록하고
+구조화된 JSON 로그(한 줄에 한 단계)로 출력합니다.
+
+    - CPU 시간(cpu_s)은 단계를 실행한 스레드의 CPU 시간입니다 (작업 큐의 다른 작업 제외)
+    - 메모리(process_peak_delta_mb)는 프로세스 전체 RSS 기준이므로
+      작업자 스레드가 동시에 실행되면 다른 작업의 사용량이 섞일 수 있습니다
+    - RSS는 프로세스 공용 샘플러 스레드 하나가 실행 중인 단계가 있을 때만 측정합니다
+
+로그 출력:
+    - 로거 이름: import_analysis.perf
+    - 환경변수 PERF_LOG_PATH 지정 시 해당 파일에 JSON Lines로 추가 기록
+"""
+import contextlib
+import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+LOGGER_NAME = 'import_analysis.perf'
+
+# 단계 실행 중 RSS 샘플링 간격 (초)
+RSS_SAMPLE_INTERVAL = 0.02
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_mb():
+    """현재 프로세스 RSS (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        # /proc, psutil 모두 없으면 최대 RSS로 대체
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def get_perf_logger():
+    """성능 로거 (핸들러가 없으면 stderr/PERF_LOG_PATH 핸들러 추가)"""
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        log_path = os.environ.get('PERF_LOG_PATH')
+        if log_path:
+            file_handler = logging.FileHandler(log_path, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(file_handler)
+    return logger
+
+
+class _RssWindow:
+    """단계 하나의 RSS 측정 구간"""
+
+    def __init__(self, start):
+        self.start = start
+        self.peak = start
+
+
+class _RssMonitor:
+    """프로세스 공용 RSS 샘플러 (측정 중인 단계가 있을 때만 샘플링)"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._windows = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def open(self):
+        window = _RssWindow(current_rss_mb())
+        with self._condition:
+            self._windows.add(window)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rss-monitor', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return window
+
+    def close(self, window):
+        with self._condition:
+            self._windows.discard(window)
+        window.peak = max(window.peak, current_rss_mb())
+        return window.peak
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._windows:
+                    self._condition.wait()
+            rss = current_rss_mb()
+            with self._condition:
+                for window in self._windows:
+                    window.peak = max(window.peak, rss)
+            time.sleep(self.interval)
+
+
+_rss_monitor = _RssMonitor()
+
+
+def count_rows(value):
+    """단계 결과의 행수 (DataFrame만 해당)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+class PipelineMetrics:
+    """업로드 한 건의 단계별 성능 기록"""
+
+    def __init__(self, context=None, logger=None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context = dict(context or {})
+        self.records = []
+        self.logger = logger or get_perf_logger()
+
+    @classmethod
+    def from_records(cls, records, run_id, context=None):
+        """저장된 단계 기록으로 복원 (백그라운드 작업 결과 표시용)"""
+        metrics = cls(context)
+        metrics.run_id = run_id
+        metrics.records = list(records)
+        return metrics
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """단계 계측 컨텍스트. yield된 dict에 rows_out 등을 기록할 수 있음"""
+        record = {
+            'stage': name,
+            'rows_in': rows_in,
+            'rows_out': None,
+            'status': 'ok',
+        }
+        window = _rss_monitor.open()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['wall_s'] = round(time.perf_counter() - wall_start, 4)
+            record['cpu_s'] = round(time.thread_time() - cpu_start, 4)
+            rss_peak = _rss_monitor.close(window)
+            record['process_rss_start_mb'] = round(window.start, 1)
+            record['process_peak_delta_mb'] = round(max(0.0, rss_peak - window.start), 1)
+            self.records.append(record)
+            self._emit(record)
+
+    def track(self, name, func, *args, rows_in=None, **kwargs):
+        """함수 실행을 계측하고 결과 반환"""
+        with self.stage(name, rows_in=rows_in) as record:
+            result = func(*args, **kwargs)
+            record['rows_out'] = count_rows(result)
+        return result
+
+    def _emit(self, record):
+        payload = {
+            'event': 'pipeline_stage',
+            'ts': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'run_id': self.run_id,
+            **self.context,
+            **record,
+        }
+        self.logger.info(json.dumps(payload, ensure_ascii=False, default=str))
+
+    def to_frame(self):
+        """UI 표시용 단계별 성능표"""
+        columns = ['stage', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'process_peak_delta_mb', 'status']
+        frame = pd.DataFrame(self.records, columns=columns)
+        frame = frame.rename(columns={
+            'stage': '단계',
+            'wall_s': '경과시간(초)',
+            'cpu_s': 'CPU시간(초, 스레드)',
+            'rows_in': '입력 행수',
+            'rows_out': '출력 행수',
+            'process_peak_delta_mb': '최대 메모리 증가(MB, 프로세스 전체)',
+            'status': '상태',
+        })
+        # 하위 단계('ingest.read_excel' 등)는 상위 단계에 포함되므로 합계에서 제외
+        total_wall = self.total_seconds()
+        frame['비중(%)'] = (frame['경과시간(초)'] / total_wall * 100).round(1) if total_wall > 0 else 0.0
+        return frame
+
+    def total_seconds(self, prefix=None):
+        """최상위 단계(또는 prefix로 시작하는 단계)의 경과시간 합계"""
+        return sum(
+            r['wall_s'] for r in self.records
+            if ('.' not in r['stage'] if prefix is None else r['stage'].startswith(prefix))
+        )
+
+
+@contextlib.contextmanager
+def optional_stage(metrics, name, rows_in=None):
+    """metrics가 None이면 계측 없이 실행"""
+    if metrics is None:
+        yield {}
+    else:
+        with metrics.stage(name, rows_in=rows_in) as record:
+            yield record
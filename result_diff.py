@@ -0,0 +1,211 @@
+"""분석 결과 비교 (이전 결과 대비 신규/해소/변경 Risk)
+
+검토자는 이번 달 세율 Risk / 단가 Risk 결과를 지난달 Excel과 눈으로 비교해 왔습니다.
+분석이 끝날 때마다 두 결과를 스냅샷으로 보관하고, 이전 스냅샷과 업무 키 기준으로 비교합니다.
+
+    - 세율 Risk: 수입신고번호/란번호/행번호 (행 단위), 단가 Risk: 규격1 (규격별 집계,
+      두 결과 모두 복합 규격 키로 묶였으면 규격키)
+    - 키 컬럼을 행별 64비트 해시로 만든 뒤 pd.Index 해시 조회로 한 번에 결합합니다
+      (키 없음 → 신규 / 이전에만 있음 → 해소 / 컬럼 해시가 하나라도 다름 → 변경)
+    - 키와 비교 컬럼은 같은 방식(고유값 문자열 통일)으로 해시하므로 스냅샷마다 dtype이 달라도 같은 값은 같음
+    - 변경 행에는 '변경 컬럼'과 주요 컬럼의 이전 값을 붙입니다
+
+저장 위치: 환경변수 ANALYSIS_SNAPSHOT_DIR (기본: ~/.cache/import_analysis/snapshots),
+같은 파일(내용 해시)은 마지막 결과 하나만, 전체는 최근 SNAPSHOT_LIMIT개만 보관합니다.
+"""
+import datetime
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from spec_key import SPEC_KEY_COLUMN
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'import_analysis', 'snapshots')
+
+# 보관할 스냅샷 수 (월별 비교용으로 2년치)
+SNAPSHOT_LIMIT = 24
+
+# 결과 키 → 표시명, 업무 키 컬럼, 변경 시 이전 값을 함께 보여줄 컬럼
+DIFF_TARGETS = {
+    'tariff_risk': {'label': '세율 Risk', 'keys': ['수입신고번호', '란번호', '행번호'],
+                    'track': ['세번부호', '분류차이점수']},
+    'price_risk': {'label': '단가 Risk', 'keys': ['규격1'],
+                   'track': ['위험도', '단가편차율', '평균단가']},
+}
+
+CHANGE_NEW = '신규'
+CHANGE_RESOLVED = '해소'
+CHANGE_MODIFIED = '변경'
+
+
+def snapshot_dir():
+    return os.environ.get('ANALYSIS_SNAPSHOT_DIR') or DEFAULT_SNAPSHOT_DIR
+
+
+def _atomic_write(path, data, mode='w'):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode, **({'encoding': 'utf-8'} if 'b' not in mode else {})) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(results, run_id, upload=None, directory=None):
+    """비교 대상 결과(DIFF_TARGETS)를 스냅샷으로 저장하고 스냅샷 ID 반환 (대상 결과가 없으면 None)"""
+    frames = {key: results[key] for key in DIFF_TARGETS
+              if results.get(key) is not None and not results[key].empty}
+    if not frames:
+        return None
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    upload = upload or {}
+    snapshot_id = (upload.get('key') or run_id)[:16]
+    meta = {
+        'id': snapshot_id,
+        'run_id': run_id,
+        'file_name': upload.get('file_name'),
+        'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'rows': {DIFF_TARGETS[key]['label']: len(frame) for key, frame in frames.items()},
+    }
+    _atomic_write(os.path.join(directory, f'{snapshot_id}.pkl'), pickle.dumps(frames), 'wb')
+    _atomic_write(os.path.join(directory, f'{snapshot_id}.json'), json.dumps(meta, ensure_ascii=False))
+    for stale in list_snapshots(directory)[SNAPSHOT_LIMIT:]:
+        for extension in ('.pkl', '.json'):
+            try:
+                os.remove(os.path.join(directory, stale['id'] + extension))
+            except OSError:
+                pass
+    return snapshot_id
+
+
+def list_snapshots(directory=None):
+    """저장된 스냅샷 메타데이터 (최근 순)"""
+    directory = directory or snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(snapshots, key=lambda meta: meta['saved_at'], reverse=True)
+
+
+def load_snapshot(snapshot_id, directory=None):
+    """스냅샷 결과 {결과 키: DataFrame}"""
+    with open(os.path.join(directory or snapshot_dir(), f'{snapshot_id}.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+def _value_hashes(values):
+    """컬럼 → 행별 해시 (결측은 0)
+
+    스냅샷마다 같은 컬럼이 숫자/문자로 달리 읽힐 수 있으므로(란번호, 세번부호 등)
+    고유값만 문자열로 통일해 해시합니다 (숫자로 읽힌 12.0은 '12', 앞뒤 공백 제거).
+    """
+    codes, uniques = pd.factorize(values)
+    series = pd.Series(uniques, dtype=object)
+    text = series.astype(str)
+    is_float = np.fromiter((isinstance(v, (float, np.floating)) for v in series), dtype=bool, count=len(series))
+    if is_float.any():
+        text = text.where(~is_float, text.str.replace(r'\.0$', '', regex=True))
+    hashed = pd.util.hash_array(text.str.strip().to_numpy(dtype=object), categorize=False)
+    return np.where(codes >= 0, hashed[np.maximum(codes, 0)], np.uint64(0))
+
+
+def key_hashes(frame, keys):
+    """업무 키 컬럼 → 행별 해시 (컬럼 값은 _value_hashes로 정규화)"""
+    columns = {col: _value_hashes(frame[col]) for col in keys}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def _column_hashes(frame, columns):
+    """컬럼별 정규화 해시 행렬 (행 × 컬럼)"""
+    if not columns:
+        return np.zeros((len(frame), 0), dtype='uint64')
+    return np.column_stack([_value_hashes(frame[col]) for col in columns])
+
+
+def diff_frames(previous, current, keys, track=()):
+    """두 결과의 업무 키 기준 비교
+
+    Returns:
+        '변경구분'(신규/해소/변경) + 결과 컬럼(해소는 이전 행, 나머지는 이번 행)
+        + '변경 컬럼' + 추적 컬럼의 '이전 <컬럼>'
+    """
+    previous = previous.reset_index(drop=True)
+    current = current.reset_index(drop=True)
+    compare = [col for col in current.columns if col in previous.columns and col not in keys]
+    tracked = [col for col in track if col in compare]
+
+    # 같은 키가 여러 번 나오면 첫 행 기준
+    prev_keys = key_hashes(previous, keys)
+    cur_keys = key_hashes(current, keys)
+    prev_unique = ~pd.Series(prev_keys).duplicated().to_numpy()
+    cur_unique = ~pd.Series(cur_keys).duplicated().to_numpy()
+    prev_index = pd.Index(prev_keys[prev_unique])
+    prev_rows = np.flatnonzero(prev_unique)
+
+    matched = prev_index.get_indexer(cur_keys)
+    new_rows = np.flatnonzero(cur_unique & (matched < 0))
+    resolved_rows = prev_rows[~prev_index.isin(cur_keys)]
+    both_cur = np.flatnonzero(cur_unique & (matched >= 0))
+    both_prev = prev_rows[matched[both_cur]]
+
+    # 컬럼별 정규화 해시를 비교해 하나라도 다르면 변경 (숫자/문자로 달리 읽힌 같은 값은 같음)
+    differs = (_column_hashes(current, compare)[both_cur]
+               != _column_hashes(previous, compare)[both_prev])
+    changed = differs.any(axis=1)
+    changed_cur, changed_prev = both_cur[changed], both_prev[changed]
+    changed_columns = [', '.join(np.asarray(compare, dtype=object)[row]) for row in differs[changed]]
+
+    modified = current.loc[changed_cur].assign(**{'변경 컬럼': changed_columns})
+    for col in tracked:
+        modified[f'이전 {col}'] = previous.loc[changed_prev, col].to_numpy(dtype=object)
+    parts = [
+        current.loc[new_rows].assign(변경구분=CHANGE_NEW),
+        previous.loc[resolved_rows].assign(변경구분=CHANGE_RESOLVED),
+        modified.assign(변경구분=CHANGE_MODIFIED),
+    ]
+    columns = ['변경구분', *current.columns, '변경 컬럼', *[f'이전 {col}' for col in tracked]]
+    return pd.concat(parts, ignore_index=True).reindex(columns=columns)
+
+
+def diff_results(previous_frames, results):
+    """이전 스냅샷과 이번 결과 비교
+
+    Returns:
+        ({표시명: 변경분 DataFrame}, 표시명별 신규/해소/변경 건수 요약표)
+    """
+    diffs = {}
+    rows = []
+    for key, target in DIFF_TARGETS.items():
+        previous = previous_frames.get(key)
+        current = results.get(key)
+        previous = previous if previous is not None else pd.DataFrame()
+        current = current if current is not None else pd.DataFrame()
+        if previous.empty and current.empty:
+            continue
+        if previous.empty or current.empty:
+            frame = current if not current.empty else previous
+            change = CHANGE_NEW if not current.empty else CHANGE_RESOLVED
+            diff = frame.assign(변경구분=change).reindex(columns=['변경구분', *frame.columns])
+        else:
+            keys = target['keys']
+            if key == 'price_risk' and SPEC_KEY_COLUMN in current.columns and SPEC_KEY_COLUMN in previous.columns:
+                keys = [SPEC_KEY_COLUMN]
+            if not all(col in current.columns and col in previous.columns for col in keys):
+                continue
+            diff = diff_frames(previous, current, keys, target['track'])
+        diffs[target['label']] = diff
+        counts = diff['변경구분'].value_counts()
+        rows.append({'결과': target['label'], **{change: int(counts.get(change, 0))
+                                                for change in (CHANGE_NEW, CHANGE_RESOLVED, CHANGE_MODIFIED)}})
+    summary = pd.DataFrame(rows, columns=['결과', CHANGE_NEW, CHANGE_RESOLVED, CHANGE_MODIFIED])
+    return diffs, summary
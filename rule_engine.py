@@ -0,0 +1,350 @@
+"""선언형 Risk 규칙 엔진
+
+JSON/YAML로 정의한 규칙을 NumPy 불리언 마스크 연산으로 컴파일합니다.
+규칙이 참조하는 컬럼은 업로드당 한 번만 변환(숫자형 변환 / 문자열 factorize)되고,
+모든 규칙이 이 공유 컬럼 뷰를 재사용하므로 규칙 수가 늘어나도 전체 스캔은 한 번입니다.
+
+규칙 형식 예시:
+    {
+      "rules": {
+        "eight_percent": {
+          "label": "8% 환급 검토",
+          "all": [
+            {"column": "세율구분", "op": "eq", "value": "A"},
+            {"column": "관세실행세율", "op": "ge", "value": 8}
+          ]
+        }
+      }
+    }
+
+조합자: all, any, not, rule(다른 규칙 참조)
+연산자: eq, ne, lt, le, gt, ge, in, not_in, regex, startswith, len_eq, len_ne, isnull, notnull
+
+문자열 연산자는 str(값)을 그대로 비교합니다 (pandas astype(str) 비교와 동일).
+앞뒤 공백을 제거한 값으로 비교하려면 조건에 "strip": true를 지정합니다.
+"""
+import functools
+import json
+import os
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except ImportError:  # YAML 규칙 파일은 PyYAML이 설치된 경우에만 지원
+    yaml = None
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'rules', 'default_rules.json'
+)
+
+# 숫자 비교 연산자
+NUMERIC_OPS = {
+    'lt': np.less,
+    'le': np.less_equal,
+    'gt': np.greater,
+    'ge': np.greater_equal,
+}
+
+# 문자열(고유값 단위로 평가) 연산자
+STRING_OPS = ('eq', 'ne', 'in', 'not_in', 'regex', 'startswith', 'len_eq', 'len_ne')
+
+NULL_OPS = ('isnull', 'notnull')
+
+COMBINATORS = ('all', 'any', 'not', 'rule')
+
+
+class RuleError(ValueError):
+    """규칙 정의 오류"""
+
+
+def parse_rule_set(text, fmt='json'):
+    """규칙 텍스트(JSON/YAML)를 읽어 컴파일된 규칙 집합 반환"""
+    if fmt in ('yaml', 'yml'):
+        if yaml is None:
+            raise RuleError("YAML 규칙 파일을 읽으려면 PyYAML 패키지가 필요합니다.")
+        config = yaml.safe_load(text)
+    else:
+        config = json.loads(text)
+    return compile_rule_set(config)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_rule_set_cached(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    return parse_rule_set(text, fmt)
+
+
+def load_rule_set(path=None):
+    """규칙 파일 로드 (기본: rules/default_rules.json, 환경변수 RISK_RULES_PATH로 변경 가능)"""
+    path = path or os.environ.get('RISK_RULES_PATH') or DEFAULT_RULES_PATH
+    return _load_rule_set_cached(os.path.abspath(path), os.path.getmtime(path))
+
+
+def compile_rule_set(config):
+    """규칙 정의(dict)를 마스크 함수 집합으로 컴파일"""
+    if not isinstance(config, dict) or not isinstance(config.get('rules'), dict):
+        raise RuleError("규칙 파일에 'rules' 항목이 없습니다.")
+
+    definitions = config['rules']
+    compiled = {}
+    columns = set()
+
+    def compile_rule(name, stack=()):
+        if name in compiled:
+            return compiled[name]
+        if name not in definitions:
+            raise RuleError(f"정의되지 않은 규칙 참조: {name}")
+        if name in stack:
+            raise RuleError(f"순환 규칙 참조: {' -> '.join(stack + (name,))}")
+        compiled[name] = _compile_node(definitions[name], name, stack + (name,), compile_rule, columns)
+        return compiled[name]
+
+    for name in definitions:
+        compile_rule(name)
+
+    price_levels = config.get('price_risk_levels')
+    if price_levels is not None:
+        for level in price_levels.get('levels', []):
+            if 'label' not in level or 'gt' not in level:
+                raise RuleError("price_risk_levels.levels 항목에는 label과 gt가 필요합니다.")
+
+    return {
+        'config': config,
+        'rules': compiled,
+        'labels': {name: definitions[name].get('label', name) for name in definitions},
+        'columns': sorted(columns),
+        'price_risk_levels': price_levels,
+    }
+
+
+def _compile_node(node, rule_name, stack, compile_rule, columns):
+    """규칙 노드 하나를 ctx -> mask 함수로 변환"""
+    if not isinstance(node, dict):
+        raise RuleError(f"[{rule_name}] 규칙 노드는 객체여야 합니다: {node!r}")
+
+    if 'all' in node or 'any' in node:
+        key = 'all' if 'all' in node else 'any'
+        children = [_compile_node(child, rule_name, stack, compile_rule, columns) for child in node[key]]
+        if not children:
+            raise RuleError(f"[{rule_name}] '{key}' 항목이 비어 있습니다.")
+        reducer = np.logical_and if key == 'all' else np.logical_or
+
+        def combine(ctx):
+            mask = children[0](ctx)
+            for child in children[1:]:
+                mask = reducer(mask, child(ctx))
+            return mask
+        return combine
+
+    if 'not' in node:
+        child = _compile_node(node['not'], rule_name, stack, compile_rule, columns)
+        return lambda ctx: ~child(ctx)
+
+    if 'rule' in node:
+        ref_name = node['rule']
+        ref = compile_rule(ref_name, stack)
+
+        def reference(ctx):
+            if ref_name not in ctx['rules']:
+                ctx['rules'][ref_name] = ref(ctx)
+            return ctx['rules'][ref_name]
+        return reference
+
+    column = node.get('column')
+    op = node.get('op')
+    if column is None or op is None:
+        raise RuleError(f"[{rule_name}] column/op 가 필요합니다: {node!r}")
+    columns.add(column)
+    value = node.get('value')
+    strip = bool(node.get('strip', False))
+    atom_key = (column, op, json.dumps(value, sort_keys=True, ensure_ascii=False), strip)
+
+    if op in NUMERIC_OPS or (op in ('eq', 'ne') and isinstance(value, (int, float)) and not isinstance(value, bool)):
+        evaluate = _numeric_atom(column, op, value, rule_name)
+    elif op in STRING_OPS:
+        evaluate = _string_atom(column, op, value, rule_name, strip)
+    elif op in NULL_OPS:
+        evaluate = _null_atom(column, op)
+    else:
+        raise RuleError(f"[{rule_name}] 지원하지 않는 연산자: {op}")
+
+    def atom(ctx):
+        # 동일한 (컬럼, 연산자, 값) 조건은 규칙 간에 한 번만 계산
+        if atom_key not in ctx['atoms']:
+            ctx['atoms'][atom_key] = evaluate(ctx)
+        return ctx['atoms'][atom_key]
+    return atom
+
+
+def _numeric_atom(column, op, value, rule_name):
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        raise RuleError(f"[{rule_name}] {column} {op} 비교값은 숫자여야 합니다: {value!r}")
+
+    if op == 'eq':
+        return lambda ctx: numeric_view(ctx, column) == threshold
+    if op == 'ne':
+        return lambda ctx: numeric_view(ctx, column) != threshold
+    ufunc = NUMERIC_OPS[op]
+    # NaN 비교는 항상 False (pandas 비교 연산과 동일)
+    return lambda ctx: ufunc(numeric_view(ctx, column), threshold)
+
+
+def _string_atom(column, op, value, rule_name, strip=False):
+    normalize = str.strip if strip else str
+    if op in ('in', 'not_in'):
+        if not isinstance(value, list):
+            raise RuleError(f"[{rule_name}] {op} 연산자의 값은 목록이어야 합니다.")
+        allowed = {normalize(str(v)) for v in value}
+        test = (lambda s: s in allowed) if op == 'in' else (lambda s: s not in allowed)
+    elif op == 'regex':
+        try:
+            pattern = re.compile(str(value))
+        except re.error as e:
+            raise RuleError(f"[{rule_name}] 잘못된 정규식 {value!r}: {e}")
+        test = lambda s: pattern.match(s) is not None
+    elif op == 'startswith':
+        prefix = str(value)
+        test = lambda s: s.startswith(prefix)
+    elif op in ('len_eq', 'len_ne'):
+        length = int(value)
+        test = (lambda s: len(s) == length) if op == 'len_eq' else (lambda s: len(s) != length)
+    else:
+        target = normalize(str(value))
+        test = (lambda s: s == target) if op == 'eq' else (lambda s: s != target)
+    predicate = (lambda s: test(s.strip())) if strip else test
+
+    def evaluate(ctx):
+        # 고유값에 대해서만 조건을 평가한 뒤 코드 배열로 펼침
+        codes, labels = string_view(ctx, column)
+        unique_mask = np.fromiter((predicate(s) for s in labels), dtype=bool, count=len(labels))
+        return unique_mask[codes]
+    return evaluate
+
+
+def _null_atom(column, op):
+    def evaluate(ctx):
+        codes, _ = string_view(ctx, column)
+        is_null = codes == ctx['null_code'][column]
+        return is_null if op == 'isnull' else ~is_null
+    return evaluate
+
+
+def _new_context(df):
+    return {'df': df, 'numeric': {}, 'string': {}, 'null_code': {}, 'atoms': {}, 'rules': {}}
+
+
+def numeric_view(ctx, column):
+    """컬럼의 float64 배열 (업로드당 한 번 변환)"""
+    if column not in ctx['numeric']:
+        df = ctx['df']
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            values = np.full(len(df), np.nan)
+        ctx['numeric'][column] = values
+    return ctx['numeric'][column]
+
+
+def string_view(ctx, column):
+    """컬럼의 (코드 배열, 고유값의 str 문자열) 쌍 (업로드당 한 번 factorize)"""
+    if column not in ctx['string']:
+        df = ctx['df']
+        if column in df.columns:
+            codes, uniques = pd.factorize(df[column])
+            labels = pd.Index(uniques).astype(str).tolist()
+        else:
+            codes, labels = np.full(len(df), -1, dtype=np.intp), []
+        # 결측값은 astype(str) 결과와 동일하게 'nan'으로 취급
+        null_code = len(labels)
+        labels.append('nan')
+        codes = np.where(codes < 0, null_code, codes)
+        ctx['string'][column] = (codes, labels)
+        ctx['null_code'][column] = null_code
+    return ctx['string'][column]
+
+
+class RuleMasks(dict):
+    """evaluate_rules 결과 {규칙 이름: bool ndarray} + 계산에 사용한 데이터프레임 (약한 참조)"""
+
+    def __init__(self, df, masks=()):
+        super().__init__(masks)
+        self._frame = weakref.ref(df)
+
+    def computed_for(self, df):
+        """df로 계산한 마스크인지 (길이가 같은 다른 데이터프레임은 False)"""
+        return self._frame() is df
+
+
+def evaluate_rules(df, rule_set=None, names=None):
+    """규칙 마스크 계산
+
+    Args:
+        df: 분석 대상 데이터프레임
+        rule_set: compile_rule_set 결과 (None이면 기본 규칙)
+        names: 계산할 규칙 이름 목록 (None이면 전체)
+
+    Returns:
+        RuleMasks {규칙 이름: bool ndarray}
+    """
+    rule_set = rule_set or load_rule_set()
+    names = list(rule_set['rules']) if names is None else names
+    ctx = _new_context(df)
+    masks = RuleMasks(df)
+    for name in names:
+        if name not in rule_set['rules']:
+            raise RuleError(f"정의되지 않은 규칙: {name}")
+        if name not in ctx['rules']:
+            ctx['rules'][name] = rule_set['rules'][name](ctx)
+        masks[name] = ctx['rules'][name]
+    return masks
+
+
+def rule_mask(df, name, rule_masks=None, rule_set=None):
+    """같은 df로 미리 계산된 마스크(evaluate_rules 결과)가 있으면 재사용하고, 없으면 해당 규칙만 계산"""
+    if isinstance(rule_masks, RuleMasks) and name in rule_masks and rule_masks.computed_for(df):
+        return rule_masks[name]
+    return evaluate_rules(df, rule_set, [name])[name]
+
+
+def classify_price_risk(deviation, mean_price, rule_set=None):
+    """단가편차율 구간별 위험도 분류 (price_risk_levels 설정 사용)"""
+    rule_set = rule_set or load_rule_set()
+    levels_config = rule_set.get('price_risk_levels') or {}
+    levels = levels_config.get('levels', [])
+
+    deviation = np.asarray(deviation, dtype='float64')
+    conditions = [np.asarray(mean_price) == 0]
+    choices = [levels_config.get('zero_mean_label', '확인필요')]
+    for level in levels:
+        conditions.append(deviation > float(level['gt']))
+        choices.append(level['label'])
+    return np.select(conditions, choices, default=levels_config.get('default', '낮음'))
+
+
+def summarize_rule_matches(df, rule_masks, rule_set=None, key_column='수입신고번호', count_keys=None):
+    """규칙별 해당 행수 및 신고건수 요약표
+
+    Args:
+        count_keys: count_keys(마스크) → 신고건수 (없으면 key_column의 nunique)
+    """
+    rule_set = rule_set or load_rule_set()
+    keys = df[key_column] if key_column in df.columns else None
+    if count_keys is None:
+        count_keys = (lambda mask: keys[mask].nunique()) if keys is not None else (lambda mask: mask.sum())
+    rows = []
+    for name, mask in rule_masks.items():
+        rows.append({
+            '규칙': name,
+            '설명': rule_set['labels'].get(name, name),
+            '해당 행수': int(mask.sum()),
+            '신고건수': int(count_keys(mask)),
+        })
+    return pd.DataFrame(rows, columns=['규칙', '설명', '해당 행수', '신고건수'])
@@ -0,0 +1,299 @@
+"""대용량 업로드의 빠른 표본 추정 (전체 로드 전 미리보기)
+
+수십만 행 파일은 read_excel_file과 분석이 끝날 때까지 몇 분을 기다려야 결과를 볼 수 있습니다.
+여기서는 시트 XML을 한 번 훑으면서 수입신고번호/세율구분/거래구분 셀만 모든 행에서 읽고,
+세율구분 × 거래구분 층별로 신고번호 해시가 가장 작은 k개 신고의 행만 전체 컬럼을 해석합니다.
+
+    - 층별 bottom-k 표본: 신고번호 해시 u가 층 임계값 τ(k+1번째로 작은 해시, 신고가 k개 이하면 1)보다
+      작은 신고를 뽑으므로 작은 층은 전수, 큰 층은 약 k개 신고가 뽑히고 신고의 행은 함께 뽑힙니다
+    - 같은 규칙(evaluate_rules)을 표본에 적용해 0%/8% 신고 건수를 Horvitz-Thompson 방식으로 추정합니다
+      (신고의 포함확률 = 해당 행이 속한 층 임계값 중 최대값)
+    - 세율 Risk는 표본에서 이미 세번부호가 갈라진 규격1(확정 하한), 단가 Risk는 표본 규격의 위험도 분포
+      (규격1별 전체 행 수도 세어 표본 단가 범위를 전체 행 수 기준 기대 범위로 보정)
+
+행 수와 층별 행 수는 전체를 센 정확한 값이고, 나머지는 95% 신뢰구간과 함께 표시합니다.
+"""
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from rule_engine import classify_price_risk, evaluate_rules, rule_mask
+from schema_registry import lookup_layout
+from workbook_ingest import discover_sheets, needs_workbook_read
+from xlsx_reader import scan_xlsx_rows
+
+DECLARATION_COLUMN = '수입신고번호'
+STRATA_COLUMNS = ['세율구분', '거래구분']
+SPEC_COLUMN = '규격1'
+
+# 층별 표본 신고 수
+SAMPLE_DECLARATIONS_PER_STRATUM = 200
+
+# 단가 변동계수 축소 추정에서 전체 변동계수의 가중치 (표본 자유도 단위)
+PRICE_PRIOR_WEIGHT = 4
+
+# 95% 신뢰구간
+CONFIDENCE_Z = 1.96
+
+# 이보다 작은 파일은 전체 로드가 빠르므로 표본 추정을 건너뜀
+SAMPLE_PREVIEW_MIN_BYTES = 5 << 20
+
+# 세율/단가 Risk 추정에 필요한 컬럼 (규칙이 참조하는 컬럼은 별도 추가)
+PREVIEW_COLUMNS = ['수입신고번호', '세율구분', '거래구분', '관세실행세율', '세번부호', '규격1', '단가']
+
+# read_excel_file과 같은 위치 매핑 (0부터 시작하는 컬럼 위치)
+POSITIONAL_COLUMNS = {'세율구분': 70, '관세실행세율': 71}
+
+
+def _unit_hash(values):
+    """값 → [0, 1) 균등 해시"""
+    hashed = pd.util.hash_array(np.asarray(values, dtype=object))
+    return (hashed >> np.uint64(11)).astype('float64') * 2.0 ** -53
+
+
+def preview_column_positions(headers, layout=None):
+    """미리보기에 필요한 컬럼명 → 컬럼 위치 (등록된 배치가 있으면 그 컬럼명 사용)"""
+    if layout is not None:
+        names = {}
+        for column in layout['columns']:
+            names.setdefault(column['name'], column['position'])
+        return names
+    names = {}
+    for position, header in enumerate(headers):
+        names.setdefault(str(header).strip(), position)
+    for name, position in POSITIONAL_COLUMNS.items():
+        if name not in names and len(headers) > position and str(headers[position]).strip() not in POSITIONAL_COLUMNS:
+            names[name] = position
+    return names
+
+
+class StratifiedDeclarationSampler:
+    """층별 bottom-k 신고 표본 추출기 (scan_xlsx_rows의 select로 사용)
+
+    스트리밍 중 층 임계값은 줄어들기만 하므로 후보 행을 모아 두고 finalize에서 최종 임계값으로 거릅니다.
+    """
+
+    def __init__(self, per_stratum=SAMPLE_DECLARATIONS_PER_STRATUM):
+        self.per_stratum = per_stratum
+        self.strata = {}      # (세율구분, 거래구분) → 층 ID
+        self.smallest = []    # 층 ID → 가장 작은 고유 해시 (최대 k+1개, 오름차순)
+        self.row_counts = []  # 층 ID → 전체 행 수
+        self._candidates = []
+
+    def _threshold(self, stratum):
+        smallest = self.smallest[stratum]
+        return smallest[self.per_stratum] if len(smallest) > self.per_stratum else 1.0
+
+    def __call__(self, row_numbers, keys):
+        n = len(row_numbers)
+        blank = np.full(n, '', dtype=object)
+        hashes = _unit_hash(keys.get(DECLARATION_COLUMN, blank))
+        rate_codes, rate_values = pd.factorize(pd.Series(keys.get(STRATA_COLUMNS[0], blank), dtype=object))
+        trade_codes, trade_values = pd.factorize(pd.Series(keys.get(STRATA_COLUMNS[1], blank), dtype=object))
+        local = rate_codes.astype('int64') * max(len(trade_values), 1) + trade_codes
+
+        strata = np.empty(n, dtype='int64')
+        thresholds = np.empty(n)
+        for code in np.unique(local):
+            rows = local == code
+            label = (rate_values[code // max(len(trade_values), 1)], trade_values[code % max(len(trade_values), 1)])
+            stratum = self.strata.get(label)
+            if stratum is None:
+                stratum = self.strata[label] = len(self.smallest)
+                self.smallest.append(np.array([]))
+                self.row_counts.append(0)
+            self.row_counts[stratum] += int(rows.sum())
+            self.smallest[stratum] = np.union1d(self.smallest[stratum], hashes[rows])[:self.per_stratum + 1]
+            strata[rows] = stratum
+            thresholds[rows] = self._threshold(stratum)
+
+        chosen = hashes < thresholds
+        self._candidates.append((row_numbers[chosen], strata[chosen], hashes[chosen]))
+        return chosen
+
+    def finalize(self):
+        """최종 표본 (엑셀 행번호, 층 ID, 포함확률) 및 층별 요약표"""
+        thresholds = np.array([self._threshold(s) for s in range(len(self.smallest))])
+        if self._candidates:
+            rows, strata, hashes = (np.concatenate(field) for field in zip(*self._candidates))
+        else:
+            rows, strata, hashes = np.array([], dtype='int64'), np.array([], dtype='int64'), np.array([])
+        keep = hashes < thresholds[strata]
+        labels = sorted(self.strata, key=self.strata.get)
+        table = pd.DataFrame({
+            '세율구분': [label[0] for label in labels],
+            '거래구분': [label[1] for label in labels],
+            '행수': self.row_counts,
+            '표본 행수': np.bincount(strata[keep], minlength=len(labels)) if len(labels) else [],
+            '포함확률': np.round(thresholds, 4),
+        })
+        return rows[keep], strata[keep], thresholds[strata[keep]], table
+
+
+def estimate_declarations(decl_values, probabilities, mask=None, z=CONFIDENCE_Z):
+    """표본 행의 신고별 포함확률로 (조건에 맞는) 신고 건수 추정
+
+    Returns:
+        (추정값, 하한, 상한, 표본 신고 수)
+    """
+    decl = pd.Series(decl_values, dtype=object)
+    probabilities = np.asarray(probabilities, dtype='float64')
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+        decl, probabilities = decl[mask], probabilities[mask]
+    if len(decl) == 0:
+        return 0.0, 0.0, 0.0, 0
+    # 신고가 여러 층에 걸치면 가장 큰 임계값의 층에서 뽑힌 것으로 봄
+    pi = pd.Series(probabilities, index=decl.to_numpy()).groupby(level=0, sort=False).max().to_numpy()
+    estimate = float(np.sum(1 / pi))
+    half = z * float(np.sqrt(np.sum((1 - pi) / pi ** 2)))
+    return estimate, max(float(len(pi)), estimate - half), estimate + half, len(pi)
+
+
+def wilson_interval(successes, n, z=CONFIDENCE_Z):
+    """비율의 Wilson 신뢰구간"""
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _prepare_sample(sample):
+    if '세율구분' not in sample.columns:
+        sample['세율구분'] = 'A'
+    if '관세실행세율' not in sample.columns:
+        sample['관세실행세율'] = 0
+    sample['관세실행세율'] = pd.to_numeric(
+        sample['관세실행세율'].astype(str).str.replace(',', ''), errors='coerce'
+    ).fillna(0)
+    return sample
+
+
+def _tariff_candidates(sample):
+    if not {'규격1', '세번부호'} <= set(sample.columns):
+        return pd.DataFrame(columns=['규격1', '표본 세번부호 수', '표본 행수'])
+    codes = sample['세번부호'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    table = (sample.assign(세번부호=codes).groupby('규격1')
+             .agg(**{'표본 세번부호 수': ('세번부호', 'nunique'), '표본 행수': ('세번부호', 'size')})
+             .reset_index())
+    table = table[table['표본 세번부호 수'] > 1]
+    return table.sort_values(['표본 세번부호 수', '표본 행수'], ascending=False).reset_index(drop=True)
+
+
+def expected_range_factor(n):
+    """표준정규 n개의 기대 범위(최대-최소) 근사 (Blom 근사, n<2이면 0)"""
+    n = np.asarray(n, dtype='float64')
+    factor = np.zeros(len(n))
+    valid = n >= 2
+    if valid.any():
+        inv_cdf = np.vectorize(NormalDist().inv_cdf)
+        factor[valid] = 2 * inv_cdf((n[valid] - 0.375) / (n[valid] + 0.25))
+    return factor
+
+
+def _price_levels(sample, rule_set, spec_rows, z=CONFIDENCE_Z):
+    """표본 규격의 단가 Risk 위험도 분포
+
+    단가편차율은 (최고-최저)/평균이라 표본 범위는 전체보다 작게 나오므로,
+    규격의 전체 행 수(spec_rows)만큼 뽑았을 때의 기대 범위(변동계수 × 평균 × 기대 범위 계수)로 보정합니다.
+    """
+    columns = ['위험도', '규격수', '비율', '하한', '상한']
+    if not {'규격1', '단가'} <= set(sample.columns):
+        return pd.DataFrame(columns=columns)
+    prices = pd.to_numeric(sample['단가'], errors='coerce')
+    stats = (pd.DataFrame({'규격1': sample['규격1'].astype(str), '단가': prices})[prices > 0]
+             .groupby('규격1')['단가'].agg(['mean', 'max', 'min', 'std', 'count']))
+    # 단가가 1건뿐인 규격은 편차를 알 수 없으므로 제외
+    stats = stats[stats['count'] > 1]
+    if stats.empty:
+        return pd.DataFrame(columns=columns)
+    total = spec_rows.reindex(stats.index).fillna(stats['count']).to_numpy(dtype='float64')
+    mean = stats['mean'].to_numpy()
+    # 규격별 표본이 2~3건이면 분산 추정이 불안정하므로 전체 변동계수 쪽으로 축소
+    dof = stats['count'].to_numpy(dtype='float64') - 1
+    cv2 = (stats['std'].to_numpy() / np.where(mean > 0, mean, 1)) ** 2
+    pooled = float(np.sum(dof * cv2) / np.sum(dof))
+    shrunk = (dof * cv2 + PRICE_PRIOR_WEIGHT * pooled) / (dof + PRICE_PRIOR_WEIGHT)
+    observed = (stats['max'] - stats['min']).to_numpy()
+    projected = np.maximum(observed, np.sqrt(shrunk) * mean * expected_range_factor(total))
+    deviation = np.where(mean > 0, projected / np.where(mean > 0, mean, 1), 0)
+    levels = pd.Series(classify_price_risk(deviation, mean, rule_set)).value_counts()
+    n = int(levels.sum())
+    rows = []
+    for level, count in levels.items():
+        low, high = wilson_interval(int(count), n, z)
+        rows.append({'위험도': level, '규격수': int(count), '비율': round(count / n, 4),
+                     '하한': round(low, 4), '상한': round(high, 4)})
+    return pd.DataFrame(rows, columns=columns)
+
+
+def build_sample_preview(source, rule_set, per_stratum=SAMPLE_DECLARATIONS_PER_STRATUM):
+    """업로드 파일의 층화 표본 추정 (xlsx가 아니거나 수입신고번호 컬럼이 없으면 None)
+
+    데이터 시트가 여럿이거나 첫 시트가 아닌 워크북은 첫 시트만으로는 전체를 대표하지 못하므로 None
+
+    Returns:
+        {
+            'rows': 전체 행 수, 'sample_rows': 표본 행 수, 'seconds': 소요 시간,
+            'estimates': 항목별 추정 신고 건수와 95% 신뢰구간,
+            'strata': 층별 행 수/표본 행 수/포함확률,
+            'tariff_specs': 표본에서 세번부호가 2개 이상인 규격1,
+            'price_levels': 표본 규격의 단가 Risk 위험도 분포,
+        }
+    """
+    started = time.perf_counter()
+    if needs_workbook_read(discover_sheets(source)):
+        return None
+    headers, layout = lookup_layout(source)
+    if not headers:
+        return None
+    positions = preview_column_positions(headers, layout)
+    if DECLARATION_COLUMN not in positions:
+        return None
+
+    needed = [col for col in dict.fromkeys(PREVIEW_COLUMNS + list(rule_set.get('columns', []))) if col in positions]
+    key_columns = [(positions[col], col) for col in [DECLARATION_COLUMN] + STRATA_COLUMNS + [SPEC_COLUMN]
+                   if col in positions]
+    sampler = StratifiedDeclarationSampler(per_stratum)
+    spec_counts = []
+
+    def select(row_numbers, keys):
+        # 단가 편차 보정에 쓸 규격1별 전체 행 수
+        if SPEC_COLUMN in keys:
+            spec_counts.append(pd.Series(keys[SPEC_COLUMN], dtype=object).value_counts())
+        return sampler(row_numbers, keys)
+
+    try:
+        frame = scan_xlsx_rows(source, key_columns, select, [(positions[col], col, 'object') for col in needed])
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    rows, _, probabilities, strata = sampler.finalize()
+
+    sample = _prepare_sample(frame.reindex(rows).reset_index(drop=True))
+    spec_rows = pd.concat(spec_counts).groupby(level=0).sum() if spec_counts else pd.Series(dtype='int64')
+    masks = evaluate_rules(sample, rule_set)
+    decl = sample[DECLARATION_COLUMN].astype(str)
+
+    estimates = []
+    for label, mask in [('전체 신고', None),
+                        ('0% Risk 신고', rule_mask(sample, 'zero_risk', masks, rule_set)),
+                        ('8% 환급 검토 신고', rule_mask(sample, 'eight_percent', masks, rule_set))]:
+        estimate, low, high, sampled = estimate_declarations(decl, probabilities, mask)
+        estimates.append({'항목': label, '추정 건수': round(estimate), '하한': round(low), '상한': round(high),
+                          '표본 신고 수': sampled})
+
+    return {
+        'rows': int(strata['행수'].sum()),
+        'sample_rows': len(sample),
+        'seconds': round(time.perf_counter() - started, 2),
+        'estimates': pd.DataFrame(estimates),
+        'strata': strata,
+        'tariff_specs': _tariff_candidates(sample),
+        'price_levels': _price_levels(sample, rule_set, spec_rows),
+    }
@@ -0,0 +1,164 @@
+"""엑셀 헤더 배치(스키마) 레지스트리
+
+같은 시스템(예: UNI-PASS 내보내기 버전)에서 받은 파일은 헤더 배치가 매번 같지만,
+pd.read_excel은 업로드마다 모든 셀을 파이썬 객체로 만들고 dtype을 추론하며
+read_excel_file은 공백 제거/중복 컬럼명/위치 매핑을 다시 계산합니다.
+
+1행 헤더의 지문(fingerprint)으로 배치를 식별해
+최종 컬럼명/dtype/로드 기록(ingest_notes)을 저장해 두고, 알려진 배치는
+xlsx_reader로 지정 컬럼과 dtype만 바로 읽어 추론 단계를 건너뜁니다.
+
+- 배치는 일반 로드 결과의 앞쪽 VERIFY_ROWS행을 고속 읽기로 다시 읽어 같을 때만 등록합니다
+- 학습된 배치: ANALYSIS_SCHEMA_CACHE (기본: ~/.cache/import_analysis/schemas.json)
+- 고정 배치: ANALYSIS_SCHEMA_LAYOUTS로 지정한 JSON 파일 (같은 지문이면 학습된 배치보다 우선,
+  'usecols'로 읽을 컬럼을 줄일 수 있음)
+- 고속 읽기가 실패하면(xls, 형식이 다른 셀 등) 호출 측은 pd.read_excel로 대체합니다
+"""
+import datetime
+import functools
+import hashlib
+import json
+import os
+import threading
+import zipfile
+
+import pandas as pd
+
+from xlsx_reader import XlsxLayoutError, read_header_row, read_xlsx_columns
+
+DEFAULT_SCHEMA_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'import_analysis', 'schemas.json')
+
+# 배치 등록 전 고속 읽기와 비교하는 앞쪽 행 수
+VERIFY_ROWS = 2000
+
+# 지문 길이 (sha1 16진수 앞부분)
+FINGERPRINT_LENGTH = 16
+
+_LOCK = threading.Lock()
+
+
+def header_fingerprint(headers):
+    """헤더 목록(컬럼 순서 포함)의 지문"""
+    text = '\x1f'.join(str(header).strip() for header in headers)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def _cache_path():
+    return os.environ.get('ANALYSIS_SCHEMA_CACHE') or DEFAULT_SCHEMA_CACHE
+
+
+@functools.lru_cache(maxsize=8)
+def _load_registry_file(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return {layout['fingerprint']: layout for layout in config.get('layouts', [])}
+
+
+def _read_registry(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        return _load_registry_file(os.path.abspath(path), os.path.getmtime(path))
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def load_layouts():
+    """지문 → 배치 (고정 배치가 학습된 배치보다 우선)"""
+    layouts = dict(_read_registry(_cache_path()))
+    layouts.update(_read_registry(os.environ.get('ANALYSIS_SCHEMA_LAYOUTS')))
+    return layouts
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def lookup_layout(source, sheet=None):
+    """업로드 파일(sheet: 시트 XML 경로, 기본 첫 번째 시트)의 (헤더 목록, 등록된 배치)
+
+    xlsx가 아니거나 헤더를 읽을 수 없으면 (None, None), 처음 보는 배치면 (헤더, None)
+    """
+    try:
+        headers = read_header_row(source, sheet)
+    except (zipfile.BadZipFile, XlsxLayoutError, KeyError):
+        headers = None
+    finally:
+        _rewind(source)
+    if not headers:
+        return None, None
+    return headers, load_layouts().get(header_fingerprint(headers))
+
+
+def _layout_columns(layout):
+    usecols = layout.get('usecols')
+    return [(column['position'], column['name'], column['dtype']) for column in layout['columns']
+            if usecols is None or column['name'] in usecols]
+
+
+def read_with_layout(source, layout, sheet=None):
+    """등록된 배치로 고속 읽기 (최종 컬럼명 적용, 실패하면 None)"""
+    try:
+        return read_xlsx_columns(source, _layout_columns(layout), sheet=sheet)
+    except (zipfile.BadZipFile, XlsxLayoutError, KeyError):
+        return None
+    finally:
+        _rewind(source)
+
+
+def register_layout(source, headers, raw_head, final_columns, ingest_notes, name=None):
+    """일반 로드 결과로 배치 등록 (앞쪽 행 검증에 실패하면 등록하지 않고 None)
+
+    Args:
+        headers: read_header_row 결과 (원본 1행)
+        raw_head: pd.read_excel 결과의 앞쪽 VERIFY_ROWS행 (컬럼명/dtype 가공 전)
+        final_columns: 원본 컬럼 위치별 최종 컬럼명 (공백 제거/중복 처리/위치 매핑 후)
+        ingest_notes: read_excel_file의 로드 기록
+    """
+    # 헤더 없는 데이터 컬럼이 있으면 지문으로 배치를 구분할 수 없음
+    if len(final_columns) != raw_head.shape[1] or len(headers) != raw_head.shape[1]:
+        return None
+    dtypes = [str(dtype) for dtype in raw_head.dtypes]
+    try:
+        fast = read_xlsx_columns(source, [(i, column, dtypes[i]) for i, column in enumerate(raw_head.columns)],
+                                 max_rows=len(raw_head))
+        # 앞쪽 행에는 결측이 없어 int64로 읽힐 수 있으므로 값만 비교
+        pd.testing.assert_frame_equal(raw_head.reset_index(drop=True), fast, check_dtype=False)
+    except (AssertionError, zipfile.BadZipFile, XlsxLayoutError, KeyError, ValueError, TypeError):
+        return None
+    finally:
+        _rewind(source)
+
+    fingerprint = header_fingerprint(headers)
+    layout = {
+        'name': name or f'학습된 배치 {fingerprint[:8]}',
+        'fingerprint': fingerprint,
+        'columns': [
+            {'position': i, 'header': str(header), 'name': str(final_columns[i]), 'dtype': dtypes[i]}
+            for i, header in enumerate(headers)
+        ],
+        'usecols': None,
+        'ingest_notes': {
+            'positional': ingest_notes.get('positional', {}),
+            'duplicates': ingest_notes.get('duplicates', []),
+        },
+        'registered_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    try:
+        _save_layout(layout)
+    except OSError:
+        return None
+    return layout
+
+
+def _save_layout(layout):
+    path = _cache_path()
+    with _LOCK:
+        layouts = dict(_read_registry(path))
+        layouts[layout['fingerprint']] = layout
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'layouts': list(layouts.values())}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
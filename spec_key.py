@@ -0,0 +1,81 @@
+"""복합 규격 키 (규격1 + 규격2 + 규격3 + 성분1~3)
+
+세율 Risk / 단가 Risk는 규격1만으로 묶기 때문에, 규격1이 'ASSY'처럼 일반적인 이름이면
+규격2/규격3/성분이 다른 제품이 한 그룹이 되어 거짓 Risk가 생깁니다.
+
+선택한 규격 컬럼을 행별 64비트 해시 하나로 합쳐 정수 컬럼 groupby로 묶습니다.
+    - 컬럼마다 factorize 후 고유값만 정규화/해시하고, 행별로는 정수 배열 연산으로 결합합니다
+    - 정규화: 결측(NaN/None)과 빈 문자열은 같은 값, 앞뒤 공백 제거 및 연속 공백 정리,
+      숫자로 읽힌 12.0은 '12' (문자열 'VER 2.0'은 그대로, 대소문자는 구분 - 규격1 단독 그룹과 같은 기준)
+    - 선택한 컬럼이 모두 비어 있는 행은 키가 없는 행(MISSING_KEY)으로 그룹에서 제외합니다
+"""
+import numpy as np
+import pandas as pd
+
+# 그룹 기준으로 선택할 수 있는 규격 컬럼 (표시 순서)
+SPEC_KEY_COLUMNS = ['규격1', '규격2', '규격3', '성분1', '성분2', '성분3']
+DEFAULT_SPEC_COLUMNS = ['규격1']
+
+# 결과에 추가하는 키 컬럼명 (분석 중에는 해시, 결과에서는 표시용 문자열)
+SPEC_KEY_COLUMN = '규격키'
+SPEC_LABEL_SEPARATOR = ' | '
+
+# 선택한 규격 컬럼이 모두 비어 있는 행의 키
+MISSING_KEY = np.uint64(0)
+
+
+def resolve_spec_columns(columns, available=None):
+    """선택한 규격 컬럼 → SPEC_KEY_COLUMNS 순서의 목록 (없는 컬럼 제외, 비면 규격1)"""
+    chosen = [col for col in SPEC_KEY_COLUMNS
+              if col in (columns or ()) and (available is None or col in available)]
+    return chosen or list(DEFAULT_SPEC_COLUMNS)
+
+
+def is_composite(columns):
+    """규격1 단독이 아닌 복합 키인지"""
+    return list(columns or DEFAULT_SPEC_COLUMNS) != DEFAULT_SPEC_COLUMNS
+
+
+def normalize_spec_values(values):
+    """규격 값 → 비교용 문자열 배열 (결측은 '')"""
+    series = pd.Series(values, dtype=object, copy=False)
+    text = series.astype(str)
+    # 숫자로 읽힌 값만 '12.0' → '12' (문자열 'VER 2.0'은 그대로)
+    is_float = np.fromiter((isinstance(v, (float, np.floating)) for v in series), dtype=bool, count=len(series))
+    if is_float.any():
+        text = text.where(~is_float, text.str.replace(r'\.0$', '', regex=True))
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return text.where(series.notna().to_numpy(), '').to_numpy(dtype=object)
+
+
+def spec_key(frame, columns):
+    """규격 컬럼 → 행별 64비트 키 (uint64 배열, 모두 비어 있으면 MISSING_KEY)"""
+    present = np.zeros(len(frame), dtype=bool)
+    hashed = {}
+    for col in columns:
+        if col not in frame.columns:
+            continue
+        codes, uniques = pd.factorize(frame[col], use_na_sentinel=True)
+        text = normalize_spec_values(uniques)
+        unique_hashes = pd.util.hash_array(np.append(text, ''), categorize=False)
+        # 결측(-1)은 빈 문자열 해시로 (고유값 뒤에 덧붙인 마지막 원소)
+        ids = np.where(codes >= 0, codes, len(text))
+        hashed[col] = unique_hashes[ids]
+        present |= np.append(text != '', False)[ids]
+    if not hashed:
+        return np.full(len(frame), MISSING_KEY, dtype='uint64')
+    keys = pd.util.hash_pandas_object(pd.DataFrame(hashed, copy=False), index=False).to_numpy()
+    # 키가 있는 행이 우연히 MISSING_KEY로 해시되면 1로 옮김 (확률 2^-64)
+    keys = np.where(keys == MISSING_KEY, np.uint64(1), keys)
+    return np.where(present, keys, MISSING_KEY)
+
+
+def spec_label(frame, columns):
+    """규격 컬럼 → 표시용 복합 키 문자열 ('SPEC-1 | SIZE 3 | COMP 2', 결과 행 수만큼만 계산)"""
+    parts = [normalize_spec_values(frame[col]) for col in columns if col in frame.columns]
+    if not parts:
+        return np.full(len(frame), '', dtype=object)
+    label = pd.Series(parts[0], dtype=object)
+    for part in parts[1:]:
+        label = label + SPEC_LABEL_SEPARATOR + pd.Series(part, dtype=object)
+    return label.to_numpy(dtype=object)
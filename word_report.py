@@ -0,0 +1,311 @@
+"""Word 보고서 요약표/차트
+
+분석 결과를 보고서용 요약표(상위 N개, 분포)로 먼저 집계한 뒤 표와 matplotlib 차트로 docx에 기록합니다.
+보고서 작성 단계는 요약표만 사용하므로 원본/분석 결과 행수와 무관하게 일정한 시간이 걸립니다.
+
+- 세율 Risk: 행별관세 합계 기준 상위 규격 (세번부호 충돌, 복합 규격키가 있으면 규격키 기준)
+- 단가 Risk: 위험도별 분포, 단가편차율 상위 규격
+- 8% 환급 검토: 세번부호별 환급 검토 대상 관세액
+
+matplotlib이 설치되어 있지 않으면 차트 없이 표만 기록합니다.
+차트의 한글 표시는 서버에 한글 글꼴(맑은 고딕, 나눔고딕 등)이 설치되어 있어야 합니다.
+"""
+import io
+import warnings
+
+import numpy as np
+import pandas as pd
+from docx.shared import Inches, Pt
+
+from spec_key import SPEC_KEY_COLUMN
+
+# 요약표 상위 항목 수
+REPORT_TOP_N = 10
+
+CHART_DPI = 120
+CHART_WIDTH_INCHES = 6.0
+
+# 한글 표시 가능한 글꼴 후보 (설치된 첫 번째 글꼴 사용)
+KOREAN_FONT_CANDIDATES = ['Malgun Gothic', 'AppleGothic', 'NanumGothic', 'Noto Sans CJK KR', 'Noto Sans KR']
+
+
+def _top_by(frame, column, top_n):
+    return frame.sort_values(column, ascending=False, kind='stable').head(top_n).reset_index(drop=True)
+
+
+def _spec_group_column(frame):
+    """규격 그룹 컬럼: 복합 규격키가 있으면 규격키, 없으면 규격1"""
+    return SPEC_KEY_COLUMN if SPEC_KEY_COLUMN in frame.columns else '규격1'
+
+
+def tariff_conflict_table(tariff_risk_data, top_n=REPORT_TOP_N):
+    """세율 Risk: 규격(규격키 또는 규격1)별 세번부호 수/신고건수/행별관세 합계 상위 N"""
+    if tariff_risk_data is None or tariff_risk_data.empty:
+        return pd.DataFrame()
+    frame = tariff_risk_data
+    group = _spec_group_column(frame)
+    if group not in frame.columns:
+        return pd.DataFrame()
+    duty = pd.to_numeric(frame['행별관세'], errors='coerce').fillna(0) if '행별관세' in frame.columns else 0
+    work = pd.DataFrame({
+        group: frame[group].astype(str),
+        '세번부호': frame['세번부호'].astype(str) if '세번부호' in frame.columns else '',
+        '수입신고번호': frame['수입신고번호'] if '수입신고번호' in frame.columns else np.arange(len(frame)),
+        '행별관세': duty,
+    })
+    grouped = work.groupby(group, sort=False).agg(
+        세번부호수=('세번부호', 'nunique'),
+        신고건수=('수입신고번호', 'nunique'),
+        행별관세합계=('행별관세', 'sum'),
+    ).reset_index()
+    top = _top_by(grouped, '행별관세합계', top_n)
+
+    # 상위 규격의 세번부호 목록 (상위 N개 행만 대상)
+    codes = (work[work[group].isin(top[group])]
+             .drop_duplicates([group, '세번부호'])
+             .groupby(group)['세번부호'].agg(', '.join))
+    top.insert(1, '세번부호 목록', top[group].map(codes))
+    return top
+
+
+def price_distribution_table(price_risk_data):
+    """단가 Risk: 위험도별 규격 수와 평균 단가편차율"""
+    if price_risk_data is None or price_risk_data.empty or '위험도' not in price_risk_data.columns:
+        return pd.DataFrame()
+    deviation = pd.to_numeric(price_risk_data.get('단가편차율'), errors='coerce')
+    counts = pd.to_numeric(price_risk_data.get('데이터수'), errors='coerce')
+    work = pd.DataFrame({
+        '위험도': price_risk_data['위험도'].astype(str),
+        '단가편차율': deviation if deviation is not None else np.nan,
+        '데이터수': counts if counts is not None else np.nan,
+    })
+    table = work.groupby('위험도', sort=False).agg(
+        규격수=('위험도', 'size'),
+        평균단가편차율=('단가편차율', 'mean'),
+        데이터수합계=('데이터수', 'sum'),
+    ).reset_index()
+    # 편차율이 큰 위험도부터 표시
+    table = table.sort_values('평균단가편차율', ascending=False, na_position='last').reset_index(drop=True)
+    table['평균단가편차율'] = (table['평균단가편차율'] * 100).round(1)
+    table = table.rename(columns={'평균단가편차율': '평균 단가편차율(%)'})
+    table['비율(%)'] = (table['규격수'] / table['규격수'].sum() * 100).round(1)
+    return table
+
+
+def price_top_table(price_risk_data, top_n=REPORT_TOP_N):
+    """단가 Risk: 단가편차율 상위 N개 규격 (규격키가 있으면 함께 표시)"""
+    if price_risk_data is None or price_risk_data.empty or '단가편차율' not in price_risk_data.columns:
+        return pd.DataFrame()
+    columns = [col for col in (SPEC_KEY_COLUMN, '규격1', '세번부호', '평균단가', '최저단가', '최고단가', '단가편차율', '위험도')
+               if col in price_risk_data.columns]
+    top = _top_by(price_risk_data[columns], '단가편차율', top_n)
+    top['단가편차율'] = (pd.to_numeric(top['단가편차율'], errors='coerce') * 100).round(1)
+    return top.rename(columns={'단가편차율': '단가편차율(%)'})
+
+
+def refund_by_hs_table(eight_percent_data, top_n=REPORT_TOP_N):
+    """8% 환급 검토: 세번부호별 신고건수/행수/행별관세 합계 상위 N"""
+    if eight_percent_data is None or eight_percent_data.empty or '세번부호' not in eight_percent_data.columns:
+        return pd.DataFrame()
+    frame = eight_percent_data
+    work = pd.DataFrame({
+        '세번부호': frame['세번부호'].astype(str),
+        '수입신고번호': frame['수입신고번호'] if '수입신고번호' in frame.columns else np.arange(len(frame)),
+        '관세실행세율': pd.to_numeric(frame.get('관세실행세율', 0), errors='coerce'),
+        '행별관세': pd.to_numeric(frame.get('행별관세', 0), errors='coerce').fillna(0),
+        'FTA검토': (frame['FTA사후환급 검토'] == 'FTA사후환급 검토') if 'FTA사후환급 검토' in frame.columns else False,
+    })
+    if '예상환급액' in frame.columns:
+        work['예상환급액'] = pd.to_numeric(frame['예상환급액'], errors='coerce').fillna(0)
+    grouped = work.groupby('세번부호', sort=False).agg(
+        신고건수=('수입신고번호', 'nunique'),
+        행수=('세번부호', 'size'),
+        최고세율=('관세실행세율', 'max'),
+        FTA검토행수=('FTA검토', 'sum'),
+        행별관세합계=('행별관세', 'sum'),
+        **({'예상환급액합계': ('예상환급액', 'sum')} if '예상환급액' in work.columns else {}),
+    ).reset_index()
+    return _top_by(grouped, '행별관세합계', top_n)
+
+
+def aggregate_report_tables(eight_percent_data, zero_risk_data, tariff_risk_data, price_risk_data,
+                            summary_data, top_n=REPORT_TOP_N):
+    """Word 보고서용 요약표 집계 (분석 결과별 한 번의 groupby)
+
+    Returns:
+        {'counts', 'risk_overview', 'tariff_conflicts', 'price_distribution', 'price_top', 'refund_by_hs',
+         'refund_total', 'expected_refund_total'}
+    """
+    frames = {
+        '8% 환급 검토': eight_percent_data,
+        '0% Risk': zero_risk_data,
+        '세율 Risk': tariff_risk_data,
+        '단가 Risk': price_risk_data,
+    }
+    counts = {name: 0 if frame is None else len(frame) for name, frame in frames.items()}
+    refund_total = 0.0
+    expected_refund_total = None
+    columns = getattr(eight_percent_data, 'columns', [])
+    if '행별관세' in columns:
+        refund_total = float(pd.to_numeric(eight_percent_data['행별관세'], errors='coerce').fillna(0).sum())
+    if '예상환급액' in columns:
+        expected_refund_total = float(pd.to_numeric(eight_percent_data['예상환급액'], errors='coerce').fillna(0).sum())
+
+    return {
+        'counts': counts,
+        'risk_overview': (summary_data or {}).get('Risk분석', pd.DataFrame()),
+        'tariff_conflicts': tariff_conflict_table(tariff_risk_data, top_n),
+        'price_distribution': price_distribution_table(price_risk_data),
+        'price_top': price_top_table(price_risk_data, top_n),
+        'refund_by_hs': refund_by_hs_table(eight_percent_data, top_n),
+        'refund_total': refund_total,
+        'expected_refund_total': expected_refund_total,
+    }
+
+
+# ---- docx 기록 ----
+def _format_value(value):
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return ''
+        return f'{value:,.0f}' if abs(value) >= 1000 or float(value).is_integer() else f'{value:,.2f}'
+    if isinstance(value, (int, np.integer)):
+        return f'{value:,}'
+    return str(value)
+
+
+def add_table(doc, table, font_size=9):
+    """요약표를 docx 표로 기록"""
+    rows, cols = table.shape
+    docx_table = doc.add_table(rows=rows + 1, cols=cols)
+    docx_table.style = 'Table Grid'
+    values = [[_format_value(v) for v in row] for row in table.itertuples(index=False, name=None)]
+    for j, col in enumerate(table.columns):
+        cell = docx_table.cell(0, j)
+        cell.text = str(col)
+        cell.paragraphs[0].runs[0].bold = True
+    for i, row in enumerate(values, start=1):
+        cells = docx_table.rows[i].cells
+        for j, text in enumerate(row):
+            cells[j].text = text
+    for row in docx_table.rows:
+        for cell in row.cells:
+            for run in cell.paragraphs[0].runs:
+                run.font.size = Pt(font_size)
+    return docx_table
+
+
+_matplotlib = None
+
+
+def _get_matplotlib():
+    """(Figure 클래스, FigureCanvasAgg 클래스, 한글 글꼴 이름 또는 None), matplotlib이 없으면 None
+
+    pyplot/rcParams 전역 상태를 쓰지 않으므로 작업 큐 작업자 스레드에서 동시에 차트를 그려도 안전합니다.
+    """
+    global _matplotlib
+    if _matplotlib is None:
+        try:
+            from matplotlib import font_manager
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+        except ImportError:
+            _matplotlib = False
+            return None
+        installed = {font.name for font in font_manager.fontManager.ttflist}
+        fonts = [name for name in KOREAN_FONT_CANDIDATES if name in installed]
+        # 한글 글꼴이 없는 서버의 글리프 누락 경고 무시 (catch_warnings는 스레드 간에 안전하지 않아 한 번만 등록)
+        warnings.filterwarnings('ignore', message=r'Glyph \d+ .*missing from', category=UserWarning)
+        _matplotlib = (Figure, FigureCanvasAgg, fonts[0] if fonts else None)
+    return _matplotlib or None
+
+
+def bar_chart_png(labels, values, title, xlabel):
+    """가로 막대 차트 PNG (matplotlib이 없으면 None)"""
+    backend = _get_matplotlib()
+    if backend is None or len(labels) == 0:
+        return None
+    Figure, FigureCanvasAgg, font = backend
+    # 한글이 들어가는 텍스트에만 글꼴 지정 (전역 rcParams 변경 없음)
+    text_font = {'fontfamily': font} if font else {}
+    height = max(2.5, 0.35 * len(labels) + 1.2)
+    fig = Figure(figsize=(CHART_WIDTH_INCHES, height), dpi=CHART_DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    positions = np.arange(len(labels))
+    ax.barh(positions, values, color='#4472C4')
+    ax.set_yticks(positions)
+    ax.set_yticklabels([str(label)[:30] for label in labels], fontsize=8, **text_font)
+    ax.invert_yaxis()
+    ax.set_title(title, fontsize=11, **text_font)
+    ax.set_xlabel(xlabel, fontsize=9, **text_font)
+    ax.grid(axis='x', alpha=0.3)
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def add_chart(doc, png):
+    if png:
+        doc.add_picture(io.BytesIO(png), width=Inches(CHART_WIDTH_INCHES))
+
+
+def write_report_sections(doc, tables, summary_data):
+    """요약표/차트 섹션 기록"""
+    counts = tables['counts']
+
+    if summary_data:
+        doc.add_heading('분석 요약', level=1)
+        p = doc.add_paragraph()
+        p.add_run(f"전체 신고 건수: {summary_data.get('전체 신고 건수', 0):,}건").bold = True
+        if not tables['risk_overview'].empty:
+            doc.add_paragraph("Risk 분석 결과:")
+            add_table(doc, tables['risk_overview'])
+
+    if counts['8% 환급 검토']:
+        doc.add_heading('8% 환급 검토', level=1)
+        doc.add_paragraph(
+            f"총 {counts['8% 환급 검토']:,}건의 8% 환급 검토 대상이 발견되었습니다. "
+            f"대상 행별관세 합계는 {tables['refund_total']:,.0f}원입니다."
+        )
+        if tables.get('expected_refund_total') is not None:
+            doc.add_paragraph(
+                f"지정된 FTA 협정세율 표 기준 예상환급액 합계는 {tables['expected_refund_total']:,.0f}원입니다 "
+                "(추정치이며 실제 환급액은 원산지 증빙과 협정 적용 요건에 따라 달라집니다)."
+            )
+        refund = tables['refund_by_hs']
+        if not refund.empty:
+            doc.add_heading(f'세번부호별 환급 검토 관세액 (상위 {len(refund)}개)', level=2)
+            add_table(doc, refund)
+            add_chart(doc, bar_chart_png(refund['세번부호'], refund['행별관세합계'],
+                                         '세번부호별 행별관세 합계', '행별관세 (원)'))
+
+    if counts['0% Risk']:
+        doc.add_heading('0% Risk 분석', level=1)
+        doc.add_paragraph(f"총 {counts['0% Risk']:,}건의 0% Risk가 발견되었습니다.")
+
+    if counts['세율 Risk']:
+        doc.add_heading('세율 Risk 분석', level=1)
+        doc.add_paragraph(f"총 {counts['세율 Risk']:,}건의 세율 Risk가 발견되었습니다.")
+        conflicts = tables['tariff_conflicts']
+        if not conflicts.empty:
+            group = _spec_group_column(conflicts)
+            doc.add_heading(f'행별관세 기준 상위 {group} (상위 {len(conflicts)}개)', level=2)
+            add_table(doc, conflicts)
+            add_chart(doc, bar_chart_png(conflicts[group], conflicts['행별관세합계'],
+                                         f'{group}별 행별관세 합계 (세번부호 충돌)', '행별관세 (원)'))
+
+    if counts['단가 Risk']:
+        doc.add_heading('단가 Risk 분석', level=1)
+        doc.add_paragraph(f"총 {counts['단가 Risk']:,}건의 단가 Risk가 발견되었습니다.")
+        distribution = tables['price_distribution']
+        if not distribution.empty:
+            doc.add_heading('위험도 분포', level=2)
+            add_table(doc, distribution)
+            add_chart(doc, bar_chart_png(distribution['위험도'], distribution['규격수'],
+                                         '위험도별 규격 수', '규격 수'))
+        top = tables['price_top']
+        if not top.empty:
+            doc.add_heading(f'단가편차율 상위 규격1 (상위 {len(top)}개)', level=2)
+            add_table(doc, top)
@@ -0,0 +1,326 @@
+"""여러 시트 워크북 읽기 (시트별 병렬 읽기 후 결합)
+
+pd.read_excel(uploaded_file)은 첫 번째 시트만 읽으므로, 기간을 여러 시트로 나눠 내보냈거나
+신고 헤더 시트와 란/행 시트를 따로 둔 워크북은 나머지 시트가 분석에서 빠집니다.
+
+    - 1행 헤더에 수입신고번호가 있는 (숨기지 않은) 시트를 데이터 시트로 봅니다
+    - 란번호/행번호/규격1/세번부호 중 하나라도 있으면 란 시트, 없으면 신고 헤더 시트이며
+      란 시트가 없으면 모든 데이터 시트를 란 시트로 취급합니다
+    - 시트마다 read_excel_file과 같은 헤더 정리(공백 제거/중복 컬럼명/세율 컬럼 위치 매핑)를 적용하고,
+      등록된 배치(schema_registry)가 있는 시트는 고속 읽기를 사용합니다
+    - 큰 시트는 작업자 프로세스에서 동시에 읽습니다 (작업자 수: 환경변수 INGEST_WORKERS, 기본 CPU 수)
+    - 란 시트는 pd.concat 한 번으로 결합하고(컬럼 합집합, 워크북 순서), 신고 헤더 시트에만 있는 컬럼은
+      수입신고번호 기준으로 란 행에 붙입니다
+
+작업자 프로세스가 이 모듈을 import하므로 streamlit에 의존하지 않습니다.
+"""
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from schema_registry import header_fingerprint, load_layouts, read_with_layout
+from xlsx_reader import XlsxLayoutError, list_sheets, read_header_row
+
+DECLARATION_COLUMN = '수입신고번호'
+
+# 이 중 하나라도 있으면 란(행) 단위 시트
+LINE_COLUMNS = ('란번호', '행번호', '규격1', '세번부호')
+
+ROLE_LINE = '란'
+ROLE_HEADER = '신고 헤더'
+
+# 시트 XML(압축 해제 기준)이 이 크기 이상이면 작업자 프로세스에서 읽기
+PARALLEL_SHEET_MIN_BYTES = 4 << 20
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def dedupe_columns(columns):
+    """중복 컬럼명 → 두 번째부터 '_번호' 접미사 (컬럼 목록, 중복된 컬럼명 수)"""
+    cols = pd.Series(columns)
+    duplicated_cols = cols[cols.duplicated()].unique()
+    for dup in duplicated_cols:
+        # 첫 번째는 그대로 두고, 나머지에 번호 추가
+        for i, idx in enumerate(cols[cols == dup].index.tolist()):
+            if i > 0:
+                cols.iloc[idx] = f"{dup}_{i}"
+    return cols.tolist(), len(duplicated_cols)
+
+
+def map_rate_columns(df, ingest_notes):
+    """세율구분/관세실행세율이 없으면 71/72번째 컬럼을 위치로 매핑 (원본 컬럼명 기록)"""
+    has_rate_type = '세율구분' in df.columns
+    has_tariff_rate = '관세실행세율' in df.columns
+    if has_rate_type and has_tariff_rate:
+        return df
+    column_list = df.columns.tolist()
+    if len(column_list) > 71 and not has_tariff_rate and column_list[71] not in ['세율구분', '관세실행세율']:
+        df.rename(columns={column_list[71]: '관세실행세율'}, inplace=True)
+        ingest_notes['positional']['관세실행세율'] = (72, column_list[71])
+    if len(column_list) > 70 and not has_rate_type and column_list[70] not in ['세율구분', '관세실행세율']:
+        df.rename(columns={column_list[70]: '세율구분'}, inplace=True)
+        ingest_notes['positional']['세율구분'] = (71, column_list[70])
+    return df
+
+
+def normalize_headers(df, raw_columns=None, layout=None):
+    """read_excel_file의 헤더 정리: 공백 제거, 중복 컬럼명 처리, 세율 컬럼 위치 매핑
+
+    Args:
+        raw_columns: 원본 1행 헤더 (없으면 df.columns)
+        layout: 등록된 배치로 읽은 경우 그 배치 (이미 최종 컬럼명이므로 등록 시 기록을 사용)
+
+    Returns:
+        (DataFrame, 로드 기록 ingest_notes, 처리한 중복 컬럼명 수)
+    """
+    raw_columns = [str(col).strip() for col in (raw_columns or df.columns)]
+    df.columns = df.columns.str.strip()  # 컬럼 이름의 공백 제거
+    columns, duplicate_count = dedupe_columns(df.columns)
+    if duplicate_count:
+        df.columns = columns
+
+    # 위치 매핑/기본값/중복 컬럼명 처리 기록 (데이터 품질 검사와 미리보기에서 보고)
+    ingest_notes = {'defaulted': {}, 'positional': {}, 'rate_unparsed': 0, 'duplicates': []}
+    if layout is not None:
+        ingest_notes['positional'].update(
+            {col: tuple(mapping) for col, mapping in layout['ingest_notes'].get('positional', {}).items()}
+        )
+        ingest_notes['duplicates'] = list(layout['ingest_notes'].get('duplicates', []))
+    else:
+        ingest_notes['duplicates'] = [
+            col for raw, col in zip(raw_columns, df.columns) if raw and str(col) != raw
+        ]
+    return map_rate_columns(df, ingest_notes), ingest_notes, duplicate_count
+
+
+def fill_rate_defaults(df, ingest_notes):
+    """매핑 후에도 없는 세율 컬럼은 기본값으로 생성 (세율구분 'A', 관세실행세율 0)"""
+    if '세율구분' not in df.columns:
+        df['세율구분'] = 'A'
+        ingest_notes['defaulted']['세율구분'] = 'A'
+    if '관세실행세율' not in df.columns:
+        df['관세실행세율'] = 0
+        ingest_notes['defaulted']['관세실행세율'] = 0
+    return df
+
+
+def convert_rate_column(df, ingest_notes):
+    """관세실행세율 → 숫자 (변환하지 못한 값은 0, 건수를 rate_unparsed에 기록)"""
+    if '관세실행세율' not in df.columns:
+        return df
+    tariff_col = df['관세실행세율']
+    if pd.api.types.is_numeric_dtype(tariff_col):
+        ingest_notes['rate_unparsed'] = int(tariff_col.isna().sum())
+        df['관세실행세율'] = tariff_col.fillna(0)
+    else:
+        parsed = pd.to_numeric(tariff_col.astype(str).str.replace(',', '').fillna('0'), errors='coerce')
+        ingest_notes['rate_unparsed'] = int(parsed.isna().sum())
+        df['관세실행세율'] = parsed.fillna(0)
+    return df
+
+
+def _xlsx_sheets(source):
+    sheets = []
+    for index, (name, path) in enumerate(list_sheets(source)):
+        _rewind(source)
+        with zipfile.ZipFile(source) as archive:
+            size = archive.getinfo(path).file_size
+        _rewind(source)
+        headers = read_header_row(source, path) or []
+        sheets.append({'name': name, 'path': path, 'index': index, 'bytes': size, 'headers': headers})
+    return sheets
+
+
+def _other_sheets(source):
+    """xls 등: 시트 이름과 헤더만 pd.read_excel(nrows=0)으로 읽기 (고속 읽기/병렬 없음)"""
+    try:
+        workbook = pd.ExcelFile(source)
+        names = workbook.sheet_names
+        headers = [[str(col) for col in workbook.parse(name, nrows=0).columns] for name in names]
+    except Exception:
+        return []
+    return [{'name': name, 'path': None, 'index': index, 'bytes': 0, 'headers': header}
+            for index, (name, header) in enumerate(zip(names, headers))]
+
+
+def discover_sheets(source):
+    """데이터 시트 목록 (워크북 순서)
+
+    Returns:
+        [{'name': 시트 이름, 'path': 시트 XML 경로 (xlsx가 아니면 None), 'index': 시트 순서,
+          'bytes': 시트 XML 크기, 'headers': 1행 헤더, 'role': ROLE_LINE/ROLE_HEADER}]
+    """
+    try:
+        sheets = _xlsx_sheets(source)
+    except (zipfile.BadZipFile, XlsxLayoutError, KeyError):
+        sheets = _other_sheets(source)
+    finally:
+        _rewind(source)
+
+    data = []
+    for sheet in sheets:
+        columns = {str(header).strip() for header in sheet['headers']}
+        if DECLARATION_COLUMN in columns:
+            data.append({**sheet, 'role': ROLE_LINE if columns & set(LINE_COLUMNS) else ROLE_HEADER})
+    if not any(sheet['role'] == ROLE_LINE for sheet in data):
+        for sheet in data:
+            sheet['role'] = ROLE_LINE
+    return data
+
+
+def needs_workbook_read(sheets):
+    """첫 번째 시트만 읽어서는 안 되는 워크북인지 (데이터 시트가 여럿이거나 첫 시트가 아님)"""
+    return len(sheets) > 1 or (len(sheets) == 1 and sheets[0]['index'] > 0)
+
+
+def read_sheet(source, sheet):
+    """시트 하나 읽기 + 헤더 정리 (작업자 프로세스에서도 실행) → (DataFrame, ingest_notes)"""
+    layout = None
+    df = None
+    if sheet['path'] is not None and sheet['headers']:
+        layout = load_layouts().get(header_fingerprint(sheet['headers']))
+        if layout is not None:
+            df = read_with_layout(source, layout, sheet['path'])
+    if df is None:
+        layout = None
+        _rewind(source)
+        df = pd.read_excel(source, sheet_name=sheet['name'])
+        _rewind(source)
+    df, ingest_notes, _ = normalize_headers(df, sheet['headers'] if sheet['path'] is not None else None, layout)
+    return df, ingest_notes
+
+
+def resolve_ingest_workers():
+    """시트 읽기 작업자 프로세스 수"""
+    configured = os.environ.get('INGEST_WORKERS')
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ingest_pool():
+    """프로세스 공용 시트 읽기 풀 (작업자 1개 이하면 None)"""
+    global _pool
+    workers = resolve_ingest_workers()
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Streamlit 서버 스레드와 fork 충돌을 피하기 위해 spawn 사용
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_ingest_pool():
+    """시트 읽기 풀 종료 (다음 호출 시 새로 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+@contextlib.contextmanager
+def _worker_path(source):
+    """작업자 프로세스에 넘길 파일 경로 (업로드 객체는 임시 파일로 기록)"""
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    _rewind(source)
+    data = source.getvalue() if hasattr(source, 'getvalue') else source.read()
+    _rewind(source)
+    with tempfile.TemporaryDirectory(prefix='workbook_ingest_') as work_dir:
+        path = os.path.join(work_dir, 'upload.xlsx')
+        with open(path, 'wb') as f:
+            f.write(data)
+        yield path
+
+
+def read_sheets_parallel(source, sheets, pool=None):
+    """큰 시트는 작업자 프로세스에서, 나머지는 현재 프로세스에서 읽기 (시트 순서의 결과 목록)"""
+    large = [i for i, sheet in enumerate(sheets) if sheet['bytes'] >= PARALLEL_SHEET_MIN_BYTES]
+    if len(large) < 2:
+        return [read_sheet(source, sheet) for sheet in sheets]
+    pool = pool if pool is not None else get_ingest_pool()
+    if pool is None:
+        return [read_sheet(source, sheet) for sheet in sheets]
+    with _worker_path(source) as path:
+        # 큰 시트부터 제출해 작업자 간 부하 균형, 작은 시트는 기다리는 동안 현재 프로세스에서 읽기
+        futures = {i: pool.submit(read_sheet, path, sheets[i])
+                   for i in sorted(large, key=lambda i: -sheets[i]['bytes'])}
+        inline = {i: read_sheet(source, sheet) for i, sheet in enumerate(sheets) if i not in futures}
+        return [futures[i].result() if i in futures else inline[i] for i in range(len(sheets))]
+
+
+def _declaration_keys(values):
+    """수입신고번호 → 비교용 문자열 (시트마다 숫자/문자로 달리 읽힐 수 있음, 결측은 '')"""
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return np.append(text.to_numpy(dtype=object), '')[codes]
+
+
+def combine_sheets(sheets, parts):
+    """시트별 (DataFrame, ingest_notes) → 결합 DataFrame과 통합 ingest_notes
+
+    란 시트는 한 번의 pd.concat으로 잇고(컬럼 합집합), 신고 헤더 시트에만 있는 컬럼은
+    수입신고번호별 첫 행을 란 행에 붙입니다. ingest_notes['sheets']에 시트별 구분/행수를 기록하며,
+    결합 데이터의 행은 란 시트 순서대로 이어지므로 이 행수로 행별 시트와 시트 안의 행번호를 찾습니다
+    (data_quality.excel_locations).
+    """
+    ingest_notes = {'defaulted': {}, 'positional': {}, 'rate_unparsed': 0, 'duplicates': [], 'sheets': []}
+    lines, headers = [], []
+    for sheet, (frame, notes) in zip(sheets, parts):
+        for col, mapping in notes['positional'].items():
+            ingest_notes['positional'].setdefault(col, mapping)
+        ingest_notes['duplicates'] += [col for col in notes['duplicates'] if col not in ingest_notes['duplicates']]
+        ingest_notes['sheets'].append({'시트': sheet['name'], '구분': sheet['role'], '행수': len(frame)})
+        (lines if sheet['role'] == ROLE_LINE else headers).append(frame)
+
+    # 빈 시트는 결합 dtype 추론에서 제외 (모두 비었으면 첫 시트의 컬럼만 유지)
+    lines = [frame for frame in lines if len(frame)] or lines[:1]
+    df = pd.concat(lines, ignore_index=True) if len(lines) > 1 else lines[0].reset_index(drop=True)
+
+    headers = [frame for frame in headers if len(frame)]
+    if headers and DECLARATION_COLUMN in df.columns:
+        header = pd.concat(headers, ignore_index=True)
+        extra = [col for col in header.columns if col not in df.columns]
+        if extra:
+            header_keys = _declaration_keys(header[DECLARATION_COLUMN])
+            first = ~pd.Series(header_keys).duplicated().to_numpy() & (header_keys != '')
+            positions = pd.Index(header_keys[first]).get_indexer(_declaration_keys(df[DECLARATION_COLUMN]))
+            # 헤더가 없는 신고(-1)는 결측 행
+            joined = header.loc[first, extra].reset_index(drop=True).reindex(positions)
+            df = pd.concat([df, joined.set_axis(df.index)], axis=1)
+    return df, ingest_notes
+
+
+def read_workbook(source, sheets, pool=None):
+    """데이터 시트를 모두 읽어 결합 → (DataFrame, ingest_notes)
+
+    세율 컬럼 기본값/숫자 변환은 결합 후 호출 측(read_excel_file)에서 한 번만 적용합니다.
+    """
+    try:
+        parts = read_sheets_parallel(source, sheets, pool)
+    except BrokenProcessPool:
+        # 작업자 프로세스 비정상 종료 시 풀을 재생성하고 현재 프로세스에서 읽기
+        shutdown_ingest_pool()
+        parts = [read_sheet(source, sheet) for sheet in sheets]
+    return combine_sheets(sheets, parts)
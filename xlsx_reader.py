@@ -0,0 +1,392 @@
+"""xlsx 시트 고속 읽기 (열 배치와 dtype을 이미 아는 경우)
+
+pd.read_excel(openpyxl)은 셀마다 파이썬 객체를 만들고 컬럼 dtype을 추론하므로
+100만 행 워크북은 수 분이 걸립니다. 스키마 레지스트리에 등록된 배치는 컬럼 위치와 dtype을 알고 있으므로
+시트 XML을 청크 단위로 정규식으로 잘라 컬럼별 배열로 모은 뒤 dtype별로 한 번에 변환합니다.
+
+- 셀 속성 순서는 표준(r, s, t)을 가정하며, 해석하지 못한 셀이 있으면 XlsxLayoutError를 발생시킵니다
+  (호출 측은 pd.read_excel로 대체)
+- 공유 문자열(sharedStrings.xml), 인라인 문자열, 수식 결과값, 불리언 셀을 지원합니다
+- pd.read_excel과 같이 값이 있는 마지막 행 이후의 빈 행은 제외합니다
+- 기본은 첫 번째 시트이며, 다른 시트는 list_sheets가 돌려준 시트 XML 경로로 지정합니다
+"""
+import html
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# 시트 XML을 한 번에 읽는 크기 (행 경계에서 잘라 처리)
+SHEET_CHUNK_BYTES = 16 << 20
+
+# 엑셀 날짜 일련번호 기준일 (1900 날짜 체계)
+EXCEL_EPOCH = np.datetime64('1899-12-30')
+
+_CELL_BODY = (
+    rb'(?: s="\d+")?(?: t="(\w+)")?(?: [^>]*)?'
+    rb'(?:/>|>(?:<f[^>]*/>|<f[^>]*>[^<]*</f>)?(?:<v>([^<]*)</v>|<is><t[^>]*>([^<]*)</t></is>)?</c>)'
+)
+_CELL = re.compile(rb'<c r="([A-Z]{1,3})(\d+)"' + _CELL_BODY)
+_ROW_NUMBER = re.compile(rb'<row r="(\d+)"')
+_CELL_START = re.compile(rb'<c[ >]')
+_SHARED_ITEM = re.compile(rb'<si>(.*?)</si>', re.S)
+_TEXT = re.compile(rb'<t[^>]*>([^<]*)</t>')
+_PHONETIC = re.compile(rb'<rPh.*?</rPh>', re.S)
+_SHEET = re.compile(rb'<sheet [^>]*>')
+_ATTRIBUTE = re.compile(rb'([\w:]+)="([^"]*)"')
+
+
+class XlsxLayoutError(ValueError):
+    """고속 읽기로 해석할 수 없는 워크북"""
+
+
+def column_letter(position):
+    """0부터 시작하는 컬럼 위치 → 엑셀 컬럼 문자 (0 → A)"""
+    letters = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _unescape(values):
+    return [html.unescape(value.decode('utf-8')) if b'&' in value else value.decode('utf-8') for value in values]
+
+
+def _sheet_entries(archive):
+    """워크북 순서의 (시트 이름, 시트 XML 경로, 숨김 여부) 목록"""
+    workbook = archive.read('xl/workbook.xml')
+    rels = archive.read('xl/_rels/workbook.xml.rels')
+    entries = []
+    for tag in _SHEET.findall(workbook):
+        attributes = dict(_ATTRIBUTE.findall(tag))
+        rel_id = attributes.get(b'r:id')
+        if rel_id is None:
+            continue
+        target = re.search(rb'Id="' + re.escape(rel_id) + rb'"[^>]*Target="([^"]+)"', rels)
+        if target is None:
+            target = re.search(rb'Target="([^"]+)"[^>]*Id="' + re.escape(rel_id) + rb'"', rels)
+        if target is None:
+            raise XlsxLayoutError("시트 경로를 찾을 수 없습니다.")
+        path = target.group(1).decode('utf-8')
+        entries.append((
+            _unescape([attributes.get(b'name', b'')])[0],
+            path.lstrip('/') if path.startswith('/') else 'xl/' + path,
+            attributes.get(b'state', b'visible') != b'visible',
+        ))
+    return entries
+
+
+def _first_sheet_path(archive):
+    entries = _sheet_entries(archive)
+    if not entries:
+        raise XlsxLayoutError("워크북에 시트가 없습니다.")
+    return entries[0][1]
+
+
+def list_sheets(source):
+    """숨기지 않은 시트의 (시트 이름, 시트 XML 경로) 목록 (워크북 순서)"""
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise XlsxLayoutError(f"xlsx 파일이 아닙니다: {e}")
+    with archive:
+        return [(name, path) for name, path, hidden in _sheet_entries(archive) if not hidden]
+
+
+def _shared_strings(archive, limit=None):
+    """공유 문자열 표 (limit이 있으면 앞쪽 limit개만 읽음)"""
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return np.array([], dtype=object)
+    if limit is None:
+        data = archive.read('xl/sharedStrings.xml')
+    else:
+        # 헤더 조회는 앞쪽 몇 개만 필요하므로 필요한 만큼만 압축 해제
+        data = b''
+        with archive.open('xl/sharedStrings.xml') as stream:
+            while data.count(b'</si>') < limit:
+                block = stream.read(1 << 20)
+                if not block:
+                    break
+                data += block
+    strings = []
+    for item in _SHARED_ITEM.findall(data)[:limit]:
+        if b'<rPh' in item:
+            item = _PHONETIC.sub(b'', item)
+        strings.append(b''.join(_TEXT.findall(item)))
+    return np.array(_unescape(strings), dtype=object)
+
+
+def _iter_sheet_chunks(stream):
+    """시트 XML을 </row> 경계에서 자른 바이트 조각"""
+    pending = b''
+    while True:
+        block = stream.read(SHEET_CHUNK_BYTES)
+        if not block:
+            break
+        pending += block
+        cut = pending.rfind(b'</row>')
+        if cut < 0:
+            continue
+        yield pending[:cut + 6]
+        pending = pending[cut + 6:]
+    if pending:
+        yield pending
+
+
+def read_header_row(source, sheet=None):
+    """시트(기본: 첫 번째 시트)의 1행 값 목록 (빈 칸은 '', 1행이 없으면 None)
+
+    sheet는 list_sheets가 돌려준 시트 XML 경로입니다.
+    """
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(sheet or _first_sheet_path(archive)) as stream:
+            head = b''
+            while b'</row>' not in head:
+                block = stream.read(1 << 16)
+                if not block:
+                    break
+                head += block
+        start = head.find(b'<row ')
+        end = head.find(b'</row>')
+        if start < 0 or end < 0 or not re.match(rb'<row r="1"', head[start:]):
+            return None
+        cells = _CELL.findall(head[start:end])
+        if not cells:
+            return None
+        shared_needed = [int(value) for _, _, kind, value, _ in cells if kind == b's']
+        shared = _shared_strings(archive, limit=max(shared_needed) + 1) if shared_needed else None
+    width = max(_column_index(letter) for letter, *_ in cells) + 1
+    headers = [''] * width
+    for letter, _, kind, value, inline in cells:
+        if kind == b's':
+            text = shared[int(value)]
+        elif kind == b'inlineStr':
+            text = _unescape([inline])[0]
+        else:
+            text = _unescape([value])[0]
+            # 숫자 헤더는 pandas와 같이 정수 표기
+            text = text[:-2] if text.endswith('.0') else text
+        headers[_column_index(letter)] = text
+    return headers
+
+
+def _column_index(letter):
+    index = 0
+    for char in letter.decode('ascii') if isinstance(letter, bytes) else letter:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _convert(rows, kinds, values, inline, shared, dtype, n_rows):
+    """컬럼 하나의 셀 조각 → dtype 배열 (빈 칸은 결측)"""
+    is_shared = kinds == b's'
+    is_inline = kinds == b'inlineStr'
+    is_text = is_shared | is_inline | (kinds == b'str')
+    is_bool = kinds == b'b'
+    is_number = (kinds == b'') | (kinds == b'n')
+
+    if dtype in ('float64', 'int64', 'bool') or dtype.startswith('datetime64'):
+        column = np.full(n_rows, np.nan)
+        numbers = is_number & (values != b'')
+        column[rows[numbers]] = values[numbers].astype('float64')
+        column[rows[is_bool]] = values[is_bool] == b'1'
+        if is_text.any():
+            # pd.read_excel은 숫자 모양 문자를 숫자로 읽고, 그 외 문자가 섞이면 object로 추론 (호출 측에서 대체 읽기)
+            texts = _text_values(kinds[is_text], values[is_text], inline[is_text], shared)
+            parsed = _parse_numbers(texts)
+            if dtype.startswith('datetime64') or np.isnan(parsed[texts != '']).any():
+                raise XlsxLayoutError(f"{dtype} 컬럼에 숫자가 아닌 값이 섞여 있습니다.")
+            column[rows[is_text]] = parsed
+        if dtype.startswith('datetime64'):
+            days = pd.to_timedelta(column, unit='D').to_numpy()
+            return pd.Series(EXCEL_EPOCH.astype('datetime64[ns]') + days).astype(dtype)
+        if dtype == 'bool' and not np.isnan(column).any():
+            return pd.Series(column.astype(bool))
+        # 결측이 없고 모두 정수면 pandas와 같이 int64
+        if dtype != 'bool' and not np.isnan(column).any() and np.all(column == np.round(column)):
+            return pd.Series(column.astype('int64'))
+        return pd.Series(column)
+
+    column = np.full(n_rows, np.nan, dtype=object)
+    if is_text.any():
+        column[rows[is_text]] = _text_values(kinds[is_text], values[is_text], inline[is_text], shared)
+    numbers = is_number & (values != b'')
+    if numbers.any():
+        parsed = values[numbers].astype('float64')
+        column[rows[numbers]] = [int(value) if value.is_integer() else value for value in parsed.tolist()]
+    if is_bool.any():
+        column[rows[is_bool]] = (values[is_bool] == b'1').tolist()
+    # 문자열만 있으면 str, 숫자/불리언이 섞이면 pandas와 같이 object
+    mixed = numbers.any() or is_bool.any()
+    if dtype == 'str' and not mixed and is_text.any() and _all_numeric_text(column[rows[is_text]]):
+        raise XlsxLayoutError("문자 컬럼의 값이 모두 숫자 모양입니다.")
+    return pd.Series(column, dtype='str' if dtype == 'str' and not mixed else object)
+
+
+def _parse_numbers(texts):
+    return pd.to_numeric(pd.Series(texts, dtype=object), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _all_numeric_text(texts, probe=1000):
+    """문자 값이 모두 숫자 모양인지 (pd.read_excel이면 숫자 컬럼으로 추론)"""
+    texts = texts[texts != '']
+    if len(texts) == 0:
+        return False
+    # 대부분의 문자 컬럼은 앞쪽 값에서 바로 판별
+    if np.isnan(_parse_numbers(texts[:probe])).any():
+        return False
+    return not np.isnan(_parse_numbers(texts)).any()
+
+
+def _text_values(kinds, values, inline, shared):
+    texts = np.empty(len(kinds), dtype=object)
+    is_shared = kinds == b's'
+    if is_shared.any():
+        texts[is_shared] = shared[values[is_shared].astype('int64')]
+    is_inline = kinds == b'inlineStr'
+    if is_inline.any():
+        texts[is_inline] = _unescape(inline[is_inline].tolist())
+    is_str = ~(is_shared | is_inline)
+    if is_str.any():
+        texts[is_str] = _unescape(values[is_str].tolist())
+    return texts
+
+
+def read_xlsx_columns(source, columns, max_rows=None, sheet=None):
+    """시트(기본: 첫 번째 시트)를 지정 컬럼/dtype으로 읽기 (1행은 헤더로 건너뜀)
+
+    Args:
+        source: xlsx 경로 또는 파일 객체
+        columns: [(컬럼 위치, 컬럼명, dtype)] - dtype은 'int64', 'float64', 'str',
+                 'datetime64[...]', 'bool', 'object' 중 하나
+        max_rows: 앞쪽 데이터 행만 읽기 (검증용)
+        sheet: 읽을 시트 XML 경로 (list_sheets 결과)
+
+    Returns:
+        DataFrame (컬럼 순서는 columns 순서)
+    """
+    letters = {column_letter(position).encode('ascii'): i for i, (position, _, _) in enumerate(columns)}
+    parts = [[] for _ in columns]
+    last_row = 1
+
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise XlsxLayoutError(f"xlsx 파일이 아닙니다: {e}")
+    with archive:
+        shared = _shared_strings(archive)
+        with archive.open(sheet or _first_sheet_path(archive)) as stream:
+            for chunk in _iter_sheet_chunks(stream):
+                cells = _CELL.findall(chunk)
+                if len(cells) != len(_CELL_START.findall(chunk)):
+                    raise XlsxLayoutError("해석할 수 없는 셀 형식이 있습니다.")
+                if not cells:
+                    continue
+                letter, row, kind, value, inline = (np.array(field) for field in zip(*cells))
+                row = row.astype('int64')
+                filled = row[(value != b'') | (inline != b'')]
+                if len(filled):
+                    last_row = max(last_row, int(filled.max()) if max_rows is None else
+                                   min(int(filled.max()), max_rows + 1))
+                in_range = (row > 1) if max_rows is None else (row > 1) & (row <= max_rows + 1)
+                for key, i in letters.items():
+                    mask = (letter == key) & in_range
+                    if mask.any():
+                        parts[i].append((row[mask], kind[mask], value[mask], inline[mask]))
+                if max_rows is not None and row[-1] > max_rows + 1:
+                    break
+
+    # pd.read_excel과 같이 값이 있는 마지막 행까지 (중간의 빈 행은 결측 행으로 유지)
+    n_rows = max(last_row - 1, 0)
+
+    frame = {}
+    for i, (_, name, dtype) in enumerate(columns):
+        if parts[i]:
+            rows, kinds, values, inline = (np.concatenate(field) for field in zip(*parts[i]))
+            keep = rows <= last_row
+            frame[name] = _convert(rows[keep] - 2, kinds[keep], values[keep], inline[keep], shared, dtype, n_rows)
+        else:
+            frame[name] = _convert(np.array([], dtype='int64'), *(np.array([], dtype='S1'),) * 3,
+                                   shared, dtype, n_rows)
+    return pd.DataFrame(frame, columns=[name for _, name, _ in columns])
+
+
+def _key_texts(kinds, values, inline, shared):
+    """키 컬럼 셀 → 문자열 (숫자/불리언은 XML 값 그대로)"""
+    texts = np.array(_unescape(values.tolist()), dtype=object)
+    is_text = (kinds == b's') | (kinds == b'inlineStr')
+    if is_text.any():
+        texts[is_text] = _text_values(kinds[is_text], values[is_text], inline[is_text], shared)
+    return texts
+
+
+def scan_xlsx_rows(source, key_columns, select, columns):
+    """첫 번째 시트를 청크 단위로 훑으며 select가 고른 행만 읽기 (표본 추출용)
+
+    키 컬럼은 모든 행에서 해당 셀만 찾아 문자열로 읽고 나머지 컬럼은 선택된 행에서만 해석하므로
+    전체 읽기보다 훨씬 빠릅니다.
+
+    Args:
+        key_columns: [(컬럼 위치, 이름)] - 모든 데이터 행의 값을 문자열 배열로 select에 전달 (빈 칸은 '')
+        select: select(엑셀 행번호 배열, {이름: 값 배열}) → 읽을 행 여부 불리언 배열
+        columns: [(컬럼 위치, 이름, dtype)] - 선택된 행에서 읽을 컬럼
+
+    Returns:
+        선택된 행의 DataFrame (index는 엑셀 행번호)
+    """
+    key_patterns = [
+        (name, re.compile(rb'<c r="' + column_letter(position).encode('ascii') + rb'(\d+)"' + _CELL_BODY))
+        for position, name in key_columns
+    ]
+    letters = {column_letter(position).encode('ascii'): i for i, (position, _, _) in enumerate(columns)}
+    selected_parts = []
+
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise XlsxLayoutError(f"xlsx 파일이 아닙니다: {e}")
+    with archive:
+        shared = _shared_strings(archive)
+        with archive.open(_first_sheet_path(archive)) as stream:
+            for chunk in _iter_sheet_chunks(stream):
+                row_numbers = np.array(_ROW_NUMBER.findall(chunk), dtype='int64')
+                row_parts = chunk.split(b'<row ')[1:]
+                if len(row_numbers) != len(row_parts):
+                    raise XlsxLayoutError("해석할 수 없는 행 형식이 있습니다.")
+                data_rows = row_numbers > 1
+                if not data_rows.any():
+                    continue
+
+                keys = {}
+                for name, pattern in key_patterns:
+                    texts = np.full(len(row_numbers), '', dtype=object)
+                    cells = pattern.findall(chunk)
+                    if cells:
+                        row, kind, value, inline = (np.array(field) for field in zip(*cells))
+                        texts[np.searchsorted(row_numbers, row.astype('int64'))] = _key_texts(
+                            kind, value, inline, shared
+                        )
+                    keys[name] = texts[data_rows]
+
+                chosen = np.flatnonzero(data_rows)[np.asarray(select(row_numbers[data_rows], keys), dtype=bool)]
+                if len(chosen):
+                    selected_parts.append(b''.join(b'<row ' + row_parts[i] for i in chosen))
+
+    cells = _CELL.findall(b''.join(selected_parts))
+    if not cells:
+        return pd.DataFrame(columns=[name for _, name, _ in columns], index=pd.Index([], dtype='int64'))
+    letter, row, kind, value, inline = (np.array(field) for field in zip(*cells))
+    row = row.astype('int64')
+    row_index = np.unique(row)
+    positions = np.searchsorted(row_index, row)
+    frame = {}
+    for key, i in letters.items():
+        mask = letter == key
+        frame[columns[i][1]] = _convert(positions[mask], kind[mask], value[mask], inline[mask], shared,
+                                        columns[i][2], len(row_index))
+    result = pd.DataFrame(frame, columns=[name for _, name, _ in columns])
+    result.index = row_index
+    return result